@@ -514,8 +514,14 @@ class ContinousWalkingDemo(object):
             vis.updatePolyData( polyData, 'walking snapshot trimmed', parent='cont debug', visible=True)
 
         # Step 2: find all the surfaces in front of the robot (about 0.75sec)
-        clusters = segmentation.findHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSearchRadius=0.05,
-                                                       clusterTolerance=0.025, distanceToPlaneThreshold=0.0025, normalsDotUpRange=[0.95, 1.0])
+        # this runs on a worker thread and the remaining steps continue in replanFootstepsOnSurfaces
+        onSurfaces = functools.partial(self.replanFootstepsOnSurfaces, standingFootName=standingFootName, standingFootFrame=standingFootFrame,
+                                       removeFirstLeftStep=removeFirstLeftStep, nextDoubleSupportPose=nextDoubleSupportPose)
+        segmentation.findHorizontalSurfacesAsync(polyData, callback=onSurfaces, removeGroundFirst=False, normalEstimationSearchRadius=0.05,
+                                                 clusterTolerance=0.025, distanceToPlaneThreshold=0.0025, normalsDotUpRange=[0.95, 1.0])
+
+    def replanFootstepsOnSurfaces(self, clusters, standingFootName, standingFootFrame, removeFirstLeftStep=True, nextDoubleSupportPose=None):
+
         if clusters is None:
             print("No cluster found, stop walking now!")
             return
@@ -1,4 +1,4 @@
-import math, os
+import os
 import numpy as np
 from director import lcmUtils
 
@@ -290,6 +290,50 @@ class Geometry(object):
         self.polyDataItem.actor.SetTexture(visInfo.texture)
 
 
+class PlanarLidarConverter(object):
+    '''
+    Converts planar lidar ranges to points in the sensor frame.  The cos/sin
+    tables for each (rad0, radstep, count) scan layout are cached, so a scan
+    is converted with a few vectorized numpy operations.
+    '''
+
+    AngleCache = {}
+    MaxCacheSize = 32
+
+    @staticmethod
+    def getAngleTable(rad0, radstep, count):
+        key = (rad0, radstep, count)
+        table = PlanarLidarConverter.AngleCache.get(key)
+        if table is None:
+            if len(PlanarLidarConverter.AngleCache) >= PlanarLidarConverter.MaxCacheSize:
+                PlanarLidarConverter.AngleCache.clear()
+            angles = rad0 + radstep*np.arange(count)
+            table = np.column_stack((np.cos(angles), np.sin(angles)))
+            PlanarLidarConverter.AngleCache[key] = table
+        return table
+
+    @staticmethod
+    def convertToNumpy(ranges, rad0, radstep):
+        '''
+        Returns an (N,3) array of points for the non-negative ranges.
+        '''
+        ranges = np.asarray(ranges, dtype=float)
+        table = PlanarLidarConverter.getAngleTable(rad0, radstep, len(ranges))
+        valid = ranges >= 0
+        pts = np.zeros((np.count_nonzero(valid), 3))
+        pts[:,:2] = table[valid] * ranges[valid, np.newaxis]
+        return pts
+
+    @staticmethod
+    def convert(ranges, rad0, radstep):
+        '''
+        Returns a (vtkPoints, vtkCellArray) tuple with one vertex cell per
+        point for the non-negative ranges.
+        '''
+        pts = PlanarLidarConverter.convertToNumpy(ranges, rad0, radstep)
+        return vnp.getVtkPointsFromNumpy(pts), vnp.getVertexCellArray(len(pts))
+
+
 class Link(object):
 
     def __init__(self, link):
@@ -299,7 +343,13 @@ class Link(object):
             self.geometry.extend(Geometry.createGeometry(link.name + ' geometry data', g))
 
     def setTransform(self, pos, quat):
-        self.transform = transformUtils.transformFromPose(pos, quat)
+        self._applyTransform(transformUtils.transformFromPose(pos, quat))
+
+    def setTransformFromMatrix(self, mat):
+        self._applyTransform(transformUtils.getTransformFromNumpy(mat))
+
+    def _applyTransform(self, transform):
+        self.transform = transform
         for g in self.geometry:
             childFrame = g.polyDataItem.getChildFrame()
             if childFrame:
@@ -317,6 +367,14 @@ class DrakeVisualizer(object):
         self.view = view
         self.robots = {}
         self.linkWarnings = set()
+
+        # flat table of links indexed by slot, rebuilt when robots change
+        self.linkSlots = {}
+        self.slotLinks = []
+        self.slotPoses = np.zeros((0, 7))
+        self.drawMessageLinks = None
+        self.drawMessageSlots = None
+
         self.enable()
         self.sendStatusMessage('loaded')
 
@@ -374,6 +432,24 @@ class DrakeVisualizer(object):
     def addLinksFromLCM(self, load_msg):
         for link in load_msg.link:
             self.addLink(Link(link), link.robot_num, link.name)
+        self._rebuildLinkSlots()
+
+    def _rebuildLinkSlots(self):
+        '''
+        Assigns a slot index to every (robotNum, linkName).  The last pose
+        drawn for each slot is stored in self.slotPoses, NaN means the pose
+        has not been set yet.
+        '''
+        self.linkSlots = {}
+        self.slotLinks = []
+        for robotNum, links in sorted(self.robots.items()):
+            for linkName, link in sorted(links.items()):
+                self.linkSlots[(robotNum, linkName)] = len(self.slotLinks)
+                self.slotLinks.append(link)
+
+        self.slotPoses = np.full((len(self.slotLinks), 7), np.nan)
+        self.drawMessageLinks = None
+        self.drawMessageSlots = None
 
     def addLink(self, link, robotNum, linkName):
         self.robots.setdefault(robotNum, {})[linkName] = link
@@ -401,11 +477,13 @@ class DrakeVisualizer(object):
             if child.getProperty('Name') != "pointclouds":
                 om.removeFromObjectModel(child)
         self.robots = {}
+        self._rebuildLinkSlots()
 
     def removeRobot(self, robotNum):
         if robotNum in self.robots:
             om.removeFromObjectModel(self.getRobotFolder(robotNum))
             del self.robots[robotNum]
+            self._rebuildLinkSlots()
 
     def sendStatusMessage(self, message):
         msg = lcmrl.viewer_command_t()
@@ -413,24 +491,55 @@ class DrakeVisualizer(object):
         msg.command_data = message
         lcmUtils.publish('DRAKE_VIEWER_STATUS', msg)
 
+    def _getDrawMessageSlots(self, msg):
+        '''
+        Returns the slot index of each link in the draw message, or -1 for
+        unknown links.  The result is cached since consecutive draw messages
+        normally list the same links in the same order.
+        '''
+        links = (tuple(msg.robot_num), tuple(msg.link_name))
+        if links == self.drawMessageLinks:
+            return self.drawMessageSlots
+
+        slots = np.full(msg.num_links, -1, dtype=int)
+        for i, key in enumerate(zip(*links)):
+            slot = self.linkSlots.get(key)
+            if slot is not None:
+                slots[i] = slot
+            elif key[1] not in self.linkWarnings:
+                print('Error locating link name:', key[1])
+                self.linkWarnings.add(key[1])
+
+        self.drawMessageLinks = links
+        self.drawMessageSlots = slots
+        return slots
+
     def onViewerDraw(self, msg):
 
-        for i in range(msg.num_links):
+        if not msg.num_links:
+            return
+
+        slots = self._getDrawMessageSlots(msg)
+        poses = np.hstack((np.asarray(msg.position, dtype=float).reshape(-1, 3),
+                           np.asarray(msg.quaternion, dtype=float).reshape(-1, 4)))
 
-            pos = msg.position[i]
-            quat = msg.quaternion[i]
-            robotNum = msg.robot_num[i]
-            linkName = msg.link_name[i]
+        known = slots >= 0
+        slots = slots[known]
+        poses = poses[known]
 
-            try:
-                link = self.getLink(robotNum, linkName)
-            except KeyError:
-                if linkName not in self.linkWarnings:
-                    print('Error locating link name:', linkName)
-                    self.linkWarnings.add(linkName)
-            else:
-                link.setTransform(pos, quat)
+        changed = np.any(poses != self.slotPoses[slots], axis=1)
+        if not changed.any():
+            return
+
+        slots = slots[changed]
+        poses = poses[changed]
+        self.slotPoses[slots] = poses
+
+        for slot, mat in zip(slots, transformUtils.matricesFromPoses(poses[:,:3], poses[:,3:])):
+            self.slotLinks[slot].setTransformFromMatrix(mat)
 
+        # view.render() only marks the view for rendering, the view's render
+        # timer coalesces requests into at most one render per frame
         self.view.render()
 
     def onPlanarLidar(self, msg, channel):
@@ -447,7 +556,7 @@ class DrakeVisualizer(object):
                 self.linkWarnings.add(linkName)
         else:
             if len(link.geometry):
-                polyData = link.geometry[0].polyDataItem
+                polyData = link.geometry[0].polyDataItem.polyData
             else:
                 polyData = vtk.vtkPolyData()
 
@@ -460,21 +569,7 @@ class DrakeVisualizer(object):
                 self.addLinkGeometry(g, linkName, linkFolder)
                 g.polyDataItem.actor.SetUserTransform(link.transform)
 
-            points = vtk.vtkPoints()
-            verts = vtk.vtkCellArray()
-
-            t = msg.rad0
-            for r in msg.ranges:
-                if r >= 0:
-                    x = r * math.cos(t)
-                    y = r * math.sin(t)
-
-                    pointId = points.InsertNextPoint([x,y,0])
-                    verts.InsertNextCell(1)
-                    verts.InsertCellPoint(pointId)
-
-                t += msg.radstep
-
+            points, verts = PlanarLidarConverter.convert(msg.ranges, msg.rad0, msg.radstep)
             polyData.SetPoints(points)
             polyData.SetVerts(verts)
 
@@ -482,34 +577,36 @@ class DrakeVisualizer(object):
     def onPointCloud(self, msg, channel):
         pointcloudName = channel.replace('DRAKE_POINTCLOUD_', '', 1)
 
-        polyData = vnp.numpyToPolyData(np.asarray(msg.points), createVertexCells=True)
+        points = np.asarray(msg.points, dtype=np.float32).reshape(-1, 3)
 
         # If the user provided color channels, then use them to colorize
         # the pointcloud.
-        channels = {msg.channel_names[i]: msg.channels[i] for i in range(msg.n_channels)}
-        if "r" in channels and "g" in channels and "b" in channels:
-            colorized = True
-            colorArray = np.empty((msg.n_points, 3), dtype=np.uint8)
-            for (colorIndex, color) in enumerate(["r", "g", "b"]):
-                colorArray[:, colorIndex] = 255 * np.asarray(channels[color])
-            vnp.addNumpyToVtk(polyData, colorArray, "rgb")
+        channelIndices = {name: i for i, name in enumerate(msg.channel_names[:msg.n_channels])}
+        if "r" in channelIndices and "g" in channelIndices and "b" in channelIndices:
+            rgb = np.asarray([msg.channels[channelIndices[color]] for color in ["r", "g", "b"]], dtype=np.float32)
+            colorArray = np.ascontiguousarray((255 * rgb.T).astype(np.uint8))
         else:
-            colorized = False
+            colorArray = None
 
         folder = self.getPointCloudFolder()
 
         # If there was an existing point cloud by this name, then just
-        # set its polyData to the new point cloud.
+        # update its polyData with the new point cloud.
         # This has the effect of preserving all the user-specified properties
         # like point size, coloration mode, alpha, etc.
         previousPointcloud = folder.findChild(pointcloudName)
         if previousPointcloud is not None:
-            previousPointcloud.setPolyData(polyData)
-            previousPointcloud._updateColorByProperty()
+            previousPointcloud.updatePoints(points, {'rgb': colorArray} if colorArray is not None else None)
         else:
-            item = vis.PolyDataItem(pointcloudName, polyData, view=None)
+            item = vis.PolyDataItem(pointcloudName, self._createPointCloudPolyData(points, colorArray), view=None)
             item.addToView(self.view)
-            if colorized:
+            if colorArray is not None:
                 item._updateColorByProperty()
                 item.setProperty("Color By", "rgb")
             om.addToObjectModel(item, parentObj=folder)
+
+    @staticmethod
+    def _createPointCloudPolyData(points, colorArray):
+        # the arrays were created for this message, so vtk can wrap them without copying
+        pointData = {'rgb': colorArray} if colorArray is not None else None
+        return vnp.numpyToPolyData(points, pointData, createVertexCells=True, copy=False)
@@ -223,6 +223,265 @@ def getBDIAdjustedFootstepsFolder():
     return obj
 
 
+def getShadedStepColor(color, stepIndex, numSteps):
+    '''
+    Darkens the color of early steps, so the shading of a plan indicates
+    its destination.
+    '''
+    frac = float(stepIndex)/ float(numSteps-1)
+    return [0.25*c + 0.75*frac*c for c in color]
+
+
+def getTerrainSlice(msg, stepIndex, footstepTransform):
+    '''
+    Returns a polydata of the terrain profile that the swing foot of step
+    stepIndex passes over, and the transform that places it in world.
+    '''
+    footstep = msg.footsteps[stepIndex]
+    contact_pts_left, contact_pts_right = FootstepsDriver.getContactPts()
+    if footstep.is_right_foot:
+        sole_offset = np.mean(contact_pts_right, axis=0)
+    else:
+        sole_offset = np.mean(contact_pts_left, axis=0)
+
+    t_sole_prev = frameFromPositionMessage(msg.footsteps[stepIndex-2].pos)
+    t_sole_prev.PreMultiply()
+    t_sole_prev.Translate(sole_offset)
+    t_sole = transformUtils.copyFrame(footstepTransform)
+    t_sole.Translate(sole_offset)
+    yaw = np.arctan2(t_sole.GetPosition()[1] - t_sole_prev.GetPosition()[1],
+                     t_sole.GetPosition()[0] - t_sole_prev.GetPosition()[0])
+    T_terrain_to_world = transformUtils.frameFromPositionAndRPY([t_sole_prev.GetPosition()[0], t_sole_prev.GetPosition()[1], 0],
+                                                                [0, 0, math.degrees(yaw)])
+    path_dist = np.array(footstep.terrain_path_dist)
+    height = np.array(footstep.terrain_height)
+    terrain_pts_in_local = np.vstack((path_dist, np.zeros(len(footstep.terrain_path_dist)), height))
+    d = DebugData()
+    for j in range(terrain_pts_in_local.shape[1]-1):
+        d.addLine(terrain_pts_in_local[:,j], terrain_pts_in_local[:,j+1], radius=0.01)
+    return d.getPolyData(), T_terrain_to_world
+
+
+def drawContactVolumes(contactSlices, footstepTransform, color, parent=None):
+    '''
+    Shows the walking volumes of a step in parent, by default the walking
+    volumes folder, and returns their objects.
+    '''
+    volFolder = parent or getWalkingVolumesFolder()
+    objs = []
+    for zs, xy in contactSlices.items():
+        points0 = np.vstack((xy, zs[0] + np.zeros((1,xy.shape[1]))))
+        points1 = np.vstack((xy, zs[1] + np.zeros((1,xy.shape[1]))))
+        points = np.hstack((points0, points1))
+        points = points + np.array([[0.05],[0],[-0.0811]])
+        points = points.T
+        polyData = vnp.getVtkPolyDataFromNumpyPoints(points.copy())
+        vol_mesh = filterUtils.computeDelaunay3D(polyData)
+        obj = vis.showPolyData(vol_mesh, 'walking volume', parent=volFolder, alpha=0.5, color=color)
+        obj.actor.SetUserTransform(footstepTransform)
+        objs.append(obj)
+    return objs
+
+
+def getContactPointsMesh(isRightFoot, supportContactGroups):
+    leftPoints, rightPoints = FootstepsDriver.getContactPts(supportContactGroups)
+    d = DebugData()
+    for pt in (rightPoints if isRightFoot else leftPoints):
+        d.addSphere(pt, radius=0.01)
+    return d.getPolyData()
+
+
+def getPoseKey(position):
+    trans = position.translation
+    quat = position.rotation
+    return (trans.x, trans.y, trans.z, quat.w, quat.x, quat.y, quat.z)
+
+
+class FootstepPlanRenderer(object):
+    '''
+    Draws footstep plans into a folder and, when a new plan arrives, only
+    updates the steps that differ from the plan on display.
+
+    The feet of all steps are instances of one InstancedMeshItem that draws
+    the shared left and right foot meshes, and their contact points are
+    instances of a second one, so a step is a row of per instance position,
+    orientation and color arrays rather than a set of objects.  Terrain
+    slices and walking volumes are still objects per step, but they are only
+    rebuilt for the steps whose pose, terrain or color changed.  They are
+    kept in 'terrain slices' and 'walking volumes' folders of the renderer's
+    own folder, so renderers for different plans do not share them.
+
+    The steps have no objects of their own, so there are no step frames or
+    per step Support Contact Groups properties in this mode.
+    '''
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.feetItem = None
+        self.contactPointsItem = None
+        self.contactMeshIds = {}
+        self.instanceKeys = []
+        self.positions = np.zeros((0, 3))
+        self.orientations = np.zeros((0, 3))
+        self.colors = np.zeros((0, 3))
+        self.footMeshIds = np.zeros(0, dtype=int)
+        self.contactIds = np.zeros(0, dtype=int)
+        self.terrainSlices = []
+        self.walkingVolumes = []
+
+    @staticmethod
+    def _isRemoved(obj):
+        return obj is None or obj.getObjectTree() is None
+
+    def draw(self, msg, left_color=None, right_color=None, alpha=1.0, contactSlices=None):
+        '''
+        Draws msg, a footstep_plan_t.  Walking volumes are drawn from
+        contactSlices unless it is None.
+        '''
+        steps = list(enumerate(msg.footsteps))[2:]
+        transforms = {}
+
+        def getTransform(i):
+            if i not in transforms:
+                transforms[i] = frameFromPositionMessage(msg.footsteps[i].pos)
+            return transforms[i]
+
+        instanceKeys = []
+        stepColors = []
+        for i, footstep in steps:
+            if footstep.is_right_foot:
+                color = getRightFootColor() if right_color is None else right_color
+            else:
+                color = getLeftFootColor() if left_color is None else left_color
+            stepColors.append(tuple(color))
+            instanceKeys.append((getPoseKey(footstep.pos), bool(footstep.is_right_foot),
+                                 footstep.params.support_contact_groups,
+                                 tuple(getShadedStepColor(color, i, msg.num_steps))))
+
+        self._updateInstances(instanceKeys, getTransform, alpha)
+
+        slicesFolder = self._getFolder('terrain slices', visible=False)
+        sliceKeys = [(getPoseKey(msg.footsteps[i-2].pos), getPoseKey(footstep.pos), bool(footstep.is_right_foot),
+                      tuple(footstep.terrain_path_dist), tuple(footstep.terrain_height)) for i, footstep in steps]
+
+        def makeTerrainSlice(i):
+            slicePolyData, T_terrain_to_world = getTerrainSlice(msg, i, getTransform(i))
+            obj = vis.showPolyData(slicePolyData, 'terrain slice', parent=slicesFolder, visible=slicesFolder.getProperty('Visible'), color=[.8,.8,.3])
+            obj.actor.SetUserTransform(T_terrain_to_world)
+            return [obj]
+
+        self._updateStepObjects(self.terrainSlices, sliceKeys, makeTerrainSlice)
+
+        volumeKeys = [(key[0], key[1], color) if contactSlices is not None else None
+                      for key, color in zip(instanceKeys, stepColors)]
+
+        def makeWalkingVolumes(i):
+            if contactSlices is None:
+                return []
+            return drawContactVolumes(contactSlices, getTransform(i), stepColors[i-2], parent=self._getFolder('walking volumes'))
+
+        self._updateStepObjects(self.walkingVolumes, volumeKeys, makeWalkingVolumes)
+
+    def _getFolder(self, name, visible=True):
+        obj = self.folder.findChild(name)
+        if obj is None:
+            obj = om.getOrCreateContainer(name, parentObj=self.folder)
+            obj.setProperty('Visible', visible)
+            om.collapse(obj)
+        return obj
+
+    def _updateInstances(self, instanceKeys, getTransform, alpha):
+        if self._isRemoved(self.feetItem) or self._isRemoved(self.contactPointsItem):
+            self._createInstanceItems()
+
+        numberOfSteps = len(instanceKeys)
+        changed = [k for k, key in enumerate(instanceKeys) if k >= len(self.instanceKeys) or key != self.instanceKeys[k]]
+
+        def resize(array):
+            resized = np.zeros((numberOfSteps,) + array.shape[1:], dtype=array.dtype)
+            n = min(numberOfSteps, len(array))
+            resized[:n] = array[:n]
+            return resized
+
+        if numberOfSteps != len(self.instanceKeys):
+            self.positions, self.orientations, self.colors, self.footMeshIds, self.contactIds = [
+                resize(a) for a in (self.positions, self.orientations, self.colors, self.footMeshIds, self.contactIds)]
+
+        for k in changed:
+            _, isRightFoot, supportContactGroups, color = instanceKeys[k]
+            footstepTransform = getTransform(k + 2)
+            self.positions[k] = footstepTransform.GetPosition()
+            self.orientations[k] = footstepTransform.GetOrientation()
+            self.colors[k] = color
+            self.footMeshIds[k] = 1 if isRightFoot else 0
+            self.contactIds[k] = self._getContactMeshId(isRightFoot, supportContactGroups)
+
+        if numberOfSteps != len(self.instanceKeys):
+            self.feetItem.setInstances(self.positions, self.orientations, self.colors, self.footMeshIds)
+            self.contactPointsItem.setInstances(self.positions, self.orientations, self.colors, self.contactIds)
+        else:
+            changed = np.array(changed, dtype=int)
+            self.feetItem.updateInstances(changed, self.positions[changed], self.orientations[changed],
+                                          self.colors[changed], self.footMeshIds[changed])
+            self.contactPointsItem.updateInstances(changed, self.positions[changed], self.orientations[changed],
+                                                   self.colors[changed], self.contactIds[changed])
+
+        self.instanceKeys = instanceKeys
+        for item in (self.feetItem, self.contactPointsItem):
+            if item.getProperty('Alpha') != alpha:
+                item.setProperty('Alpha', alpha)
+
+    def _createInstanceItems(self):
+        for item in (self.feetItem, self.contactPointsItem):
+            if not self._isRemoved(item):
+                om.removeFromObjectModel(item)
+
+        self.instanceKeys = []
+        self.contactMeshIds = {}
+
+        def showInstances(name):
+            polyData = vis.getInstancesPolyData(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0))
+            return vis.showPolyData(polyData, name, parent=self.folder, colorByName='rgb_colors', cls=vis.InstancedMeshItem)
+
+        self.feetItem = showInstances('footsteps')
+        self.feetItem.setIcon(om.Icons.Feet)
+        self.feetItem.setSourceMeshes(getFootMeshes())
+        self.contactPointsItem = showInstances('contact points')
+
+    def _getContactMeshId(self, isRightFoot, supportContactGroups):
+        key = (isRightFoot, supportContactGroups)
+        meshId = self.contactMeshIds.get(key)
+        if meshId is None:
+            meshId = self.contactMeshIds[key] = len(self.contactMeshIds)
+            self.contactPointsItem.mapper.SetSourceData(meshId, getContactPointsMesh(isRightFoot, supportContactGroups))
+        return meshId
+
+    def _updateStepObjects(self, stepObjects, keys, makeObjects):
+        '''
+        stepObjects is a list of (key, objects) per step.  Replaces the objects
+        of the steps whose key changed or whose objects were removed from the
+        object model, in place.
+        '''
+        for k, key in enumerate(keys):
+            if k < len(stepObjects):
+                oldKey, objects = stepObjects[k]
+                if oldKey == key and not any(self._isRemoved(obj) for obj in objects):
+                    continue
+                self._removeObjects(objects)
+                stepObjects[k] = (key, makeObjects(k + 2))
+            else:
+                stepObjects.append((key, makeObjects(k + 2)))
+
+        for _, objects in stepObjects[len(keys):]:
+            self._removeObjects(objects)
+        del stepObjects[len(keys):]
+
+    def _removeObjects(self, objects):
+        for obj in objects:
+            if not self._isRemoved(obj):
+                om.removeFromObjectModel(obj)
+
+
 class FootstepsDriver(object):
 
     def __init__(self, jointController):
@@ -235,6 +494,9 @@ class FootstepsDriver(object):
         self.default_step_params = DEFAULT_STEP_PARAMS
         self.contact_slices = DEFAULT_CONTACT_SLICES
         self.show_contact_slices = False
+        # draw plans with FootstepPlanRenderer, which updates only the steps
+        # that changed and draws the feet as instances of one mesh
+        self.useInstancedRendering = False
         self.toolbarWidget = None
 
         ### Stuff pertaining to rendering BDI-frame steps
@@ -443,6 +705,11 @@ class FootstepsDriver(object):
         om.removeFromObjectModel(getFootstepsFolder())
 
     def drawFootstepPlan(self, msg, folder, left_color=None, right_color=None, alpha=1.0):
+        if self.useInstancedRendering:
+            self.drawFootstepPlanInstanced(msg, folder, left_color, right_color, alpha)
+            return
+
+        folder.footstepPlanRenderer = None
         for step in folder.children():
             om.removeFromObjectModel(step)
         allTransforms = []
@@ -480,40 +747,14 @@ class FootstepsDriver(object):
                 else:
                     color = left_color
 
-            # add gradual shading to steps to indicate destination
-            frac = float(i)/ float(msg.num_steps-1)
-            this_color = [0,0,0]
-            this_color[0] = 0.25*color[0] + 0.75*frac*color[0]
-            this_color[1] = 0.25*color[1] + 0.75*frac*color[1]
-            this_color[2] = 0.25*color[2] + 0.75*frac*color[2]
+            this_color = getShadedStepColor(color, i, msg.num_steps)
 
 
             if self.show_contact_slices:
                 self.drawContactVolumes(footstepTransform, color)
 
-            contact_pts_left, contact_pts_right = FootstepsDriver.getContactPts()
-            if footstep.is_right_foot:
-                sole_offset = np.mean(contact_pts_right, axis=0)
-            else:
-                sole_offset = np.mean(contact_pts_left, axis=0)
-
-            t_sole_prev = frameFromPositionMessage(msg.footsteps[i-2].pos)
-            t_sole_prev.PreMultiply()
-            t_sole_prev.Translate(sole_offset)
-            t_sole = transformUtils.copyFrame(footstepTransform)
-            t_sole.Translate(sole_offset)
-            yaw = np.arctan2(t_sole.GetPosition()[1] - t_sole_prev.GetPosition()[1],
-                             t_sole.GetPosition()[0] - t_sole_prev.GetPosition()[0])
-            T_terrain_to_world = transformUtils.frameFromPositionAndRPY([t_sole_prev.GetPosition()[0], t_sole_prev.GetPosition()[1], 0],
-                                                                        [0, 0, math.degrees(yaw)])
-            path_dist = np.array(footstep.terrain_path_dist)
-            height = np.array(footstep.terrain_height)
-            # if np.any(height >= trans[2]):
-            terrain_pts_in_local = np.vstack((path_dist, np.zeros(len(footstep.terrain_path_dist)), height))
-            d = DebugData()
-            for j in range(terrain_pts_in_local.shape[1]-1):
-                d.addLine(terrain_pts_in_local[:,j], terrain_pts_in_local[:,j+1], radius=0.01)
-            obj = vis.showPolyData(d.getPolyData(), 'terrain slice', parent=slicesFolder, visible=slicesFolder.getProperty('Visible'), color=[.8,.8,.3])
+            slicePolyData, T_terrain_to_world = getTerrainSlice(msg, i, footstepTransform)
+            obj = vis.showPolyData(slicePolyData, 'terrain slice', parent=slicesFolder, visible=slicesFolder.getProperty('Visible'), color=[.8,.8,.3])
             obj.actor.SetUserTransform(T_terrain_to_world)
 
             renderInfeasibility = False
@@ -539,18 +780,21 @@ class FootstepsDriver(object):
 
             self.drawContactPts(obj, footstep, color=this_color)
 
+    def drawFootstepPlanInstanced(self, msg, folder, left_color=None, right_color=None, alpha=1.0):
+        renderer = getattr(folder, 'footstepPlanRenderer', None)
+        if renderer is None:
+            for child in folder.children():
+                om.removeFromObjectModel(child)
+            renderer = folder.footstepPlanRenderer = FootstepPlanRenderer(folder)
+
+        contactSlices = self.contact_slices if self.show_contact_slices else None
+        renderer.draw(msg, left_color, right_color, alpha, contactSlices)
+
     def drawContactVolumes(self, footstepTransform, color):
-        volFolder = getWalkingVolumesFolder()
-        for zs, xy in self.contact_slices.items():
-            points0 = np.vstack((xy, zs[0] + np.zeros((1,xy.shape[1]))))
-            points1 = np.vstack((xy, zs[1] + np.zeros((1,xy.shape[1]))))
-            points = np.hstack((points0, points1))
-            points = points + np.array([[0.05],[0],[-0.0811]])
-            points = points.T
-            polyData = vnp.getVtkPolyDataFromNumpyPoints(points.copy())
-            vol_mesh = filterUtils.computeDelaunay3D(polyData)
-            obj = vis.showPolyData(vol_mesh, 'walking volume', parent=volFolder, alpha=0.5, visible=self.show_contact_slices, color=color)
-            obj.actor.SetUserTransform(footstepTransform)
+        objs = drawContactVolumes(self.contact_slices, footstepTransform, color)
+        for obj in objs:
+            obj.setProperty('Visible', self.show_contact_slices)
+        return objs
 
     def onFootstepPropertyChanged(self, obj, propertySet, propertyName):
         if propertyName == "Support Contact Groups":
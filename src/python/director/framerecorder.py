@@ -0,0 +1,248 @@
+'''
+Records frames of a render window without blocking the GUI thread on
+encoding or disk writes.
+
+The GUI thread copies the window's pixels into a preallocated frame from a
+FramePool and queues it.  A writer thread passes queued frames to a sink,
+which pipes them to a video encoder process or compresses them to PNG
+files, and then returns the frames to the pool.  When the writer falls
+behind and every frame of the pool is queued, new frames are dropped rather
+than letting the queue grow without bound, and counted in droppedFrames.
+
+Frames are stored as read from the render window, bottom row first.
+'''
+
+import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+
+import numpy as np
+
+
+class FramePool(object):
+    '''
+    A fixed set of preallocated height x width x 3 uint8 frames.
+    '''
+
+    def __init__(self, numberOfFrames, width, height):
+        self.width = width
+        self.height = height
+        self.frames = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(numberOfFrames)]
+        self.vtkArrays = [None] * numberOfFrames
+        self.freeFrames = queue.Queue()
+        for frameId in range(numberOfFrames):
+            self.freeFrames.put(frameId)
+
+    def acquire(self):
+        '''
+        Returns the id of a free frame, or None if all frames are in use.
+        '''
+        try:
+            return self.freeFrames.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, frameId):
+        self.freeFrames.put(frameId)
+
+    def getNumberOfFreeFrames(self):
+        return self.freeFrames.qsize()
+
+    def getVtkArray(self, frameId):
+        '''
+        Returns a vtkUnsignedCharArray that shares memory with the frame.
+        '''
+        if self.vtkArrays[frameId] is None:
+            from director import vtkNumpy as vnp
+            self.vtkArrays[frameId] = vnp.getVtkFromNumpy(self.frames[frameId].reshape(-1, 3))
+        return self.vtkArrays[frameId]
+
+
+def encodePng(image, compressionLevel=1):
+    '''
+    Returns the bytes of a PNG file for a height x width x channels uint8
+    image, top row first.  zlib releases the interpreter lock while it
+    compresses, so this runs concurrently with the GUI thread.
+    '''
+    height, width, channels = image.shape
+    colorType = {1: 0, 3: 2, 4: 6}[channels]
+    rows = np.empty((height, 1 + width*channels), dtype=np.uint8)
+    rows[:, 0] = 0
+    rows[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, colorType, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), compressionLevel)) + chunk(b'IEND', b''))
+
+
+def getNextFrameIndex(directory, filenameFormat):
+    '''
+    Returns one more than the highest frame index of the files in directory
+    whose names match filenameFormat, a format with one integer field such
+    as 'frame_%07d.png', or 0 if there are none.
+    '''
+    prefix, _, suffix = re.split(r'(%0?\d*d)', filenameFormat, maxsplit=1)
+    pattern = re.compile(re.escape(prefix) + r'(\d+)' + re.escape(suffix) + '$')
+    if not os.path.isdir(directory):
+        return 0
+    indices = [int(match.group(1)) for match in map(pattern.match, os.listdir(directory)) if match]
+    return max(indices) + 1 if indices else 0
+
+
+class ImageFileSink(object):
+    '''
+    Writes each frame to a PNG file in directory.  Numbering continues after
+    the highest numbered frame already in directory, so existing frames are
+    never overwritten.
+    '''
+
+    def __init__(self, directory, filenameFormat='frame_%07d.png', compressionLevel=1):
+        self.directory = directory
+        self.filenameFormat = filenameFormat
+        self.compressionLevel = compressionLevel
+        self.frameCount = getNextFrameIndex(directory, filenameFormat)
+
+    def write(self, frame):
+        filename = os.path.join(self.directory, self.filenameFormat % self.frameCount)
+        self.frameCount += 1
+        with open(filename, 'wb') as f:
+            f.write(encodePng(frame[::-1], self.compressionLevel))
+
+    def close(self):
+        pass
+
+
+def findVideoEncoder():
+    '''
+    Returns the path of ffmpeg or avconv, or None if neither is installed.
+    '''
+    for name in ('ffmpeg', 'avconv'):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+class VideoEncoderSink(object):
+    '''
+    Streams raw rgb24 frames to the stdin of an encoder process, by default
+    ffmpeg or avconv writing an H.264 video to filename.
+    '''
+
+    def __init__(self, filename, width, height, fps, command=None):
+        self.filename = filename
+        if command is None:
+            encoder = findVideoEncoder()
+            if encoder is None:
+                raise Exception('ffmpeg or avconv is required to record video')
+            command = [encoder, '-y', '-loglevel', 'error',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d' % (width, height), '-r', str(fps),
+                       '-i', '-', '-vf', 'vflip',
+                       '-vcodec', 'libx264', '-preset', 'fast', '-crf', '18', '-pix_fmt', 'yuv420p',
+                       filename]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+
+    def write(self, frame):
+        self.process.stdin.write(memoryview(frame).cast('B'))
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        returnCode = self.process.wait()
+        if returnCode != 0:
+            raise Exception('video encoder exited with code %d' % returnCode)
+
+
+class FrameRecorder(object):
+    '''
+    Queues frames from the GUI thread to a sink on a writer thread.
+    '''
+
+    def __init__(self, sink, width, height, poolSize=16):
+        self.sink = sink
+        self.pool = FramePool(poolSize, width, height)
+        self.queue = queue.Queue()
+        self.capturedFrames = 0
+        self.writtenFrames = 0
+        self.droppedFrames = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='FrameRecorder', daemon=True)
+        self.thread.start()
+
+    def getQueueDepth(self):
+        return self.queue.qsize()
+
+    def grabFrame(self, renderWindow):
+        '''
+        Copies the back buffer of renderWindow into a frame and queues it.
+        Returns False if the frame was dropped.
+        '''
+        width, height = renderWindow.GetSize()
+        if (width, height) != (self.pool.width, self.pool.height):
+            return self._dropFrame()
+
+        frameId = self.pool.acquire()
+        if frameId is None:
+            return self._dropFrame()
+
+        renderWindow.GetPixelData(0, 0, width - 1, height - 1, 0, self.pool.getVtkArray(frameId))
+        self._queueFrame(frameId)
+        return True
+
+    def addFrame(self, image):
+        '''
+        Copies a height x width x 3 uint8 image, bottom row first, into a
+        frame and queues it.  Returns False if the frame was dropped.
+        '''
+        frameId = self.pool.acquire()
+        if frameId is None:
+            return self._dropFrame()
+        self.pool.frames[frameId][:] = image
+        self._queueFrame(frameId)
+        return True
+
+    def stop(self):
+        '''
+        Writes the queued frames, closes the sink and raises the first error
+        of the writer thread, if any.
+        '''
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.sink.close()
+        except Exception as e:
+            self.error = self.error or e
+        if self.error is not None:
+            raise self.error
+
+    def _dropFrame(self):
+        self.droppedFrames += 1
+        return False
+
+    def _queueFrame(self, frameId):
+        self.capturedFrames += 1
+        self.queue.put(frameId)
+
+    def _run(self):
+        while True:
+            frameId = self.queue.get()
+            if frameId is None:
+                break
+            try:
+                if self.error is None:
+                    self.sink.write(self.pool.frames[frameId])
+                    self.writtenFrames += 1
+            except Exception as e:
+                self.error = e
+            finally:
+                self.pool.release(frameId)
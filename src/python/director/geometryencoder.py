@@ -1,6 +1,9 @@
 from director import vtkAll as vtk
 from director import vtkNumpy as vnp
+from director import treeviewercodec
 from director.shallowCopy import shallowCopy
+import hashlib
+import zlib
 import numpy as np
 
 def encodePolyData(polyData):
@@ -38,3 +41,224 @@ def decodePolyData(data):
     polyData = vtk.vtkPolyData()
     vtk.vtkCommunicator.UnMarshalDataObject(charArray, polyData)
     return polyData
+
+
+def polyDataToArrays(polyData):
+    '''Given a vtkPolyData, returns a dict of numpy arrays that holds its
+    points, cells and point and cell data exactly.  The dict can be passed
+    to treeviewercodec.encodePayload, and back to polyDataFromArrays.'''
+
+    points = vnp.getNumpyFromVtk(polyData, 'Points') if polyData.GetNumberOfPoints() else np.zeros((0, 3), dtype=np.float32)
+    arrays = dict(points=points, cells={},
+                  pointData=_getFieldArrays(polyData.GetPointData()),
+                  cellData=_getFieldArrays(polyData.GetCellData()))
+
+    for cellType in CELL_TYPES:
+        cells = getattr(polyData, 'Get' + cellType.capitalize())()
+        if cells and cells.GetNumberOfCells():
+            offsets, connectivity = vnp.getNumpyFromCellArray(cells)
+            arrays['cells'][cellType] = dict(offsets=offsets, connectivity=connectivity)
+    return arrays
+
+
+def polyDataFromArrays(arrays):
+    '''Constructs a new vtkPolyData from a dict returned by
+    polyDataToArrays.  The points and data arrays reference the given numpy
+    arrays without copying.'''
+
+    polyData = vtk.vtkPolyData()
+    polyData.SetPoints(vnp.getVtkPointsFromNumpy(arrays['points']))
+    for cellType, cells in arrays['cells'].items():
+        getattr(polyData, 'Set' + cellType.capitalize())(vnp.getCellArrayFromNumpy(cells['offsets'], cells['connectivity']))
+    _setFieldArrays(arrays['pointData'], polyData, 'points')
+    _setFieldArrays(arrays['cellData'], polyData, 'cells')
+    return polyData
+
+
+def computePolyDataHash(polyData):
+    '''Returns a hex digest of the exact content of a vtkPolyData.'''
+    return treeviewercodec.computeContentHash(polyDataToArrays(polyData))
+
+
+def _getFieldArrays(fieldData):
+    normals = fieldData.GetNormals()
+    arrays = []
+    for i in range(fieldData.GetNumberOfArrays()):
+        array = fieldData.GetArray(i)
+        if array is None or not array.GetName() or array.GetDataType() == vtk.VTK_BIT:
+            continue
+        arrays.append(dict(name=array.GetName(), normals=normals is not None and array.GetName() == normals.GetName(),
+                           data=vnp.numpy_support.vtk_to_numpy(array)))
+    return arrays
+
+
+def _setFieldArrays(arrays, polyData, arrayType):
+    fieldData = polyData.GetPointData() if arrayType == 'points' else polyData.GetCellData()
+    for desc in arrays:
+        vnp.addNumpyToVtk(polyData, desc['data'], desc['name'], arrayType=arrayType)
+        if desc['normals']:
+            fieldData.SetNormals(fieldData.GetArray(desc['name']))
+
+
+MESH_FORMAT = 'quantized_mesh'
+MESH_FORMAT_VERSION = 1
+CELL_TYPES = ('verts', 'lines', 'polys', 'strips')
+
+
+def encodeMesh(polyData, quantizationBits=16, compressionLevel=6):
+    '''Given a vtkPolyData, returns a compact description of the mesh as a
+    dict with keys format, version, hash and data, where data is a numpy
+    uint8 array.  Point coordinates are quantized to quantizationBits bits
+    over the bounding box of the mesh, normals are quantized to 8 bits, and
+    cell point ids and quantized coordinates are delta and varint encoded.
+    Other point and cell data arrays are stored exactly.  The result is zlib
+    compressed.  hash is a digest of data that peers can use to recognize a
+    mesh they have already decoded.'''
+
+    assert 1 <= quantizationBits <= 32
+
+    points = vnp.getNumpyFromVtk(polyData, 'Points').astype(np.float64) if polyData.GetNumberOfPoints() else np.zeros((0, 3))
+    pointsMin = points.min(axis=0) if len(points) else np.zeros(3)
+    extent = points.max(axis=0) - pointsMin if len(points) else np.zeros(3)
+    scale = _getQuantizationScale(extent, quantizationBits)
+    quantized = np.round((points - pointsMin) * scale).astype(np.int64)
+
+    mesh = dict(
+        numberOfPoints=len(points),
+        bits=quantizationBits,
+        min=pointsMin.tolist(),
+        extent=extent.tolist(),
+        points=_encodeVarints(_zigzag(np.diff(quantized, axis=0, prepend=0).T.ravel())),
+        cells={},
+        pointData=_encodeArrays(polyData.GetPointData()),
+        cellData=_encodeArrays(polyData.GetCellData()),
+        )
+
+    for cellType in CELL_TYPES:
+        cells = getattr(polyData, 'Get' + cellType.capitalize())()
+        if not cells or not cells.GetNumberOfCells():
+            continue
+        offsets, connectivity = vnp.getNumpyFromCellArray(cells)
+        mesh['cells'][cellType] = dict(
+            sizes=_encodeVarints(np.diff(offsets)),
+            connectivity=_encodeVarints(_zigzag(np.diff(connectivity, prepend=0))))
+
+    data = zlib.compress(treeviewercodec.encodePayload(mesh), compressionLevel)
+    data = np.frombuffer(data, dtype=np.uint8)
+    return dict(format=MESH_FORMAT, version=MESH_FORMAT_VERSION, hash=hashlib.sha1(data).hexdigest(), data=data)
+
+
+def decodeMesh(desc):
+    '''Given a dict returned by encodeMesh, constructs a new vtkPolyData
+    object and returns the result.'''
+
+    if desc.get('format') != MESH_FORMAT or desc.get('version') != MESH_FORMAT_VERSION:
+        raise ValueError('unsupported mesh format: %s %s' % (desc.get('format'), desc.get('version')))
+
+    mesh = treeviewercodec.decodePayload(zlib.decompress(np.asarray(desc['data'], dtype=np.uint8).tobytes()))
+    numberOfPoints = mesh['numberOfPoints']
+
+    deltas = _unzigzag(_decodeVarints(mesh['points'])).reshape(3, numberOfPoints).T
+    quantized = np.cumsum(deltas, axis=0)
+    scale = _getQuantizationScale(np.array(mesh['extent']), mesh['bits'])
+    points = (quantized / scale + np.array(mesh['min'])).astype(np.float32)
+
+    polyData = vtk.vtkPolyData()
+    polyData.SetPoints(vnp.getVtkPointsFromNumpy(points))
+
+    for cellType, cells in mesh['cells'].items():
+        sizes = _decodeVarints(cells['sizes'])
+        offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        connectivity = np.cumsum(_unzigzag(_decodeVarints(cells['connectivity'])))
+        getattr(polyData, 'Set' + cellType.capitalize())(vnp.getCellArrayFromNumpy(offsets, connectivity))
+
+    _decodeArrays(mesh['pointData'], polyData, 'points')
+    _decodeArrays(mesh['cellData'], polyData, 'cells')
+    return polyData
+
+
+def _getQuantizationScale(extent, bits):
+    extent = np.where(extent > 0, extent, 1.0)
+    return (2.0**bits - 1) / extent
+
+
+def _encodeArrays(fieldData):
+    arrays = []
+    normals = fieldData.GetNormals()
+    normalsName = normals.GetName() if normals else None
+
+    for i in range(fieldData.GetNumberOfArrays()):
+        array = fieldData.GetArray(i)
+        if array is None or not array.GetName() or array.GetDataType() == vtk.VTK_BIT:
+            continue
+        values = vnp.numpy_support.vtk_to_numpy(array)
+        desc = dict(name=array.GetName(), normals=array.GetName() == normalsName)
+        if desc['normals'] and values.dtype.kind == 'f':
+            desc['data'] = np.round(np.clip(values, -1.0, 1.0) * 127).astype(np.int8)
+            desc['dtype'] = values.dtype.str
+        else:
+            desc['data'] = np.ascontiguousarray(values)
+        arrays.append(desc)
+    return arrays
+
+
+def _decodeArrays(arrays, polyData, arrayType):
+    fieldData = polyData.GetPointData() if arrayType == 'points' else polyData.GetCellData()
+    for desc in arrays:
+        values = desc['data']
+        if 'dtype' in desc:
+            values = values.astype(desc['dtype']) / 127.0
+            values /= np.maximum(np.linalg.norm(values, axis=1), 1e-12)[:,np.newaxis]
+            values = values.astype(desc['dtype'])
+        else:
+            values = np.array(values)
+        vnp.addNumpyToVtk(polyData, values, desc['name'], arrayType=arrayType)
+        if desc['normals']:
+            fieldData.SetNormals(fieldData.GetArray(desc['name']))
+
+
+def _zigzag(values):
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values):
+    values = np.asarray(values, dtype=np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+
+def _encodeVarints(values):
+    '''Encodes non-negative integers as LEB128 varints, 7 bits per byte with
+    the high bit set on all but the last byte of each value.'''
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return np.zeros(0, dtype=np.uint8)
+
+    numBytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        numBytes += values >= np.uint64(1) << np.uint64(7*k)
+
+    starts = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(numBytes[:-1], out=starts[1:])
+    encoded = np.empty(numBytes.sum(), dtype=np.uint8)
+
+    for k in range(int(numBytes.max())):
+        ids = np.flatnonzero(numBytes > k)
+        byte = (values[ids] >> np.uint64(7*k)) & np.uint64(0x7f)
+        byte |= np.where(numBytes[ids] > k + 1, np.uint64(0x80), np.uint64(0))
+        encoded[starts[ids] + k] = byte
+    return encoded
+
+
+def _decodeVarints(encoded):
+    encoded = np.asarray(encoded, dtype=np.uint8)
+    if not len(encoded):
+        return np.zeros(0, dtype=np.uint64)
+
+    ends = np.flatnonzero(encoded < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    valueIds = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(encoded)) - starts[valueIds]) * 7
+    parts = (encoded & np.uint8(0x7f)).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
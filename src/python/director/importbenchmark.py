@@ -0,0 +1,247 @@
+'''
+Measures how long director modules take to import, to find the modules
+that slow down startup and to catch regressions.
+
+Run it in a new process of the python that runs director, so no module is
+imported beforehand:
+
+    directorPython -m director.importbenchmark
+    directorPython -m director.importbenchmark --baseline times.json --update-baseline
+    directorPython -m director.importbenchmark --baseline times.json
+
+By default it imports the modules that director/startup.py imports at
+startup, in the same order.  ImportTimer records, for every module that
+is imported while it is installed, its self time, which excludes the
+modules it imports, and its cumulative time, which includes them.  With
+--baseline, the times are compared with a previous run and the command
+exits with status 1 if the total or the cumulative time of a requested
+module grew by more than the tolerance.
+'''
+
+import argparse
+import ast
+import importlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+
+class _TimingLoader(object):
+    '''
+    Wraps a loader and times its exec_module calls.
+    '''
+
+    def __init__(self, loader, name, timer):
+        self._loader = loader
+        self._name = name
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit(self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer(object):
+    '''
+    Records the time spent executing each module that is imported while
+    the timer is installed, in the times dict as self_ms and cumulative_ms.
+    Modules that were already imported before are not recorded.
+    '''
+
+    def __init__(self):
+        self.times = OrderedDict()
+        self._stack = []
+        self._finding = False
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+    def find_spec(self, name, path, target=None):
+        if self._finding:
+            return None
+
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimingLoader(spec.loader, name, self)
+        return spec
+
+    def _enter(self, name):
+        # [name, start time, time spent in nested imports]
+        self._stack.append([name, time.time(), 0.0])
+
+    def _exit(self, name):
+        _, startTime, childTime = self._stack.pop()
+        cumulativeTime = time.time() - startTime
+        self.times[name] = dict(self_ms=(cumulativeTime - childTime)*1000.0, cumulative_ms=cumulativeTime*1000.0)
+        if self._stack:
+            self._stack[-1][2] += cumulativeTime
+
+
+def getStartupModules(startupFile=None):
+    '''
+    Returns the names of the director modules that startup.py imports with
+    import statements at module level, in order.  Modules that startup.py
+    loads with lazyimport are not included.
+    '''
+    startupFile = startupFile or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup.py')
+    with open(startupFile) as f:
+        tree = ast.parse(f.read(), startupFile)
+
+    names = []
+
+    def add(name):
+        if name not in names:
+            names.append(name)
+
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] == 'director':
+                    add(alias.name)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == 'director':
+            for alias in node.names:
+                # from director import module, or from director.module import name
+                candidate = '%s.%s' % (node.module, alias.name)
+                add(candidate if _isDirectorModule(candidate) else node.module)
+    return names
+
+
+def _isDirectorModule(name):
+    # checks the source tree, because importlib.util.find_spec would import
+    # the parent modules before they are timed
+    rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(rootDir, *name.split('.'))
+    return os.path.isfile(path + '.py') or os.path.isfile(os.path.join(path, '__init__.py'))
+
+
+def measureImportTimes(moduleNames):
+    '''
+    Imports the modules in order and returns a dict with the total time and
+    the self and cumulative time of every module that was imported.  A
+    requested module that was already imported, by the caller or by an
+    earlier requested module, has times of zero.
+    '''
+    timer = ImportTimer()
+    requested = OrderedDict()
+    startTime = time.time()
+    with timer:
+        for name in moduleNames:
+            wasImported = name in sys.modules
+            importlib.import_module(name)
+            notTimed = dict(self_ms=0.0, cumulative_ms=0.0)
+            requested[name] = notTimed if wasImported else timer.times.get(name, notTimed)
+    totalTime = time.time() - startTime
+
+    return dict(total_ms=totalTime*1000.0, requested=requested, modules=timer.times)
+
+
+def formatReport(results, maxRows=30):
+    lines = ['total import time: %.1f ms' % results['total_ms'], '',
+             '%12s %12s  %s' % ('cumulative', 'self', 'requested module')]
+    for name, times in sorted(results['requested'].items(), key=lambda x: x[1]['cumulative_ms'], reverse=True):
+        lines.append('%9.1f ms %9.1f ms  %s' % (times['cumulative_ms'], times['self_ms'], name))
+
+    lines += ['', '%12s %12s  %s' % ('self', 'cumulative', 'slowest modules by self time')]
+    modules = sorted(results['modules'].items(), key=lambda x: x[1]['self_ms'], reverse=True)
+    for name, times in modules[:maxRows]:
+        lines.append('%9.1f ms %9.1f ms  %s' % (times['self_ms'], times['cumulative_ms'], name))
+    return '\n'.join(lines)
+
+
+def findRegressions(results, baseline, tolerance=0.25, minimumMilliseconds=5.0):
+    '''
+    Returns a list of (name, baselineMilliseconds, milliseconds) for the
+    total and the requested modules whose time exceeds the baseline by more
+    than the fraction tolerance and by more than minimumMilliseconds.  The
+    total is named 'total'.
+    '''
+    def isRegression(before, after):
+        return after > before*(1.0 + tolerance) and after - before > minimumMilliseconds
+
+    regressions = []
+    if isRegression(baseline['total_ms'], results['total_ms']):
+        regressions.append(('total', baseline['total_ms'], results['total_ms']))
+
+    for name, times in results['requested'].items():
+        before = baseline['requested'].get(name)
+        if before is not None and isRegression(before['cumulative_ms'], times['cumulative_ms']):
+            regressions.append((name, before['cumulative_ms'], times['cumulative_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measures the import time of director modules.')
+    parser.add_argument('modules', nargs='*', help='modules to import, the startup.py imports by default')
+    parser.add_argument('--baseline', help='json file of a previous run to compare with')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--output', help='json file to write the results to')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed fractional increase over the baseline')
+    parser.add_argument('--max-rows', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    moduleNames = args.modules or getStartupModules()
+    results = measureImportTimes(moduleNames)
+    print(formatReport(results, args.max_rows))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    if args.update_baseline or not os.path.isfile(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('\nwrote baseline %s' % args.baseline)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = findRegressions(results, baseline, args.tolerance)
+    print('')
+    for name, before, after in regressions:
+        print('regression: %s %.1f ms -> %.1f ms' % (name, before, after))
+    if not regressions:
+        print('no regressions compared to %s' % args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,6 +20,7 @@ class JointController(object):
         self.currentPoseName = None
         self.lastRobotStateMessage = None
         self.ignoreOldStateMessages = False
+        self.modelJointMaps = {}
         self.setPose('q_zero', np.zeros(self.numberOfJoints))
 
     def setJointPosition(self, jointId, position):
@@ -84,17 +85,39 @@ class JointController(object):
             pose = robotstate.convertStateMessageToDrakePose(msg)
             self.lastRobotStateMessage = msg
 
-            # use joint name/positions from robot_state_t and append base_{x,y,z,roll,pitch,yaw}
-            jointPositions = np.hstack((msg.joint_position, pose[:6]))
-            jointNames = msg.joint_name + robotstate.getDrakePoseJointNames()[:6]
-
             self.setPose(poseName, pose, pushToModel=False)
-            for model in self.models:
-                model.model.setJointPositions(jointPositions, jointNames)
+            self.pushStateMessage(msg, pose)
 
         self.subscriber = lcmUtils.addSubscriber(channelName, bot_core.robot_state_t, onRobotStateMessage)
         self.subscriber.setSpeedLimit(60)
 
+    def getModelJointMap(self, model):
+        '''
+        Returns a JointIndexMap to the joint positions of the model.  Maps
+        are cached by the joint names of the model, so a model that is
+        reloaded with different joints gets a new map.
+        '''
+        jointNames = tuple(model.model.getJointNames())
+        jointMap = self.modelJointMaps.get(jointNames)
+        if jointMap is None:
+            jointMap = robotstate.JointIndexMap(jointNames)
+            self.modelJointMaps[jointNames] = jointMap
+        return jointMap
+
+    def pushStateMessage(self, msg, pose):
+        '''
+        Sets the model joint positions from the joint names and positions of
+        a robot_state_t message and the base_{x,y,z,roll,pitch,yaw} of pose.
+        Joints of the model that are not in the message keep their positions.
+        '''
+        baseJointNames = robotstate.getDrakePoseJointNames()[:6]
+        for model in self.models:
+            q = np.array(model.model.getJointPositions())
+            jointMap = self.getModelJointMap(model)
+            jointMap.assign(q, msg.joint_name, msg.joint_position)
+            jointMap.assign(q, baseJointNames, pose[:6])
+            model.model.setJointPositions(q)
+
     def removeLCMUpdater(self):
         lcmUtils.removeSubscriber(self.subscriber)
         self.subscriber = None
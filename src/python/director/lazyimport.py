@@ -0,0 +1,149 @@
+'''
+Defers loading modules and constructing components until they are first
+used, so that startup only pays for what a session needs.
+
+lazyImport returns a placeholder module that imports the real module on
+the first attribute access:
+
+    drilldemo = lazyimport.lazyImport('director.drilldemo')
+    ...
+    drilldemo.DrillPlannerDemo(...)   # director.drilldemo is imported here
+
+LazyComponents holds factories for objects, such as task panels and their
+planners, and calls a factory the first time its component is requested.
+
+The time spent loading each lazy module is recorded, see getLoadTimes()
+and printLoadTimes().
+'''
+
+import importlib
+import sys
+import time
+import types
+from collections import OrderedDict
+
+from director import callbacks
+
+
+_loadTimes = OrderedDict()
+
+
+class LazyModule(types.ModuleType):
+    '''
+    A placeholder for a module that is not imported yet.  Getting or
+    setting an attribute imports the module and forwards to it.
+    '''
+
+    def __init__(self, name):
+        types.ModuleType.__init__(self, name)
+        object.__setattr__(self, '_lazyModule', None)
+
+    def _load(self):
+        module = object.__getattribute__(self, '_lazyModule')
+        if module is None:
+            name = object.__getattribute__(self, '__name__')
+            startTime = time.time()
+            module = importlib.import_module(name)
+            _loadTimes[name] = time.time() - startTime
+            object.__setattr__(self, '_lazyModule', module)
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        name = object.__getattribute__(self, '__name__')
+        state = 'loaded' if isLoaded(self) else 'not loaded'
+        return '<lazy module %r (%s)>' % (name, state)
+
+
+def lazyImport(name):
+    '''
+    Returns the module with the given absolute name if it is already
+    imported, otherwise a LazyModule for it.
+    '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def isLoaded(module):
+    if isinstance(module, LazyModule):
+        return object.__getattribute__(module, '_lazyModule') is not None
+    return True
+
+
+def getLoadTimes():
+    '''
+    Returns a dict of the seconds spent importing each lazy module, in
+    the order they were loaded.
+    '''
+    return OrderedDict(_loadTimes)
+
+
+def printLoadTimes():
+    for name, loadTime in _loadTimes.items():
+        print('%8.1f ms  %s' % (loadTime*1000.0, name))
+
+
+class LazyComponents(object):
+    '''
+    A set of named components that are constructed on first use.  A
+    component is requested with get(name) or as an attribute.
+    '''
+
+    COMPONENT_CREATED_SIGNAL = 'COMPONENT_CREATED_SIGNAL'
+
+    def __init__(self):
+        self.factories = OrderedDict()
+        self.components = OrderedDict()
+        self.callbacks = callbacks.CallbackRegistry([self.COMPONENT_CREATED_SIGNAL])
+
+    def register(self, name, factory):
+        '''
+        Registers a function that takes no arguments and returns the
+        component.
+        '''
+        if name in self.factories:
+            raise Exception('Component %s has already been registered.' % name)
+        self.factories[name] = factory
+
+    def getComponentNames(self):
+        return list(self.factories.keys())
+
+    def isCreated(self, name):
+        return name in self.components
+
+    def get(self, name):
+        if name not in self.components:
+            if name not in self.factories:
+                raise KeyError('Unknown component: %s' % name)
+            component = self.factories[name]()
+            self.components[name] = component
+            self.callbacks.process(self.COMPONENT_CREATED_SIGNAL, name, component)
+        return self.components[name]
+
+    def createAll(self):
+        for name in self.factories:
+            self.get(name)
+
+    def connectComponentCreated(self, func):
+        return self.callbacks.connect(self.COMPONENT_CREATED_SIGNAL, func)
+
+    def disconnectComponentCreated(self, callbackId):
+        self.callbacks.disconnect(callbackId)
+
+    def __getattr__(self, name):
+        if name in self.__dict__.get('factories', {}):
+            return self.get(name)
+        raise AttributeError(name)
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(self.__dict__) | set(self.factories))
@@ -2,11 +2,254 @@ from director import lcmUtils
 from director.timercallback import TimerCallback
 from director.qtutils import BlockSignals
 
+import os
+import queue
+import struct
+import threading
+import time
 import lcm
 import numpy as np
 from PythonQt import QtCore, QtGui
 
 
+class LcmLogIndex(object):
+    '''
+    A seek index for an lcm log file.  For every event in the log the index
+    stores the file offset, the timestamp (relative to the first event) and
+    a channel id.  The index is saved in a sidecar file next to the log and
+    memory-mapped on later opens.  It is only used if the size and mtime of
+    the log file match the values recorded when the index was written.
+
+    File layout (little endian):
+
+        header:         magic, version, channel table size, log size,
+                        log mtime, timestamp offset, number of events
+        channel table:  newline separated channel names, padded to 8 bytes
+        offsets:        int64[numEvents]
+        timestamps:     int64[numEvents]
+        channel ids:    int32[numEvents]
+    '''
+
+    MAGIC = b'DDLOGIDX'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIIqdqq')
+    FILE_SUFFIX = '.idx'
+
+    def __init__(self, filePositions, timestamps, channelIds, channelNames, timestampOffset):
+        self.filePositions = filePositions
+        self.timestamps = timestamps
+        self.channelIds = channelIds
+        self.channelNames = channelNames
+        self.timestampOffset = timestampOffset
+
+    @classmethod
+    def getIndexFilename(cls, logFilename):
+        return logFilename + cls.FILE_SUFFIX
+
+    @staticmethod
+    def _getLogStat(logFilename):
+        st = os.stat(logFilename)
+        return st.st_size, st.st_mtime
+
+    @staticmethod
+    def _padding(size):
+        return -size % 8
+
+    @classmethod
+    def load(cls, logFilename):
+        '''
+        Returns an LcmLogIndex if a valid index file exists for the given log
+        file, otherwise returns None.
+        '''
+        indexFilename = cls.getIndexFilename(logFilename)
+        if not os.path.isfile(indexFilename):
+            return None
+
+        try:
+            logSize, logMtime = cls._getLogStat(logFilename)
+            with open(indexFilename, 'rb') as f:
+                header = f.read(cls.HEADER.size)
+                if len(header) != cls.HEADER.size:
+                    return None
+                magic, version, tableSize, indexLogSize, indexLogMtime, timestampOffset, numEvents = cls.HEADER.unpack(header)
+                if magic != cls.MAGIC or version != cls.VERSION:
+                    return None
+                if indexLogSize != logSize or indexLogMtime != logMtime:
+                    return None
+                channelTable = f.read(tableSize).decode('utf-8')
+
+            dataOffset = cls.HEADER.size + tableSize + cls._padding(tableSize)
+            expectedSize = dataOffset + numEvents*(8 + 8 + 4)
+            if os.path.getsize(indexFilename) != expectedSize:
+                return None
+
+        except (IOError, OSError, struct.error, UnicodeDecodeError):
+            return None
+
+        channelNames = channelTable.split('\n') if channelTable else []
+
+        if numEvents == 0:
+            return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                       np.zeros(0, dtype=np.int32), channelNames, timestampOffset)
+
+        def mapArray(dtype, offset):
+            return np.memmap(indexFilename, dtype=dtype, mode='r', offset=offset, shape=(numEvents,))
+
+        filePositions = mapArray('<i8', dataOffset)
+        timestamps = mapArray('<i8', dataOffset + 8*numEvents)
+        channelIds = mapArray('<i4', dataOffset + 16*numEvents)
+        return cls(filePositions, timestamps, channelIds, channelNames, timestampOffset)
+
+    def save(self, logFilename):
+        '''
+        Writes the index file for the given log file.  The file is written to
+        a temporary name first and then renamed, so a partially written index
+        is never read.  Returns True on success.
+        '''
+        indexFilename = self.getIndexFilename(logFilename)
+        tempFilename = indexFilename + '.tmp%d' % os.getpid()
+
+        channelTable = '\n'.join(self.channelNames).encode('utf-8')
+        numEvents = len(self.timestamps)
+
+        try:
+            logSize, logMtime = self._getLogStat(logFilename)
+            with open(tempFilename, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(channelTable),
+                                         logSize, logMtime, int(self.timestampOffset), numEvents))
+                f.write(channelTable)
+                f.write(b'\0' * self._padding(len(channelTable)))
+                np.asarray(self.filePositions, dtype='<i8').tofile(f)
+                np.asarray(self.timestamps, dtype='<i8').tofile(f)
+                np.asarray(self.channelIds, dtype='<i4').tofile(f)
+            os.replace(tempFilename, indexFilename)
+        except (IOError, OSError) as e:
+            print('failed to write log index file %s: %s' % (indexFilename, e))
+            if os.path.exists(tempFilename):
+                os.remove(tempFilename)
+            return False
+
+        return True
+
+
+class PublishJitterStats(object):
+    '''
+    Histograms of the difference between the scheduled and the actual wall
+    clock publish time of log events during playback.  Offsets are measured
+    in milliseconds, positive offsets are late publishes and negative offsets
+    are early publishes.  The last bin collects all offsets beyond the last
+    bin edge.
+    '''
+
+    def __init__(self, binEdges=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)):
+        self.binEdges = np.asarray(binEdges, dtype=float)
+        self.reset()
+
+    def reset(self):
+        numBins = len(self.binEdges)
+        self.lateCounts = np.zeros(numBins, dtype=np.int64)
+        self.earlyCounts = np.zeros(numBins, dtype=np.int64)
+        self.numEvents = 0
+        self.sumAbsOffset = 0.0
+        self.maxLate = 0.0
+        self.maxEarly = 0.0
+
+    def _binCounts(self, values):
+        bins = np.clip(self.binEdges.searchsorted(values, side='right') - 1, 0, len(self.binEdges) - 1)
+        return np.bincount(bins, minlength=len(self.binEdges))
+
+    def addOffsets(self, offsets):
+        offsets = np.asarray(offsets, dtype=float)
+        if not offsets.size:
+            return
+
+        late = offsets[offsets >= 0]
+        early = -offsets[offsets < 0]
+        self.lateCounts += self._binCounts(late)
+        self.earlyCounts += self._binCounts(early)
+        self.numEvents += offsets.size
+        self.sumAbsOffset += np.abs(offsets).sum()
+        if late.size:
+            self.maxLate = max(self.maxLate, late.max())
+        if early.size:
+            self.maxEarly = max(self.maxEarly, early.max())
+
+    def getMeanAbsOffset(self):
+        return self.sumAbsOffset / self.numEvents if self.numEvents else 0.0
+
+    def getSummary(self):
+        return dict(numEvents=self.numEvents,
+                    meanAbsOffsetMs=self.getMeanAbsOffset(),
+                    maxLateMs=self.maxLate,
+                    maxEarlyMs=self.maxEarly,
+                    binEdgesMs=self.binEdges.tolist(),
+                    late=self.lateCounts.tolist(),
+                    early=self.earlyCounts.tolist())
+
+    def __str__(self):
+        lines = ['events: %d  mean |offset|: %.2f ms  max late: %.2f ms  max early: %.2f ms' %
+                 (self.numEvents, self.getMeanAbsOffset(), self.maxLate, self.maxEarly)]
+        upperEdges = list(self.binEdges[1:]) + [np.inf]
+        for lower, upper, late, early in zip(self.binEdges, upperEdges, self.lateCounts, self.earlyCounts):
+            lines.append('  [%g, %g) ms  late: %d  early: %d' % (lower, upper, late, early))
+        return '\n'.join(lines)
+
+
+class LcmLogReaderThread(object):
+    '''
+    Reads log events ahead of playback on a background thread.  The events
+    selected by the log player's channel filter are read from a separate
+    file handle and put into a bounded queue as (eventIndex, timestamp,
+    channel, data) tuples.  None is put into the queue after the last event.
+    '''
+
+    def __init__(self, logPlayer, startIndex, endTimestamp, maxQueueSize=2000):
+        self.logPlayer = logPlayer
+        self.startIndex = startIndex
+        self.endIndex = int(logPlayer.timestamps.searchsorted(endTimestamp, side='right'))
+        self.queue = queue.Queue(maxQueueSize)
+        self._stopEvent = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        self.thread.join(1.0)
+
+    def getQueueDepth(self):
+        return self.queue.qsize()
+
+    def _put(self, item):
+        while not self._stopEvent.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        player = self.logPlayer
+        log = lcm.EventLog(player.filename, 'r')
+        lastPublish = np.full(len(player.channelNames), -np.inf)
+        readIndex = None
+
+        try:
+            for eventIndex in player._iterSelectedEvents(self.startIndex, self.endIndex, lastPublish):
+                if eventIndex != readIndex:
+                    log.seek(int(player.filePositions[eventIndex]))
+                event = log.read_next_event()
+                readIndex = eventIndex + 1
+                if not self._put((eventIndex, player.timestamps[eventIndex], event.channel, event.data)):
+                    return
+            self._put(None)
+        finally:
+            log.close()
+
+
 class LcmLogPlayer(object):
 
     def __init__(self, lcmHandle=None):
@@ -14,11 +257,54 @@ class LcmLogPlayer(object):
             lcmHandle = lcmUtils.getGlobalLCM()
         self.lcmHandle = lcmHandle
         self.log = None
+        self.filename = None
         self.filePositions = []
+        self.channelIds = np.array([], dtype=np.int32)
+        self.channelNames = []
         self.playbackFactor = 1.0
         self.timer = TimerCallback()
         self.timestamps = np.array([])
         self.timestampOffset = 0.0
+        self.nextEventIndex = 0
+        self.useReaderThread = False
+        self.prefetchSize = 2000
+        self.readerThread = None
+        self.readerThreadPlayback = None
+        self.jitterStats = PublishJitterStats()
+        self.setChannelFilter()
+
+    def setChannelFilter(self, allowChannels=None, denyChannels=None, maxRates=None):
+        '''
+        Restricts playback to a subset of channels.  If allowChannels is given
+        then only those channels are published.  Channels in denyChannels are
+        never published.  maxRates is a dict mapping channel names to a maximum
+        publish rate in Hz, measured in log time.  Events that are filtered out
+        are skipped using the seek index, their payloads are never read.
+        '''
+        self.allowChannels = set(allowChannels) if allowChannels is not None else None
+        self.denyChannels = set(denyChannels or [])
+        self.maxRates = dict(maxRates or {})
+        self._updateChannelFilter()
+
+    def clearChannelFilter(self):
+        self.setChannelFilter()
+
+    def isChannelFilterEnabled(self):
+        return self.allowChannels is not None or bool(self.denyChannels) or bool(self.maxRates)
+
+    def _isChannelAllowed(self, channel):
+        if self.allowChannels is not None and channel not in self.allowChannels:
+            return False
+        return channel not in self.denyChannels
+
+    def _updateChannelFilter(self):
+        self._channelMask = np.array([self._isChannelAllowed(name) for name in self.channelNames], dtype=bool)
+        self._channelMinInterval = np.array([1e6/self.maxRates[name] if self.maxRates.get(name) else 0.0
+                                             for name in self.channelNames])
+        self._resetRateLimits()
+
+    def _resetRateLimits(self):
+        self._channelLastPublish = np.full(len(self.channelNames), -np.inf)
 
     def findEventIndex(self, timestampRequest):
         requestIndex = self.timestamps.searchsorted(timestampRequest)
@@ -29,10 +315,15 @@ class LcmLogPlayer(object):
     def resetPlayPosition(self, playTime):
         self.nextEventIndex = self.findEventIndex(playTime*1e6)
         filepos = self.filePositions[self.nextEventIndex]
-        self.log.seek(filepos)
+        self.log.seek(int(filepos))
+        self._resetRateLimits()
 
     def advanceTime(self, playLength, onFrame=None):
 
+        if self.isChannelFilterEnabled():
+            self._advanceTimeFiltered(playLength, onFrame)
+            return
+
         numEvents = len(self.timestamps)
         if self.nextEventIndex >= numEvents:
             return
@@ -54,7 +345,72 @@ class LcmLogPlayer(object):
             if onFrame and good:
                 onFrame(self.timestamps[self.nextEventIndex] / 1.e6)
 
+    def _iterSelectedEvents(self, startIndex, endIndex, lastPublish):
+        '''
+        Yields the indices of the events in [startIndex, endIndex) that pass
+        the channel filter and rate limits.  lastPublish holds the timestamp
+        of the last selected event per channel id and is updated in place.
+        '''
+        if not self.isChannelFilterEnabled():
+            for eventIndex in range(startIndex, endIndex):
+                yield eventIndex
+            return
+
+        candidates = np.flatnonzero(self._channelMask[self.channelIds[startIndex:endIndex]]) + startIndex
+        minInterval = self._channelMinInterval
+
+        for eventIndex in candidates:
+            channelId = self.channelIds[eventIndex]
+            timestamp = self.timestamps[eventIndex]
+            if timestamp - lastPublish[channelId] < minInterval[channelId]:
+                continue
+            lastPublish[channelId] = timestamp
+            yield eventIndex
+
+    def _advanceTimeFiltered(self, playLength, onFrame=None):
+        '''
+        Implements advanceTime when a channel filter is set.  The events in
+        the time window are selected using the channel ids in the index, then
+        only the selected events are read by seeking to their file offsets.
+        '''
+        numEvents = len(self.timestamps)
+        startIndex = self.nextEventIndex
+        if startIndex >= numEvents:
+            return
+
+        endTimestamp = self.timestamps[startIndex] + playLength*1e6
+        endIndex = max(int(self.timestamps.searchsorted(endTimestamp, side='right')), startIndex + 1)
+
+        # index of the event at the current read position of the log
+        readIndex = startIndex
+
+        for eventIndex in self._iterSelectedEvents(startIndex, endIndex, self._channelLastPublish):
+
+            if eventIndex != readIndex:
+                self.log.seek(int(self.filePositions[eventIndex]))
+
+            event = self.log.read_next_event()
+            readIndex = eventIndex + 1
+
+            self.lcmHandle.publish(event.channel, event.data)
+
+            if onFrame and readIndex < endIndex:
+                onFrame(self.timestamps[readIndex] / 1.e6)
+
+        self.nextEventIndex = endIndex
+        if endIndex < numEvents and readIndex != endIndex:
+            self.log.seek(int(self.filePositions[endIndex]))
+
     def skipToTime(self, timeRequest, playLength=0.0):
+
+        if self.readerThread:
+            # the reader thread has prefetched events from the old position,
+            # so restart threaded playback from the new time
+            endTimestamp, onFrame, onStop = self.readerThreadPlayback
+            startTimestamp = self.timestamps[self.findEventIndex(timeRequest*1e6)]
+            self.playback(timeRequest, max(endTimestamp - startTimestamp, 0.0)*1e-6, onFrame, onStop)
+            return
+
         self.resetPlayPosition(timeRequest)
         self.advanceTime(playLength)
 
@@ -64,9 +420,25 @@ class LcmLogPlayer(object):
 
     def stop(self):
         self.timer.stop()
+        self.stopReaderThread()
+
+    def stopReaderThread(self):
+        if not self.readerThread:
+            return
+        self.readerThread.stop()
+        self.readerThread = None
+        if self.nextEventIndex < len(self.timestamps):
+            self.log.seek(int(self.filePositions[self.nextEventIndex]))
+
+    def getPrefetchQueueDepth(self):
+        return self.readerThread.getQueueDepth() if self.readerThread else 0
 
     def playback(self, startTime, playLength, onFrame=None, onStop=None):
 
+        if self.useReaderThread:
+            self._playbackWithReaderThread(startTime, playLength, onFrame, onStop)
+            return
+
         self.resetPlayPosition(startTime)
 
         startTimestamp = self.timestamps[self.nextEventIndex]
@@ -89,16 +461,115 @@ class LcmLogPlayer(object):
         self.timer.callback = onTick
         self.timer.start()
 
-    def readLog(self, filename, eventTimeFunction=None, progressFunction=None):
+    def _playbackWithReaderThread(self, startTime, playLength, onFrame=None, onStop=None):
+        '''
+        Implements playback with disk reads done by an LcmLogReaderThread.
+        Each timer tick publishes the prefetched events that are due by the
+        middle of the next tick, so publish offsets are centered on zero, and
+        records the publish offsets in self.jitterStats.
+        '''
+        self.stopReaderThread()
+        self.resetPlayPosition(startTime)
+
+        startTimestamp = self.timestamps[self.nextEventIndex]
+        endTimestamp = startTimestamp + playLength*1e6
+
+        reader = LcmLogReaderThread(self, self.nextEventIndex, endTimestamp, self.prefetchSize)
+        self.readerThread = reader
+        self.readerThreadPlayback = (endTimestamp, onFrame, onStop)
+        reader.start()
+
+        # maps wall clock time to log time, re-anchored when playbackFactor changes
+        clock = dict(wallTime=time.time(), logTime=startTimestamp, factor=self.playbackFactor)
+        pendingEvents = []
+
+        def updateClock(now):
+            if self.playbackFactor != clock['factor']:
+                clock['logTime'] += (now - clock['wallTime'])*1e6*clock['factor']
+                clock['wallTime'] = now
+                clock['factor'] = self.playbackFactor
+
+        def getNextEvent():
+            if pendingEvents:
+                return pendingEvents.pop()
+            return reader.queue.get_nowait()
+
+        def onTick():
+            now = time.time()
+            updateClock(now)
+            factor = clock['factor']
+            dueTime = clock['logTime'] + (now - clock['wallTime'] + 0.5/self.timer.targetFps)*1e6*factor
+
+            offsets = []
+            finished = False
+
+            while True:
+                try:
+                    item = getNextEvent()
+                except queue.Empty:
+                    break
+
+                if item is None:
+                    finished = True
+                    break
+
+                eventIndex, timestamp, channel, data = item
+                if timestamp > dueTime:
+                    pendingEvents.append(item)
+                    break
+
+                self.lcmHandle.publish(channel, data)
+                self.nextEventIndex = eventIndex + 1
+
+                scheduledTime = clock['wallTime'] + (timestamp - clock['logTime'])*1e-6/factor
+                offsets.append((time.time() - scheduledTime)*1e3)
+
+            self.jitterStats.addOffsets(offsets)
+
+            if finished:
+                self.nextEventIndex = reader.endIndex
+                self.stopReaderThread()
+                if onStop:
+                    onStop()
+                return False
+
+            if onFrame:
+                onFrame(min(dueTime, endTimestamp) / 1.e6)
+            return True
+
+        self.timer.callback = onTick
+        self.timer.start()
+
+    def readLog(self, filename, eventTimeFunction=None, progressFunction=None, useIndex=True):
+        '''
+        Opens the log file and builds the seek table used for playback.  If
+        useIndex is True the seek table is loaded from a sidecar index file
+        when one exists and is up to date, otherwise the log is scanned and
+        the index file is written.  The index is not used when a custom
+        eventTimeFunction is given.
+        '''
+        self.stopReaderThread()
         log = lcm.EventLog(filename, 'r')
         self.log = log
+        self.filename = filename
+
+        useIndex = useIndex and eventTimeFunction is None
+
+        if useIndex:
+            index = LcmLogIndex.load(filename)
+            if index is not None:
+                self._setIndex(index)
+                return
 
         timestamps = []
         filePositions = []
+        channelIds = []
+        channelMap = {}
         offsetIsDefined = False
         timestampOffset = 0
         lastEventTimestamp = 0
         nextProgressTime = 0.0
+        completed = True
 
         while True:
 
@@ -127,14 +598,32 @@ class LcmLogPlayer(object):
                 if progressTime >= nextProgressTime:
                     nextProgressTime += 1.0
                     if not progressFunction(timestamp*1e-6):
+                        completed = False
                         break
 
+            channelId = channelMap.get(event.channel)
+            if channelId is None:
+                channelId = channelMap[event.channel] = len(channelMap)
+
             filePositions.append(filepos)
             timestamps.append(timestamp)
+            channelIds.append(channelId)
 
-        self.filePositions = filePositions
-        self.timestamps = np.array(timestamps)
-        self.timestampOffset = timestampOffset
+        channelNames = sorted(channelMap, key=channelMap.get)
+        index = LcmLogIndex(np.array(filePositions, dtype=np.int64), np.array(timestamps),
+                            np.array(channelIds, dtype=np.int32), channelNames, timestampOffset)
+        self._setIndex(index)
+
+        if useIndex and completed:
+            index.save(filename)
+
+    def _setIndex(self, index):
+        self.filePositions = index.filePositions
+        self.timestamps = index.timestamps
+        self.channelIds = index.channelIds
+        self.channelNames = index.channelNames
+        self.timestampOffset = index.timestampOffset
+        self._updateChannelFilter()
 
 
 class LcmLogPlayerGui(object):
@@ -187,7 +676,7 @@ class LcmLogPlayerGui(object):
         self.logPlayer.playback(self._getSliderTime(), self.logPlayer.getEndTime(), self._updateTime)
 
     def onStop(self):
-        self.logPlayer.timer.stop()
+        self.logPlayer.stop()
 
     def skipTo(self, t):
         self._updateTime(t)
@@ -217,6 +706,7 @@ if __name__ == '__main__':
     print('reading', filename)
 
     logPlayer = LcmLogPlayer()
+    logPlayer.useReaderThread = True
     logPlayer.readLog(filename)
 
     gui = LcmLogPlayerGui(logPlayer)
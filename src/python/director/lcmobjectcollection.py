@@ -5,6 +5,8 @@ import json
 from collections import OrderedDict
 from director.thirdparty import numpyjsoncoder
 from director import callbacks
+from director import numpyjsonbinary
+from director import treeviewercodec
 from director.utime import getUtime
 from director.uuidutil import newUUID
 
@@ -17,30 +19,83 @@ except ImportError:
 if USE_LCM:
     from director import lcmUtils
 
+try:
+    import robotlocomotion as lcmrl
+    USE_BINARY = USE_LCM
+except ImportError:
+    USE_BINARY = False
+
 
 class LCMObjectCollection(object):
+    '''
+    A collection of descriptions, dicts identified by a uuid, that is kept in
+    sync between processes over an LCM channel.
+
+    Each description has a version number and a content digest.  A local
+    change increments the version past any version seen for that
+    description, and updates received from peers are applied only if their
+    content differs and they are newer than the local copy, so unchanged
+    descriptions do not fire update callbacks.  Of two copies with the same
+    version, the one with the greater digest is newer, so concurrent edits
+    converge to the same copy on every peer.
+
+    An echo request carries the version and digest of every local
+    description.  Peers answer with only the descriptions that the
+    requester is missing or holds an older, different copy of, split into
+    messages of at most maxDescriptionsPerMessage descriptions.
+
+    Commands are sent as JSON system_status_t messages on channel unless
+    binaryEnabled is set.  Processes that predate the binary encoding and
+    only listen cannot be detected, so set binaryEnabled only when every
+    process on the channel supports it.  A new collection announces itself
+    and peers answer, and every command says whether its sender can decode
+    the binary numpyjsonbinary encoding.  With binaryEnabled, commands are
+    sent as binary viewer2_comms_t messages on channel + '_BINARY' while at
+    least one peer has been heard from within peerTimeout seconds and all
+    such peers support it.  Echo responses are binary if binaryEnabled is
+    set and the requester supports it.
+    '''
 
     DESCRIPTION_UPDATED_SIGNAL = 'DESCRIPTION_UPDATED_SIGNAL'
     DESCRIPTION_REMOVED_SIGNAL = 'DESCRIPTION_REMOVED_SIGNAL'
 
     def __init__(self, channel):
         self.collection = OrderedDict()
+        self.versions = {}
+        self.digests = {}
+        self.maxDescriptionsPerMessage = 20
         self.collectionId = newUUID()
         self.sentCommands = set()
         self.sentRequest = None
         self.channel = channel
+        self.binaryChannel = channel + '_BINARY'
+        self.binarySupported = USE_BINARY
+        self.binaryEnabled = False
+        self.peerTimeout = 60.0
+        self.peerBinarySupport = {}
+        self.peerLastHeard = {}
         self.callbacks = callbacks.CallbackRegistry([self.DESCRIPTION_UPDATED_SIGNAL,
                                                      self.DESCRIPTION_REMOVED_SIGNAL])
         self.sub = None
+        self.binarySub = None
         self._modified()
 
         if USE_LCM:
             self.sub = lcmUtils.addSubscriber(self.channel, messageClass=lcmbotcore.system_status_t, callback=self._onCommandMessage)
             self.sub.setNotifyAllMessagesEnabled(True)
 
+        if USE_BINARY:
+            self.binarySub = lcmUtils.addSubscriber(self.binaryChannel, messageClass=lcmrl.viewer2_comms_t, callback=self._onBinaryCommandMessage)
+            self.binarySub.setNotifyAllMessagesEnabled(True)
+
+        if USE_LCM:
+            self._publishCommand('announce', reply=True)
+
     def __del__(self):
         if self.sub:
             lcmUtils.removeSubscriber(self.sub)
+        if self.binarySub:
+            lcmUtils.removeSubscriber(self.binarySub)
 
     def connectDescriptionUpdated(self, func):
         return self.callbacks.connect(self.DESCRIPTION_UPDATED_SIGNAL, func)
@@ -63,15 +118,56 @@ class LCMObjectCollection(object):
     def getDescription(self, descriptionId):
         return self.collection[descriptionId]
 
+    def getVersion(self, descriptionId):
+        return self.versions.get(descriptionId, 0)
+
+    def getDigest(self, descriptionId):
+        return self.digests.get(descriptionId)
+
+    def getSummary(self):
+        '''
+        Returns a dict that maps each description id to its [version, digest].
+        '''
+        return {descId: [self.versions[descId], self.digests[descId]] for descId in self.collection}
+
     def updateDescription(self, desc, publish=True, notify=True):
-        self.collection[self.getDescriptionId(desc)] = desc
+        descId = self.getDescriptionId(desc)
+        digest = computeDescriptionDigest(desc)
+        if digest != self.digests.get(descId):
+            self.versions[descId] = self.getVersion(descId) + 1
+            self.digests[descId] = digest
+
+        self.collection[descId] = desc
         self._modified()
         if publish and USE_LCM:
-            msg = self._newCommandMessage('update', description=desc)
-            lcmUtils.publish(self.channel, msg)
+            self._publishCommand('update', description=desc, version=self.versions[descId])
 
         if notify:
-            self.callbacks.process(self.DESCRIPTION_UPDATED_SIGNAL, self, self.getDescriptionId(desc))
+            self.callbacks.process(self.DESCRIPTION_UPDATED_SIGNAL, self, descId)
+
+    def mergeDescription(self, desc, version=None):
+        '''
+        Applies a description received from a peer.  The description is
+        ignored if it is unchanged, or if the local description with
+        different content is newer, see isNewer().  Returns True if the
+        description was updated.
+        '''
+        descId = self.getDescriptionId(desc)
+        digest = computeDescriptionDigest(desc)
+        if descId in self.collection:
+            if digest == self.digests.get(descId):
+                if version is not None:
+                    self.versions[descId] = max(self.versions[descId], version)
+                return False
+            if version is not None and not isNewer(version, digest, self.versions[descId], self.digests[descId]):
+                return False
+
+        self.collection[descId] = desc
+        self.versions[descId] = version if version is not None else self.getVersion(descId) + 1
+        self.digests[descId] = digest
+        self._modified()
+        self.callbacks.process(self.DESCRIPTION_UPDATED_SIGNAL, self, descId)
+        return True
 
     def removeDescription(self, descriptionId, publish=True, notify=True):
 
@@ -80,68 +176,179 @@ class LCMObjectCollection(object):
             self._modified()
         except KeyError:
             pass
+        self.versions.pop(descriptionId, None)
+        self.digests.pop(descriptionId, None)
 
         if publish and USE_LCM:
-            msg = self._newCommandMessage('remove', descriptionId=descriptionId,)
-            lcmUtils.publish(self.channel, msg)
+            self._publishCommand('remove', descriptionId=descriptionId)
 
         if notify:
             self.callbacks.process(self.DESCRIPTION_REMOVED_SIGNAL, self, descriptionId)
 
     def sendEchoRequest(self):
         self.sentRequest = newUUID()
-        msg = self._newCommandMessage('echo_request', requestId=self.sentRequest)
-        lcmUtils.publish(self.channel, msg)
+        self._publishCommand('echo_request', requestId=self.sentRequest, summary=self.getSummary())
 
 
-    def sendEchoResponse(self, requestId=None):
+    def sendEchoResponse(self, requestId=None, summary=None, binary=None):
+        '''
+        Publishes the descriptions that differ from the given summary of a
+        peer's collection, or all descriptions if summary is None.  If
+        binary is given it overrides the choice of encoding.
+        '''
         if requestId is None:
             requestId = newUUID()
-        msg = self._newCommandMessage('echo_response', requestId=requestId, descriptions=self.collection)
-        lcmUtils.publish(self.channel, msg)
+
+        descIds = self.getDescriptionsToSend(summary)
+        if not descIds and summary is not None:
+            return
+
+        batchSize = max(self.maxDescriptionsPerMessage, 1)
+        for start in range(0, max(len(descIds), 1), batchSize):
+            batch = descIds[start:start + batchSize]
+            descriptions = OrderedDict((descId, self.collection[descId]) for descId in batch)
+            versions = {descId: self.versions[descId] for descId in batch}
+            self._publishCommand('echo_response', binary=binary, requestId=requestId, descriptions=descriptions, versions=versions)
+
+    def getDescriptionsToSend(self, summary):
+        '''
+        Returns the ids of the descriptions a peer with the given summary is
+        missing or holds an older, different copy of.
+        '''
+        if summary is None:
+            return list(self.collection.keys())
+
+        descIds = []
+        for descId in self.collection:
+            remote = summary.get(descId)
+            if remote is None:
+                descIds.append(descId)
+                continue
+            remoteVersion, remoteDigest = remote
+            if remoteDigest != self.digests[descId] and isNewer(self.versions[descId], self.digests[descId], remoteVersion, remoteDigest):
+                descIds.append(descId)
+        return descIds
 
     def handleEchoResponse(self, data):
         #if data['requestId'] != self.sentRequest:
         #    return
 
         self.sentRequest = None
-        for desc in list(data['descriptions'].values()):
-            self.updateDescription(desc, publish=False)
+        versions = data.get('versions', {})
+        for descId, desc in list(data['descriptions'].items()):
+            self.mergeDescription(desc, versions.get(descId))
 
     def _modified(self):
         self.mtime = getUtime()
 
-    def _newCommandMessage(self, commandName, **commandArgs):
+    def getPeers(self):
+        '''
+        Returns the collection ids of the peers heard from within
+        peerTimeout seconds, and forgets the others.
+        '''
+        now = time.time()
+        for peerId, lastHeard in list(self.peerLastHeard.items()):
+            if now - lastHeard > self.peerTimeout:
+                del self.peerLastHeard[peerId]
+                del self.peerBinarySupport[peerId]
+        return list(self.peerLastHeard.keys())
+
+    def useBinary(self):
+        '''
+        Returns True if commands should be published with the binary
+        encoding, that is if binaryEnabled is set, at least one peer has been
+        heard from recently and every such peer supports it.
+        '''
+        if not self.binaryEnabled or not self.binarySupported:
+            return False
+        peers = self.getPeers()
+        return bool(peers) and all(self.peerBinarySupport[peerId] for peerId in peers)
+
+    def _newCommandData(self, commandName, **commandArgs):
         commandId = newUUID()
         self.sentCommands.add(commandId)
         commandArgs['commandId'] = commandId
         commandArgs['collectionId'] = self.collectionId
         commandArgs['command'] = commandName
+        commandArgs['binary'] = self.binarySupported
+        return commandArgs
+
+    def _newCommandMessage(self, commandName, **commandArgs):
         msg = lcmbotcore.system_status_t()
-        msg.value = numpyjsoncoder.encode(commandArgs)
+        msg.value = numpyjsoncoder.encode(self._newCommandData(commandName, **commandArgs))
         msg.utime = getUtime()
         return msg
 
+    def _newBinaryCommandMessage(self, commandName, **commandArgs):
+        msg = lcmrl.viewer2_comms_t()
+        msg.utime = getUtime()
+        msg.format = 'numpyjson_binary'
+        msg.format_version_major = 1
+        msg.format_version_minor = 0
+        msg.data = numpyjsonbinary.encode(self._newCommandData(commandName, **commandArgs))
+        msg.num_bytes = len(msg.data)
+        return msg
+
+    def _publishCommand(self, commandName, binary=None, **commandArgs):
+        binary = self.useBinary() if binary is None else (binary and self.binaryEnabled and self.binarySupported)
+        if binary:
+            lcmUtils.publish(self.binaryChannel, self._newBinaryCommandMessage(commandName, **commandArgs))
+        else:
+            lcmUtils.publish(self.channel, self._newCommandMessage(commandName, **commandArgs))
+
+    def _onBinaryCommandMessage(self, msg):
+        if msg.format != 'numpyjson_binary' or msg.format_version_major != 1:
+            print('LCMObjectCollection: ignoring message with unsupported format %s %d.%d' % (msg.format, msg.format_version_major, msg.format_version_minor))
+            return
+        self._handleCommand(numpyjsonbinary.decode(bytes(msg.data)))
+
     def _onCommandMessage(self, msg):
+        self._handleCommand(numpyjsoncoder.decode(msg.value))
 
-        data = numpyjsoncoder.decode(msg.value)
+    def _handleCommand(self, data):
 
         commandId = data['commandId']
         if commandId in self.sentCommands:
             self.sentCommands.remove(commandId)
             return
 
+        # peers that predate the binary encoding do not send the binary key
+        peerSupportsBinary = data.get('binary', False)
+        self.peerBinarySupport[data['collectionId']] = peerSupportsBinary
+        self.peerLastHeard[data['collectionId']] = time.time()
+
         command = data['command']
 
-        if command == 'update':
-            desc = data['description']
-            self.updateDescription(desc, publish=False)
+        if command == 'announce':
+            if data.get('reply'):
+                self._publishCommand('announce', binary=False, reply=False)
+
+        elif command == 'update':
+            self.mergeDescription(data['description'], data.get('version'))
 
         elif command == 'remove':
             self.removeDescription(data['descriptionId'], publish=False)
 
         elif command == 'echo_request':
-            self.sendEchoResponse(data['requestId'])
+            self.sendEchoResponse(data['requestId'], data.get('summary'), binary=peerSupportsBinary)
 
         elif command == 'echo_response':
             self.handleEchoResponse(data)
+
+
+def isNewer(version, digest, otherVersion, otherDigest):
+    '''
+    Returns True if a description with the given version and digest wins
+    over a different copy with otherVersion and otherDigest.  The higher
+    version wins.  Two peers that edit the same description concurrently
+    can produce equal versions, and then the greater digest wins, so every
+    peer settles on the same copy.
+    '''
+    return (version, digest) > (otherVersion, otherDigest)
+
+
+def computeDescriptionDigest(desc):
+    '''
+    Returns a hex digest of the content of a description.
+    '''
+    return treeviewercodec.computeContentHash(desc)
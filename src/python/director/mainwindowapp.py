@@ -246,6 +246,9 @@ class MainWindowAppFactory(object):
             propertiesDock.setVisible(newState)
 
         applogic.addShortcut(app.mainWindow, 'F1', toggleObjectModelDock)
+
+        from director import profiler
+        applogic.addShortcut(app.mainWindow, 'Ctrl+F10', profiler.toggle_sampling_profiler)
         #applogic.addShortcut(app.mainWindow, 'F8', app.showPythonConsole)
 
         return FieldContainer(
@@ -302,6 +305,7 @@ class MainWindowAppFactory(object):
         from director.debugVis import DebugData
         from director.timercallback import TimerCallback
         from director.fieldcontainer import FieldContainer
+        from director import profiler
         import numpy as np
         import os
         import sys
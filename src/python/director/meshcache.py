@@ -0,0 +1,158 @@
+'''
+Content addressed on-disk cache for meshes.
+
+Each mesh is stored once under the hash of its content, as a
+treeviewercodec payload of its point, cell and data arrays.  Loading a mesh
+memory maps the file, so the points and data arrays are paged in from disk
+on demand instead of being parsed.  Meshes exported for other tools, such as
+the STL files used by URDF export, are stored in the same directory under
+the same hash.
+
+The total size of the directory is capped.  When a store exceeds the cap,
+the least recently used files are removed.  Use time is recorded as the
+file modification time, which is updated on every load.
+
+Eviction cannot know which files another process still needs, so by
+default every MeshCache uses its own temporary directory, which is removed
+when the process exits.
+'''
+
+import atexit
+import mmap
+import os
+import shutil
+import tempfile
+
+from director import geometryencoder
+from director import ioUtils
+from director import treeviewercodec
+
+
+class MeshCache(object):
+
+    MESH_EXTENSION = 'mesh'
+
+    def __init__(self, directory=None, maxSizeBytes=512*1024*1024):
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='director_mesh_cache_')
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        self.directory = directory
+        self.maxSizeBytes = maxSizeBytes
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def getFilename(self, contentHash, extension=MESH_EXTENSION):
+        return os.path.join(self.directory, '%s.%s' % (contentHash, extension))
+
+    def contains(self, contentHash, extension=MESH_EXTENSION):
+        return os.path.isfile(self.getFilename(contentHash, extension))
+
+    def store(self, contentHash, polyData, protectedHashes=()):
+        '''
+        Writes polyData to the cache unless a file for contentHash already
+        exists.  Returns the filename.
+        '''
+        filename = self.getFilename(contentHash)
+        if os.path.isfile(filename):
+            self._touch(filename)
+            return filename
+
+        payload = treeviewercodec.encodePayload(geometryencoder.polyDataToArrays(polyData))
+        self._writeFile(filename, lambda tempFilename: self._writeBytes(tempFilename, payload))
+        self.evict(protectedHashes)
+        return filename
+
+    def load(self, contentHash):
+        '''
+        Returns a vtkPolyData for contentHash whose arrays are memory mapped
+        from the cache file, or None if the mesh is not cached.
+        '''
+        filename = self.getFilename(contentHash)
+        try:
+            with open(filename, 'rb') as f:
+                # a private copy on write mapping gives writable arrays for vtk
+                # without modifying the file
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (IOError, OSError, ValueError):
+            return None
+
+        self._touch(filename)
+        return geometryencoder.polyDataFromArrays(treeviewercodec.decodePayload(data))
+
+    def getExportFilename(self, contentHash, polyData, dataType='stl', protectedHashes=()):
+        '''
+        Returns the name of a file in a format readable by ioUtils.readPolyData
+        and other tools, writing it if it is not cached.
+        '''
+        filename = self.getFilename(contentHash, dataType)
+        if os.path.isfile(filename):
+            self._touch(filename)
+            return filename
+
+        # the writer is chosen by extension, so the temp file keeps it
+        self._writeFile(filename, lambda tempFilename: ioUtils.writePolyData(polyData, tempFilename), dataType)
+        self.evict(protectedHashes)
+        return filename
+
+    def getSize(self):
+        return sum(size for _, size, _ in self._listFiles())
+
+    def evict(self, protectedHashes=()):
+        '''
+        Removes the least recently used files until the cache is no larger
+        than maxSizeBytes.  Files whose hash is in protectedHashes are kept,
+        whatever their extension.
+        '''
+        files = self._listFiles()
+        totalSize = sum(size for _, size, _ in files)
+        if totalSize <= self.maxSizeBytes:
+            return
+
+        protectedHashes = set(protectedHashes)
+        for filename, size, _ in sorted(files, key=lambda x: x[2]):
+            if totalSize <= self.maxSizeBytes:
+                break
+            if self._getHash(filename) in protectedHashes:
+                continue
+            try:
+                os.remove(filename)
+                totalSize -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        for filename, _, _ in self._listFiles():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def _listFiles(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and '.tmp' not in entry.name:
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    @staticmethod
+    def _getHash(filename):
+        return os.path.basename(filename).split('.', 1)[0]
+
+    def _touch(self, filename):
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _writeBytes(filename, data):
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def _writeFile(self, filename, writeFunction, extension=MESH_EXTENSION):
+        # write to a temp file and rename it so that other processes sharing
+        # the cache never read a partial file
+        tempFilename = '%s.tmp%d.%s' % (os.path.splitext(filename)[0], os.getpid(), extension)
+        writeFunction(tempFilename)
+        os.replace(tempFilename, filename)
@@ -1,45 +1,163 @@
 from director import lcmobjectcollection
 from director import geometryencoder
-from director import ioUtils
+from director import meshcache
 from director.uuidutil import newUUID
-import os
+from collections import OrderedDict
 
 
 class MeshManager(object):
+    '''
+    Shares meshes between processes through an LCMObjectCollection.  Every
+    mesh is identified by the hash of its content.  Only the most recently
+    used meshes are kept in memory.  A mesh is written to a MeshCache on disk
+    when it leaves memory, and is loaded back from the cache when requested.
+    The cache does not evict the files of meshes known to this manager until
+    they are removed.  If a file is missing anyway, the mesh is decoded again
+    from its description in the collection.
 
-    def __init__(self):
-        self.meshes = {}
-        self.cacheDirectory = '/tmp'
+    Meshes are published with the lossless encodePolyData encoding by
+    default.  The quantized encodeMesh encoding is much smaller but lossy,
+    and peers that predate it cannot decode it, so set useQuantizedEncoding
+    only when every process sharing the collection supports it.
+    '''
+
+    def __init__(self, cacheDirectory=None, maxCacheSizeBytes=512*1024*1024, maxMeshesInMemory=64):
+        self.meshes = OrderedDict()
+        self.meshContentHashes = {}
+        self.meshHashes = {}
+        self.maxMeshesInMemory = maxMeshesInMemory
+        self.cache = meshcache.MeshCache(cacheDirectory, maxCacheSizeBytes)
         self.cacheDataType = 'stl'
+        self.useQuantizedEncoding = False
+        self.quantizationBits = 16
         self.collection = lcmobjectcollection.LCMObjectCollection(channel='MESH_COLLECTION_COMMAND')
         self.collection.connectDescriptionUpdated(self._onDescriptionUpdated)
+        self.collection.connectDescriptionRemoved(self._onDescriptionRemoved)
 
     def add(self, polyData, publish=True):
         meshId = newUUID()
-        self.meshes[meshId] = polyData
+        self._addMesh(meshId, polyData)
         if publish and self.collection:
-            self._publishMesh(meshId)
+            self._publishMesh(meshId, polyData)
         return meshId
 
+    def remove(self, meshId, publish=True):
+        self._removeMesh(meshId)
+        if self.collection:
+            self.collection.removeDescription(meshId, publish=publish, notify=False)
+
     def get(self, meshId):
-        return self.meshes.get(meshId)
+        contentHash = self.meshContentHashes.get(meshId)
+        if contentHash is None:
+            return None
+
+        polyData = self.meshes.get(contentHash)
+        if polyData is not None:
+            self.meshes.move_to_end(contentHash)
+            return polyData
+
+        polyData = self.cache.load(contentHash)
+        if polyData is None:
+            polyData = self._decodeFromCollection(meshId)
+        if polyData is not None:
+            self._keepInMemory(contentHash, polyData)
+        return polyData
 
     def getFilesystemFilename(self, meshId):
-        if meshId in self.meshes:
-            filename = os.path.join(self.cacheDirectory, '%s.%s' % (meshId, self.cacheDataType))
-            if not os.path.isfile(filename):
-                ioUtils.writePolyData(self.get(meshId), filename)
-            return filename
-        return None
+        contentHash = self.meshContentHashes.get(meshId)
+        if contentHash is None:
+            return None
+        if self.cache.contains(contentHash, self.cacheDataType):
+            return self.cache.getExportFilename(contentHash, None, self.cacheDataType)
+        polyData = self.get(meshId)
+        if polyData is None:
+            return None
+        return self.cache.getExportFilename(contentHash, polyData, self.cacheDataType, self._getProtectedHashes())
+
+    def _addMesh(self, meshId, polyData):
+        contentHash = geometryencoder.computePolyDataHash(polyData)
+        self.meshContentHashes[meshId] = contentHash
+        self._keepInMemory(contentHash, polyData)
+
+    def _removeMesh(self, meshId):
+        contentHash = self.meshContentHashes.pop(meshId, None)
+        if contentHash is None:
+            return
+
+        sameContentIds = [otherId for otherId, otherHash in self.meshContentHashes.items() if otherHash == contentHash]
+        for meshHash, hashMeshId in list(self.meshHashes.items()):
+            if hashMeshId != meshId:
+                continue
+            if sameContentIds:
+                self.meshHashes[meshHash] = sameContentIds[0]
+            else:
+                del self.meshHashes[meshHash]
+
+        if not sameContentIds:
+            self.meshes.pop(contentHash, None)
 
-    def _publishMesh(self, meshId):
-        polyData = self.meshes[meshId]
-        self.collection.updateDescription(dict(uuid=meshId, data=geometryencoder.encodePolyData(polyData)), notify=False)
+    def _keepInMemory(self, contentHash, polyData):
+        self.meshes[contentHash] = polyData
+        self.meshes.move_to_end(contentHash)
+        while len(self.meshes) > self.maxMeshesInMemory:
+            # meshes are written to the disk cache only when they leave
+            # memory, so adding or decoding a mesh does not write a file
+            droppedHash, droppedPolyData = self.meshes.popitem(last=False)
+            self.cache.store(droppedHash, droppedPolyData, self._getProtectedHashes())
+
+    def _getProtectedHashes(self):
+        # the meshes that are not removed must stay loadable from the disk
+        # cache after they leave memory
+        return set(self.meshContentHashes.values())
+
+    def _decodeFromCollection(self, meshId):
+        if not self.collection:
+            return None
+        try:
+            desc = self.collection.getDescription(meshId)
+        except KeyError:
+            return None
+        return self._decodeDescription(desc)
+
+    @staticmethod
+    def _decodeDescription(desc):
+        if 'format' in desc:
+            try:
+                return geometryencoder.decodeMesh(desc)
+            except ValueError as e:
+                print('MeshManager: cannot decode mesh %s: %s' % (desc['uuid'], e))
+                return None
+        return geometryencoder.decodePolyData(desc['data'])
+
+    def _publishMesh(self, meshId, polyData):
+        if self.useQuantizedEncoding:
+            desc = geometryencoder.encodeMesh(polyData, quantizationBits=self.quantizationBits)
+            self.meshHashes[desc['hash']] = meshId
+            desc['uuid'] = meshId
+        else:
+            desc = dict(uuid=meshId, data=geometryencoder.encodePolyData(polyData))
+        self.collection.updateDescription(desc, notify=False)
 
     def _onDescriptionUpdated(self, collection, descriptionId):
         desc = collection.getDescription(descriptionId)
         meshId = desc['uuid']
-        if meshId not in self.meshes:
-            polyData = geometryencoder.decodePolyData(desc['data'])
-            self.meshes[meshId] = polyData
-            #print 'decoded polydata with %d points' % polyData.GetNumberOfPoints()
+        if meshId in self.meshContentHashes:
+            return
+
+        meshHash = desc.get('hash')
+        if meshHash in self.meshHashes:
+            # the same mesh content is already decoded under another id
+            self.meshContentHashes[meshId] = self.meshContentHashes[self.meshHashes[meshHash]]
+            return
+
+        polyData = self._decodeDescription(desc)
+        if polyData is None:
+            return
+
+        self._addMesh(meshId, polyData)
+        if meshHash is not None:
+            self.meshHashes[meshHash] = meshId
+        #print 'decoded polydata with %d points' % polyData.GetNumberOfPoints()
+
+    def _onDescriptionRemoved(self, collection, descriptionId):
+        self._removeMesh(descriptionId)
@@ -0,0 +1,31 @@
+'''
+Binary framing of the numpyjsoncoder data model.
+
+encode() returns bytes that start with BINARY_MAGIC followed by a
+director.treeviewercodec payload: a JSON header and the raw array buffers,
+each aligned to 8 bytes.  decode() returns arrays that are views into the
+payload without copying, and also accepts the JSON strings written by
+numpyjsoncoder.encode().
+'''
+
+from director import treeviewercodec
+from director.thirdparty import numpyjsoncoder
+
+
+# 8 bytes, so the array buffers stay aligned after the magic
+BINARY_MAGIC = b'NJBIN001'
+
+
+def encode(dataObj):
+    return BINARY_MAGIC + treeviewercodec.encodePayload(dataObj)
+
+
+def decode(dataStream):
+    if not isBinary(dataStream):
+        return numpyjsoncoder.decode(dataStream)
+    payload = memoryview(dataStream)
+    return treeviewercodec.decodePayload(payload[len(BINARY_MAGIC):])
+
+
+def isBinary(dataStream):
+    return isinstance(dataStream, (bytes, bytearray, memoryview)) and bytes(dataStream[:len(BINARY_MAGIC)]) == BINARY_MAGIC
@@ -13,6 +13,7 @@ from director import robotstate
 
 import pickle
 import scipy.interpolate
+from collections import OrderedDict
 
 
 def asRobotPlan(msg):
@@ -39,31 +40,41 @@ class PlanPlayback(object):
         self.interpolationMethod = 'slinear'
         self.playbackSpeed = 1.0
         self.jointNameRegex = ''
+        self.interpolatorCache = OrderedDict()
+        self.interpolatorCacheSize = 8
 
     @staticmethod
     def getPlanPoses(msgOrList):
+        '''
+        Returns (poseTimes, poses) where poses is a T x N array of the drake
+        poses of the plan states.  Given a list of plans, the plans are
+        concatenated and the times of each plan start at the end time of the
+        previous plan.
+        '''
+        if not isinstance(msgOrList, list):
+            msg = asRobotPlan(msgOrList)
+            poseTimes = np.array([state.utime for state in msg.plan], dtype=float) / 1e6
+            poses = robotstate.convertStateMessagesToDrakePoses(msg.plan)
+            return poseTimes, poses
 
-        if isinstance(msgOrList, list):
-            messages = msgOrList
-            allPoseTimes, allPoses = PlanPlayback.getPlanPoses(messages[0])
+        plans = [PlanPlayback.getPlanPoses(msg) for msg in msgOrList]
 
-            for msg in messages[1:]:
-                poseTimes, poses = PlanPlayback.getPlanPoses(msg)
-                poseTimes += allPoseTimes[-1]
-                allPoseTimes = np.hstack((allPoseTimes, poseTimes[1:]))
-                allPoses += poses[1:]
-            return allPoseTimes, allPoses
+        # the first state of each following plan repeats the last state of
+        # the plan before it
+        numberOfPoses = len(plans[0][0]) + sum(len(poseTimes) - 1 for poseTimes, _ in plans[1:])
+        allPoseTimes = np.empty(numberOfPoses)
+        allPoses = np.empty((numberOfPoses, plans[0][1].shape[1]))
 
-        else:
-            msg = asRobotPlan(msgOrList)
+        start = 0
+        for i, (poseTimes, poses) in enumerate(plans):
+            if i > 0:
+                poseTimes = poseTimes[1:] + allPoseTimes[start - 1]
+                poses = poses[1:]
+            allPoseTimes[start:start + len(poseTimes)] = poseTimes
+            allPoses[start:start + len(poses)] = poses
+            start += len(poseTimes)
 
-            poses = []
-            poseTimes = []
-            for plan in msg.plan:
-                pose = robotstate.convertStateMessageToDrakePose(plan)
-                poseTimes.append(plan.utime / 1e6)
-                poses.append(pose)
-            return np.array(poseTimes), poses
+        return allPoseTimes, allPoses
 
     @staticmethod
     def getPlanElapsedTime(msg):
@@ -90,14 +101,46 @@ class PlanPlayback(object):
 
         assert len(messages)
 
-        poseTimes, poses = self.getPlanPoses(messages)
-        self.playPoses(poseTimes, poses, jointController)
+        poseTimes, poses, f = self._getCachedPlan(messages)
+        self.playPoses(poseTimes, poses, jointController, poseInterpolator=f)
 
 
     def getPoseInterpolatorFromPlan(self, message):
-        poseTimes, poses = self.getPlanPoses(message)
-        return self.getPoseInterpolator(poseTimes, poses)
+        '''
+        Returns a pose interpolator for a plan or a list of plans.  The
+        interpolator is cached, and reused while the same plan messages are
+        passed with the same interpolation method.
+        '''
+        return self._getCachedPlan(message)[2]
+
 
+    def _getCachedPlan(self, msgOrList):
+        messages = tuple(msgOrList) if isinstance(msgOrList, list) else (msgOrList,)
+        key = (tuple(self._getPlanKey(msg) for msg in messages), self.interpolationMethod)
+
+        entry = self.interpolatorCache.get(key)
+        if entry is not None:
+            self.interpolatorCache.move_to_end(key)
+            return entry[1:]
+
+        poseTimes, poses = self.getPlanPoses(msgOrList)
+        f = self.getPoseInterpolator(poseTimes, poses)
+
+        # the entry holds the messages so that their ids are not reused
+        # while it exists
+        self.interpolatorCache[key] = (messages, poseTimes, poses, f)
+        while len(self.interpolatorCache) > self.interpolatorCacheSize:
+            self.interpolatorCache.popitem(last=False)
+        return poseTimes, poses, f
+
+
+    @staticmethod
+    def _getPlanKey(msg):
+        # plans are sometimes extended in place, for example when plans are
+        # concatenated, so the key includes the number of states and the
+        # first and last state times
+        plan = asRobotPlan(msg).plan
+        return (id(msg), len(plan), plan[0].utime, plan[-1].utime)
 
     def getPoseInterpolator(self, poseTimes, poses, unwrap_rpy=True):
         if unwrap_rpy:
@@ -113,14 +156,13 @@ class PlanPlayback(object):
 
     def getPlanPoseMeshes(self, messages, jointController, robotModel, numberOfSamples):
 
-        poseTimes, poses = self.getPlanPoses(messages)
-        f = self.getPoseInterpolator(poseTimes, poses)
+        poseTimes, poses, f = self._getCachedPlan(messages)
         sampleTimes = np.linspace(poseTimes[0], poseTimes[-1], numberOfSamples)
+        samplePoses = f(sampleTimes)
         meshes = []
 
-        for sampleTime in sampleTimes:
+        for pose in samplePoses:
 
-            pose = f(sampleTime)
             jointController.setPose('plan_playback', pose)
             polyData = vtk.vtkPolyData()
             robotModel.model.getModelMesh(polyData)
@@ -134,9 +176,9 @@ class PlanPlayback(object):
         jointController.setPose('plan_playback', pose)
 
 
-    def playPoses(self, poseTimes, poses, jointController):
+    def playPoses(self, poseTimes, poses, jointController, poseInterpolator=None):
 
-        f = self.getPoseInterpolator(poseTimes, poses)
+        f = poseInterpolator or self.getPoseInterpolator(poseTimes, poses)
 
         timer = SimpleTimer()
 
@@ -145,7 +187,7 @@ class PlanPlayback(object):
             tNow = timer.elapsed() * self.playbackSpeed
 
             if tNow > poseTimes[-1]:
-                pose = poses[-1]
+                pose = np.array(poses[-1])
                 jointController.setPose('plan_playback', pose)
 
                 if self.animationCallback:
@@ -1,7 +1,12 @@
 import os
+import sys
+import json
+import time
+import threading
 import cProfile
 import pstats
 import subprocess
+from collections import defaultdict
 
 
 class Profiler(object):
@@ -14,21 +19,42 @@ class Profiler(object):
         pip3 install gprof2dot
         apt-get install xdot
 
+    With sampling=True the profiler is a SamplingProfiler instead of
+    cProfile.  It has a much lower overhead, so it can be left running in a
+    live session, and on stop it writes a collapsed stack file for
+    flamegraph.pl and a speedscope file (https://www.speedscope.app).
     '''
 
-    def __init__(self):
+    def __init__(self, sampling=False, sample_rate=200):
         self.profiler = None
+        self.sampling = sampling
+        self.sample_rate = sample_rate
         self.profile_output = '/tmp/output.{}.profile'.format(os.getpid())
         self.dot_output = '/tmp/callgraph.{}.dot'.format(os.getpid())
+        self.collapsed_output = '/tmp/stacks.{}.collapsed'.format(os.getpid())
+        self.speedscope_output = '/tmp/profile.{}.speedscope.json'.format(os.getpid())
         self.enabled = False
 
     def start(self):
-        self.profiler = cProfile.Profile()
-        self.profiler.enable()
+        if self.sampling:
+            self.profiler = SamplingProfiler(self.sample_rate)
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
         self.enabled = True
 
     def stop(self, show_stats=True, show_callgraph=True):
         self.enabled = False
+        if self.sampling:
+            self.profiler.stop()
+            self.profiler.write_collapsed(self.collapsed_output)
+            self.profiler.write_speedscope(self.speedscope_output)
+            if show_stats:
+                self.profiler.print_stats()
+            print('wrote {} and {}'.format(self.collapsed_output, self.speedscope_output))
+            return
+
         self.profiler.disable()
         self.profiler.dump_stats(self.profile_output)
 
@@ -38,3 +64,198 @@ class Profiler(object):
         if show_callgraph:
             subprocess.check_call(['gprof2dot', '-f', 'pstats', self.profile_output, '-o', self.dot_output])
             subprocess.Popen(['xdot', self.dot_output])
+
+    def toggle(self, **kwargs):
+        '''
+        Starts the profiler if it is stopped, otherwise stops it.  The
+        keyword arguments are passed to stop().
+        '''
+        if self.enabled:
+            self.stop(**kwargs)
+        else:
+            self.start()
+
+
+class SamplingProfiler(object):
+    '''
+    A statistical profiler.  A background thread records the call stack of
+    every other thread from sys._current_frames() sample_rate times per
+    second.  Each sample is weighted by the time since the previous sample,
+    so the totals are in seconds even if the sampling thread is delayed.
+
+    Identical stacks are aggregated, so memory use depends on the number of
+    distinct stacks, not on the duration of the profile.
+    '''
+
+    def __init__(self, sample_rate=200, max_depth=200):
+        self.sample_rate = sample_rate
+        self.max_depth = max_depth
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.clear()
+
+    def clear(self):
+        # (thread name, stack tuple from root to leaf) -> [count, seconds]
+        self.stacks = defaultdict(lambda: [0, 0.0])
+        self.frame_ids = {}
+        self.number_of_samples = 0
+        self.duration = 0.0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='SamplingProfiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def is_running(self):
+        return self.thread is not None
+
+    def _run(self):
+        interval = 1.0 / self.sample_rate
+        own_ident = threading.get_ident()
+        thread_names = {}
+        last_time = time.perf_counter()
+        while not self.stop_event.wait(interval):
+            now = time.perf_counter()
+            self.sample(now - last_time, own_ident, thread_names)
+            self.duration += now - last_time
+            last_time = now
+
+    def sample(self, weight, skip_ident=None, thread_names=None):
+        '''
+        Records the current stack of every thread except skip_ident with the
+        given weight in seconds.
+        '''
+        thread_names = {} if thread_names is None else thread_names
+        frames = sys._current_frames()
+        if any(ident not in thread_names for ident in frames):
+            thread_names.update((t.ident, t.name) for t in threading.enumerate())
+
+        for ident, frame in frames.items():
+            if ident == skip_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._get_frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            entry = self.stacks[(thread_names.get(ident, str(ident)), tuple(stack))]
+            entry[0] += 1
+            entry[1] += weight
+        self.number_of_samples += 1
+
+    def _get_frame_id(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        frame_id = self.frame_ids.get(key)
+        if frame_id is None:
+            frame_id = self.frame_ids[key] = len(self.frame_ids)
+        return frame_id
+
+    def get_frames(self):
+        '''
+        Returns the list of (function name, filename, line number) tuples
+        that the stacks index into.
+        '''
+        frames = [None] * len(self.frame_ids)
+        for key, frame_id in self.frame_ids.items():
+            frames[frame_id] = key
+        return frames
+
+    def get_stacks(self):
+        '''
+        Returns a list of (thread name, frames, count, seconds) tuples, where
+        frames lists (function name, filename, line number) from root to leaf.
+        '''
+        frames = self.get_frames()
+        return [(thread_name, [frames[i] for i in stack], count, seconds)
+                for (thread_name, stack), (count, seconds) in list(self.stacks.items())]
+
+    @staticmethod
+    def _format_frame(frame):
+        name, filename, line = frame
+        return '{} ({}:{})'.format(name, os.path.basename(filename), line).replace(';', ':')
+
+    def write_collapsed(self, filename):
+        '''
+        Writes the stacks in the collapsed format read by flamegraph.pl and
+        speedscope: one line per stack, the thread name and frames separated
+        by semicolons, followed by the sample count.
+        '''
+        with open(filename, 'w') as f:
+            for thread_name, frames, count, _ in self.get_stacks():
+                names = [thread_name.replace(';', ':')] + [self._format_frame(frame) for frame in frames]
+                f.write('{} {}\n'.format(';'.join(names), count))
+
+    def write_speedscope(self, filename, name='director'):
+        '''
+        Writes a speedscope file with one sampled profile per thread, in
+        seconds.
+        '''
+        profiles = {}
+        for (thread_name, stack), (count, seconds) in list(self.stacks.items()):
+            profile = profiles.get(thread_name)
+            if profile is None:
+                profile = profiles[thread_name] = dict(type='sampled', name=thread_name, unit='seconds',
+                                                       startValue=0.0, endValue=0.0, samples=[], weights=[])
+            profile['samples'].append(list(stack))
+            profile['weights'].append(seconds)
+            profile['endValue'] += seconds
+
+        data = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'director.profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': [dict(name=frame_name, file=frame_file, line=frame_line)
+                                  for frame_name, frame_file, frame_line in self.get_frames()]},
+            'profiles': list(profiles.values()),
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f)
+
+    def get_function_totals(self):
+        '''
+        Returns a list of (frame, self seconds, total seconds) sorted by
+        decreasing self seconds.  A function that appears more than once in
+        a stack is counted once in its total.
+        '''
+        self_time = defaultdict(float)
+        total_time = defaultdict(float)
+        for _, frames, _, seconds in self.get_stacks():
+            if frames:
+                self_time[frames[-1]] += seconds
+            for frame in set(frames):
+                total_time[frame] += seconds
+        return sorted(((frame, self_time[frame], total_time[frame]) for frame in total_time),
+                      key=lambda x: x[1], reverse=True)
+
+    def print_stats(self, limit=30):
+        print('{} samples over {:.2f} seconds'.format(self.number_of_samples, self.duration))
+        print('{:>10} {:>10}  function'.format('self (s)', 'total (s)'))
+        for frame, self_seconds, total_seconds in self.get_function_totals()[:limit]:
+            print('{:10.3f} {:10.3f}  {}'.format(self_seconds, total_seconds, self._format_frame(frame)))
+
+
+_default_profiler = None
+
+
+def get_default_profiler():
+    '''
+    Returns the sampling Profiler toggled by toggle_sampling_profiler().
+    '''
+    global _default_profiler
+    if _default_profiler is None:
+        _default_profiler = Profiler(sampling=True)
+    return _default_profiler
+
+
+def toggle_sampling_profiler():
+    get_default_profiler().toggle()
@@ -2,6 +2,7 @@ import bot_core
 import numpy as np
 import time
 import re
+from collections import OrderedDict
 from director import drcargs
 from director import transformUtils
 
@@ -10,6 +11,7 @@ _drakePoseToRobotStateJointMap = None
 _drakePoseJointNames = None
 _robotStateJointNames = None
 _numPositions = None
+_stateMessageConverter = None
 
 
 def getRollPitchYawFromRobotState(robotState):
@@ -49,6 +51,114 @@ def getDrakePoseToRobotStateJointMap():
     return _drakePoseToRobotStateJointMap
 
 
+class JointIndexMap(object):
+    '''
+    Copies joint positions given in the order of a list of source joint
+    names into an array ordered by targetJointNames.  The numpy index for a
+    list of source names is computed the first time the list is seen and
+    cached, so converting each message is a single fancy indexing
+    operation instead of a loop over names.
+    '''
+
+    def __init__(self, targetJointNames, maxCacheSize=16):
+        self.targetJointNames = list(targetJointNames)
+        self.targetIds = {name: i for i, name in enumerate(self.targetJointNames)}
+        self.maxCacheSize = maxCacheSize
+        self.cache = OrderedDict()
+
+    def getIndices(self, sourceJointNames):
+        '''
+        Returns (sourceIds, targetIds, missingTargetIds).  The positions at
+        sourceIds are the positions of the target joints at targetIds.
+        missingTargetIds are the target joints not in sourceJointNames.
+        '''
+        key = tuple(sourceJointNames)
+        indices = self.cache.get(key)
+        if indices is not None:
+            return indices
+
+        # if a name appears twice the last position is used
+        sourceIdsByName = {name: i for i, name in enumerate(key)}
+        pairs = [(sourceIdsByName[name], targetId) for name, targetId in self.targetIds.items() if name in sourceIdsByName]
+        sourceIds = np.array([sourceId for sourceId, _ in pairs], dtype=int)
+        targetIds = np.array([targetId for _, targetId in pairs], dtype=int)
+        missingTargetIds = np.setdiff1d(np.arange(len(self.targetJointNames)), targetIds)
+        indices = (sourceIds, targetIds, missingTargetIds)
+
+        self.cache[key] = indices
+        while len(self.cache) > self.maxCacheSize:
+            self.cache.popitem(last=False)
+        return indices
+
+    def assign(self, target, sourceJointNames, sourcePositions):
+        '''
+        Sets the positions of the target joints that are in
+        sourceJointNames.  Other elements of target are unchanged.
+        '''
+        sourceIds, targetIds, _ = self.getIndices(sourceJointNames)
+        target[targetIds] = np.asarray(sourcePositions)[sourceIds]
+        return target
+
+
+class StateMessageConverter(object):
+    '''
+    Converts robot_state_t messages to drake poses, see
+    convertStateMessageToDrakePose.
+    '''
+
+    def __init__(self, drakePoseJointNames):
+        self.numberOfPositions = len(drakePoseJointNames)
+        self.jointMap = JointIndexMap(drakePoseJointNames[6:])
+
+    def convert(self, msg, strict=True):
+        _, _, missingIds = self.jointMap.getIndices(msg.joint_name)
+        if strict and len(missingIds):
+            raise KeyError(self.jointMap.targetJointNames[missingIds[0]])
+
+        pose = np.zeros(self.numberOfPositions)
+
+        trans = msg.pose.translation
+        quat = msg.pose.rotation
+        pose[:3] = trans.x, trans.y, trans.z
+        pose[3:6] = transformUtils.quaternionToRollPitchYaw([quat.w, quat.x, quat.y, quat.z])
+
+        self.jointMap.assign(pose[6:], msg.joint_name, msg.joint_position)
+        return pose
+
+    def convertMessages(self, messages, strict=True):
+        '''
+        Converts a list of robot_state_t messages to an N x numberOfPositions
+        array of drake poses.  Messages with the same joint_name list, such
+        as the states of a plan, are converted together.
+        '''
+        poses = np.zeros((len(messages), self.numberOfPositions))
+        if not len(messages):
+            return poses
+
+        rows = OrderedDict()
+        for i, msg in enumerate(messages):
+            rows.setdefault(tuple(msg.joint_name), []).append(i)
+
+        for jointNames, rowIds in rows.items():
+            sourceIds, targetIds, missingIds = self.jointMap.getIndices(jointNames)
+            if strict and len(missingIds):
+                raise KeyError(self.jointMap.targetJointNames[missingIds[0]])
+            positions = np.array([messages[i].joint_position for i in rowIds], dtype=float)
+            poses[np.ix_(rowIds, 6 + targetIds)] = positions[:, sourceIds]
+
+        poses[:, :3] = [(msg.pose.translation.x, msg.pose.translation.y, msg.pose.translation.z) for msg in messages]
+        quats = [(msg.pose.rotation.w, msg.pose.rotation.x, msg.pose.rotation.y, msg.pose.rotation.z) for msg in messages]
+        poses[:, 3:6] = transformUtils.quaternionsToRollPitchYaw(quats)
+        return poses
+
+
+def getStateMessageConverter():
+    global _stateMessageConverter
+    if _stateMessageConverter is None:
+        _stateMessageConverter = StateMessageConverter(getDrakePoseJointNames())
+    return _stateMessageConverter
+
+
 def convertStateMessageToDrakePose(msg, strict=True):
     '''
     If strict is true, then the state message must contain a joint_position
@@ -56,27 +166,15 @@ def convertStateMessageToDrakePose(msg, strict=True):
     then a default value of 0.0 is used to fill joint positions that are
     not specified in the robot state msg argument.
     '''
+    return getStateMessageConverter().convert(msg, strict)
 
-    jointMap = {}
-    for name, position in zip(msg.joint_name, msg.joint_position):
-        jointMap[name] = position
-
-    jointPositions = []
-    for name in getDrakePoseJointNames()[6:]:
-        if strict:
-            jointPositions.append(jointMap[name])
-        else:
-            jointPositions.append(jointMap.get(name, 0.0))
-
-    trans = msg.pose.translation
-    quat = msg.pose.rotation
-    trans = [trans.x, trans.y, trans.z]
-    quat = [quat.w, quat.x, quat.y, quat.z]
-    rpy = transformUtils.quaternionToRollPitchYaw(quat)
-
-    pose = np.hstack((trans, rpy, jointPositions))
-    assert len(pose) == getNumPositions()
-    return pose
+
+def convertStateMessagesToDrakePoses(messages, strict=True):
+    '''
+    Returns an N x getNumPositions() array with the drake pose of each
+    message.  See convertStateMessageToDrakePose.
+    '''
+    return getStateMessageConverter().convertMessages(messages, strict)
 
 def atlasCommandToDrakePose(msg):
     jointIndexMap = getRobotStateToDrakePoseJointMap()
@@ -4,6 +4,7 @@ from director import applogic as app
 from director.timercallback import TimerCallback
 from director.simpletimer import FPSCounter
 from director import ioUtils as io
+from director import framerecorder
 import director.vtkAll as vtk
 import os
 import glob
@@ -37,6 +38,8 @@ class ScreenGrabberPanel(object):
         assert uifile.open(uifile.ReadOnly)
 
         self.frameCount = 0
+        self.recorder = None
+        self.movieFileName = None
 
         self.widget = loader.load(uifile)
         self.ui = WidgetDict(self.widget.children())
@@ -124,19 +127,23 @@ class ScreenGrabberPanel(object):
         app.getMainWindow().statusBar().showMessage('Saved: ' + filename, 2000)
 
 
-    def nextMovieFileName(self):
-        filename = os.path.join(self.movieOutputDirectory(), 'frame_%07d.tiff' % self.frameCount)
-        self.frameCount += 1
-        return filename
+    def recordVideo(self):
+        return self.ui.movieFormatCombo.currentIndex == 0
 
     def updateRecordingStats(self):
-        isRecordMode = self.ui.recordMovieButton.checked
 
         currentRate = 0.0
-        writeQueue = 0.0
+        writeQueue = 0
+        droppedFrames = 0
+
+        if self.recorder:
+            currentRate = self.fpsCounter.getAverageFPS()
+            writeQueue = self.recorder.getQueueDepth()
+            droppedFrames = self.recorder.droppedFrames
 
         self.ui.currentRateValueLabel.setText('%.1f' % currentRate)
-        self.ui.writeQueueValueLabel.setText('%.1f' % currentRate)
+        self.ui.writeQueueValueLabel.setText('%d' % writeQueue)
+        self.ui.droppedFramesValueLabel.setText('%d' % droppedFrames)
 
     def isRecordMode(self):
         return self.ui.recordMovieButton.checked
@@ -149,11 +156,15 @@ class ScreenGrabberPanel(object):
         self.ui.movieOutputBrowseButton.setEnabled(not isRecordMode)
         self.ui.captureRateSpin.setEnabled(not isRecordMode)
         self.ui.captureRateLabel.setEnabled(not isRecordMode)
+        self.ui.movieFormatCombo.setEnabled(not isRecordMode)
+        self.ui.movieFormatLabel.setEnabled(not isRecordMode)
         self.ui.moveOutputDirectoryLabel.setEnabled(not isRecordMode)
         self.ui.currentRateLabel.setEnabled(isRecordMode)
         self.ui.currentRateValueLabel.setEnabled(isRecordMode)
         self.ui.writeQueueLabel.setEnabled(isRecordMode)
         self.ui.writeQueueValueLabel.setEnabled(isRecordMode)
+        self.ui.droppedFramesLabel.setEnabled(isRecordMode)
+        self.ui.droppedFramesValueLabel.setEnabled(isRecordMode)
 
         self.updateRecordingStats()
 
@@ -178,7 +189,17 @@ class ScreenGrabberPanel(object):
             self.ui.recordMovieButton.checked = False
             return
 
-        existingFiles = glob.glob(os.path.join(self.movieOutputDirectory(), '*.tiff'))
+        if self.recordVideo():
+            if framerecorder.findVideoEncoder() is None:
+                app.showErrorMessage('Recording video requires ffmpeg or avconv.  Choose PNG frames or install ffmpeg.')
+                self.ui.recordMovieButton.checked = False
+                return
+            self.movieFileName = os.path.join(self.movieOutputDirectory(), 'director_' + self.dateTimeString() + '.mp4')
+            existingFiles = []
+        else:
+            self.movieFileName = None
+            existingFiles = glob.glob(os.path.join(self.movieOutputDirectory(), 'frame_*.png'))
+
         if len(existingFiles):
 
             choice = QtGui.QMessageBox.question(app.getMainWindow(), 'Continue?',
@@ -200,16 +221,46 @@ class ScreenGrabberPanel(object):
         self.recordTimer.setInterval(interval)
         self.recordTimer.start()
 
+    def createRecorder(self):
+        # the view size is fixed while recording, so the size of the first
+        # frame is the size of the recording
+        width, height = self.view.renderWindow().GetSize()
+        if self.movieFileName:
+            sink = framerecorder.VideoEncoderSink(self.movieFileName, width, height, self.captureRate())
+        else:
+            sink = framerecorder.ImageFileSink(self.movieOutputDirectory())
+        return framerecorder.FrameRecorder(sink, width, height)
+
     def stopRecording(self):
         self.recordTimer.stop()
-        if self.frameCount > 0:
-            self.showEncodingDialog()
+        if self.recorder is None:
+            return
+
+        recorder = self.recorder
+        self.recorder = None
+
+        try:
+            recorder.stop()
+        except Exception as e:
+            app.showErrorMessage('Error while recording: %s' % e)
+            return
+
+        self.frameCount = recorder.writtenFrames
 
-    def showEncodingDialog(self):
+        if self.frameCount == 0:
+            return
+
+        msg = 'Recorded %d frames, dropped %d frames.' % (self.frameCount, recorder.droppedFrames)
+        if self.movieFileName:
+            app.showInfoMessage(msg + '\n\nSaved: %s' % self.movieFileName, title='Recording Stopped')
+        else:
+            self.showEncodingDialog(msg)
 
-        msg = 'Recorded %d frames.  For encoding, use this command line:\n\n\n' % self.frameCount
+    def showEncodingDialog(self, msg):
+
+        msg += '  For encoding, use this command line:\n\n\n'
         msg += '    cd "%s"\n\n' % self.movieOutputDirectory()
-        msg += '    avconv -r %d -i frame_%%07d.tiff \\\n' % self.captureRate()
+        msg += '    ffmpeg -r %d -i frame_%%07d.png \\\n' % self.captureRate()
         msg += '           -vcodec libx264 \\\n'
         msg += '           -preset slow \\\n'
         msg += '           -crf 18 \\\n'
@@ -257,13 +308,27 @@ class ScreenGrabberPanel(object):
 
     def onRecordTimer(self):
 
-        saveScreenshot(self.view, self.nextMovieFileName(), shouldRender=False)
+        if self.recorder is None:
+            try:
+                self.recorder = self.createRecorder()
+            except Exception as e:
+                self.ui.recordMovieButton.checked = False
+                self.onRecordMovie()
+                app.showErrorMessage('Error starting recording: %s' % e)
+                return
+
+        if self.recorder.grabFrame(self.view.renderWindow()):
+            self.fpsCounter.tick()
+
+        if self.recorder.error is not None:
+            self.ui.recordMovieButton.checked = False
+            self.onRecordMovie()
+            return
 
-        self.fpsCounter.tick()
         tNow = time.time()
         if tNow - self.startT > 1.0:
             self.startT = tNow
-            self.ui.currentRateValueLabel.text = '%.1f' % self.fpsCounter.getAverageFPS()
+            self.updateRecordingStats()
 
 
 def saveScreenshot(view, filename, shouldRender=True, shouldWrite=True):
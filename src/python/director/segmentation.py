@@ -19,6 +19,8 @@ from director.visualization import *
 from director.filterUtils import *
 from director.fieldcontainer import FieldContainer
 from director.segmentationroutines import *
+from director.spatialindex import getPointCloudIndex
+from director import segmentationexecutor
 from director import cameraview
 
 from .thirdparty import qhull_2d
@@ -378,77 +380,122 @@ def orientToMajorPlane(polyData, pickedPoint):
     return polyData, planeFrame
 
 
-def getMajorPlanes(polyData, useVoxelGrid=True):
-
+def getMajorPlanes(polyData, useVoxelGrid=True, maxPlanes=25, timeBudget=None, progressFunction=None):
+    '''
+    Returns a list of polydata, one for each of the major planes found by
+    extractMajorPlanes.  Use extractMajorPlanes directly to get the plane
+    labels as a single point array instead.
+    '''
     voxelGridSize = 0.01
     distanceToPlaneThreshold = 0.02
 
     if useVoxelGrid:
         polyData = applyVoxelGrid(polyData, leafSize=voxelGridSize)
 
-    polyDataList = []
+    polyData, planes = extractMajorPlanes(polyData, distanceThreshold=distanceToPlaneThreshold,
+                                          maxPlanes=maxPlanes, minClusterSize=100, timeBudget=timeBudget,
+                                          progressFunction=progressFunction)
 
-    minClusterSize = 100
+    return list(LabeledPointGroups(polyData, 'plane_labels'))
 
-    while len(polyDataList) < 25:
 
-        f = planeSegmentationFilter()
-        f.SetInputData(polyData)
-        f.SetDistanceThreshold(distanceToPlaneThreshold)
-        f.Update()
-        polyData = shallowCopy(f.GetOutput())
+def getMajorPlanesAsync(polyData, callback, **kwargs):
+    '''
+    Runs getMajorPlanes on a worker thread and calls callback(planes) on the
+    main thread when it finishes.  Returns the SegmentationTask.
+    '''
+    return runSegmentationAsync('major planes', getMajorPlanes, callback,
+                                segmentationexecutor.copyInput(polyData), **kwargs)
 
-        outliers = thresholdPoints(polyData, 'ransac_labels', [0, 0])
-        inliers = thresholdPoints(polyData, 'ransac_labels', [1, 1])
-        largestCluster = extractLargestCluster(inliers)
 
-        #i = len(polyDataList)
-        #showPolyData(inliers, 'inliers %d' % i, color=getRandomColor(), parent='major planes')
-        #showPolyData(outliers, 'outliers %d' % i, color=getRandomColor(), parent='major planes')
-        #showPolyData(largestCluster, 'cluster %d' % i, color=getRandomColor(), parent='major planes')
+def showMajorPlanes(polyData=None):
 
-        if largestCluster.GetNumberOfPoints() > minClusterSize:
-            polyDataList.append(largestCluster)
-            polyData = outliers
-        else:
-            break
+    polyData = _getMajorPlanesInput(polyData)
+    _showMajorPlanes(getMajorPlanes(polyData))
 
-    return polyDataList
 
+def showMajorPlanesAsync(polyData=None):
+
+    polyData = _getMajorPlanesInput(polyData)
+    return getMajorPlanesAsync(polyData, _showMajorPlanes)
 
-def showMajorPlanes(polyData=None):
+
+def _getMajorPlanesInput(polyData):
 
     if not polyData:
         inputObj = om.findObjectByName('pointcloud snapshot')
         inputObj.setProperty('Visible', False)
         polyData = inputObj.polyData
 
-    om.removeFromObjectModel(om.findObjectByName('major planes'))
-    folderObj = om.findObjectByName('segmentation')
-    folderObj = om.getOrCreateContainer('major planes', folderObj)
-
     origin = SegmentationContext.getGlobalInstance().getViewFrame().GetPosition()
     polyData = labelDistanceToPoint(polyData, origin)
-    polyData = thresholdPoints(polyData, 'distance_to_point', [1, 4])
+    return thresholdPoints(polyData, 'distance_to_point', [1, 4])
+
 
-    polyDataList = getMajorPlanes(polyData)
+def _showMajorPlanes(polyDataList):
+
+    om.removeFromObjectModel(om.findObjectByName('major planes'))
+    folderObj = om.findObjectByName('segmentation')
+    folderObj = om.getOrCreateContainer('major planes', folderObj)
 
     for i, polyData in enumerate(polyDataList):
         obj = showPolyData(polyData, 'plane %d' % i, color=getRandomColor(), visible=True, parent='major planes')
         obj.setProperty('Point Size', 3)
 
 
+_segmentationTasks = {}
+
+
+def runSegmentationAsync(name, func, onResult, *args, **kwargs):
+    '''
+    Runs func(*args, progressFunction=..., **kwargs) on the default
+    segmentation executor and calls onResult(result) on the main thread if
+    it completes.  A running task with the same name is cancelled first.
+    Progress is shown in the main window status bar.
+    '''
+    previousTask = _segmentationTasks.get(name)
+    if previousTask is not None:
+        previousTask.cancel()
+
+    def run(task):
+        return func(*args, progressFunction=task.setProgress, **kwargs)
+
+    def onProgress(task):
+        statusBar = app.getMainWindow().statusBar()
+        statusBar.showMessage('%s: %s (%d%%)' % (name, task.progressMessage, 100*task.progress), 2000)
+
+    def onDone(task):
+        if _segmentationTasks.get(name) is task:
+            del _segmentationTasks[name]
+        if task.state == task.FINISHED and onResult:
+            onResult(task.result())
+
+    task = segmentationexecutor.getDefaultExecutor().submit(run, name=name)
+    task.addProgressCallback(onProgress)
+    task.addDoneCallback(onDone)
+    _segmentationTasks[name] = task
+    return task
+
+
+def cancelSegmentationTasks():
+    for task in list(_segmentationTasks.values()):
+        task.cancel()
+
+
 def cropToBox(polyData, transform, dimensions):
     '''
     dimensions is length 3 describing box dimensions
     '''
     origin = np.array(transform.GetPosition())
-    axes = transformUtils.getAxesFromTransform(transform)
+    axes = [np.array(axis)/np.linalg.norm(axis) for axis in transformUtils.getAxesFromTransform(transform)]
+    halfExtents = np.array(dimensions)/2.0
 
-    for axis, length in zip(axes, dimensions):
-        cropAxis = np.array(axis)*(length/2.0)
-        polyData = cropToLineSegment(polyData, origin - cropAxis, origin + cropAxis)
+    pointIds = getPointCloudIndex(polyData).queryBox(origin, axes, halfExtents)
+    polyData = extractPointsById(polyData, pointIds)
 
+    points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')
+    distAlongLine = np.dot(points - (origin - axes[-1]*halfExtents[-1]), axes[-1])
+    vtkNumpy.addNumpyToVtk(polyData, distAlongLine, 'dist_along_line')
     return polyData
 
 def cropToBounds(polyData, transform, bounds):
@@ -466,8 +513,11 @@ def cropToBounds(polyData, transform, bounds):
 
 
 def cropToSphere(polyData, origin, radius):
-    polyData = labelDistanceToPoint(polyData, origin)
-    return thresholdPoints(polyData, 'distance_to_point', [0, radius])
+    pointIds = getPointCloudIndex(polyData).queryRadius(origin, radius)
+    polyData = extractPointsById(polyData, pointIds)
+    if polyData.GetNumberOfPoints():
+        polyData = labelDistanceToPoint(polyData, origin)
+    return polyData
 
 
 def applyPlaneFit(polyData, distanceThreshold=0.02, expectedNormal=None, perpendicularAxis=None, angleEpsilon=0.2, returnOrigin=False, searchOrigin=None, searchRadius=None):
@@ -1483,18 +1533,30 @@ def findWallCenter(polyData, removeGroundMethod=removeGround):
     Z: 4 feet off the ground (determined using robot's feet
     Orientation: z-normal into plane, y-axis horizontal
     '''
+    context = SegmentationContext.getGlobalInstance()
+    t, wallPoints = computeWallCenter(polyData, context.getViewDirection(), context.getGroundHeight(), removeGroundMethod)
+    showWallCenter(t, wallPoints)
+    return t
+
+
+def computeWallCenter(polyData, viewDirection, groundHeight, removeGroundMethod=removeGround, progressFunction=None):
+    '''
+    Computes the valve wall frame described in findWallCenter without
+    touching the object model.  Returns (frame, wallPoints).
+    '''
 
     _ , polyData =  removeGroundMethod(polyData)
+    if progressFunction:
+        progressFunction(0.3, 'fitting wall plane')
 
-    viewDirection = SegmentationContext.getGlobalInstance().getViewDirection()
     polyData, origin, normal = applyPlaneFit(polyData, expectedNormal=-viewDirection, returnOrigin=True)
 
     wallPoints = thresholdPoints(polyData, 'dist_to_plane', [-0.01, 0.01])
     wallPoints = applyVoxelGrid(wallPoints, leafSize=0.03)
+    if progressFunction:
+        progressFunction(0.6, 'clustering wall points')
     wallPoints = extractLargestCluster(wallPoints, minClusterSize=100)
 
-    updatePolyData(wallPoints, 'auto valve wall', parent=getDebugFolder(), visible=False)
-
     xvalues = vtkNumpy.getNumpyFromVtk(wallPoints, 'Points')[:,0]
     yvalues = vtkNumpy.getNumpyFromVtk(wallPoints, 'Points')[:,1]
 
@@ -1507,7 +1569,7 @@ def findWallCenter(polyData, removeGroundMethod=removeGround):
     # not used, not very reliable
     #zvalues = vtkNumpy.getNumpyFromVtk(wallPoints, 'Points')[:,2]
     #zcenter = np.median(zvalues)
-    zcenter = SegmentationContext.getGlobalInstance().getGroundHeight() + 1.2192 # valves are 4ft from ground
+    zcenter = groundHeight + 1.2192 # valves are 4ft from ground
     point1 =np.array([ xcenter, ycenter, zcenter  ]) # center of the valve wall
 
     zaxis = -normal
@@ -1520,11 +1582,14 @@ def findWallCenter(polyData, removeGroundMethod=removeGround):
     t.PostMultiply()
     t.Translate(point1)
 
+    return t, wallPoints
+
+
+def showWallCenter(t, wallPoints):
+    updatePolyData(wallPoints, 'auto valve wall', parent=getDebugFolder(), visible=False)
     normalObj = showFrame(t, 'valve wall frame', parent=getDebugFolder(), visible=False) # z direction out of wall
     normalObj.addToView(app.getDRCView())
 
-    return t
-
 
 def segmentValveWallAuto(expectedValveRadius=.195, mode='both', removeGroundMethod=removeGround ):
     '''
@@ -1536,6 +1601,34 @@ def segmentValveWallAuto(expectedValveRadius=.195, mode='both', removeGroundMeth
     polyData = inputObj.polyData
 
     t = findWallCenter(polyData, removeGroundMethod)
+    segmentValveByWallCenter(t, expectedValveRadius, mode)
+
+
+def segmentValveWallAutoAsync(expectedValveRadius=.195, mode='both', removeGroundMethod=removeGround, callback=None):
+    '''
+    Runs the wall fit of segmentValveWallAuto on a worker thread and then
+    segments the valve on the main thread.  callback() is called after the
+    valve is segmented.  Returns the SegmentationTask.
+    '''
+    if mode not in ('valve', 'lever', 'both'):
+        raise Exception('unexpected segmentation mode: ' + mode)
+
+    inputObj = om.findObjectByName('pointcloud snapshot')
+    context = SegmentationContext.getGlobalInstance()
+
+    def onWallCenter(result):
+        t, wallPoints = result
+        showWallCenter(t, wallPoints)
+        segmentValveByWallCenter(t, expectedValveRadius, mode)
+        if callback:
+            callback()
+
+    return runSegmentationAsync('valve wall', computeWallCenter, onWallCenter,
+                                segmentationexecutor.copyInput(inputObj.polyData),
+                                context.getViewDirection(), context.getGroundHeight(), removeGroundMethod)
+
+
+def segmentValveByWallCenter(t, expectedValveRadius=.195, mode='both'):
 
     valve_point1 = [ 0 , 0.6 , 0]
     valveTransform1 = transformUtils.frameFromPositionAndRPY(valve_point1, [0,0,0])
@@ -2567,20 +2660,43 @@ def segmentDrillAuto(point1, polyData=None):
         inputObj = om.findObjectByName('pointcloud snapshot')
         polyData = inputObj.polyData
 
+    showDrillAuto(fitDrillAuto(point1, polyData))
+
+
+def segmentDrillAutoAsync(point1, polyData=None):
+    '''
+    Runs the fit of segmentDrillAuto on a worker thread and shows the drill
+    affordance when it finishes.  Returns the SegmentationTask.
+    '''
+    if polyData is None:
+        inputObj = om.findObjectByName('pointcloud snapshot')
+        polyData = inputObj.polyData
+
+    return runSegmentationAsync('drill', fitDrillAuto, showDrillAuto, np.array(point1), segmentationexecutor.copyInput(polyData))
+
+
+def fitDrillAuto(point1, polyData, progressFunction=None):
+    '''
+    Computes the drill fit of segmentDrillAuto without touching the object
+    model.  Returns a FieldContainer with the debug point sets and the drill
+    frame and axes.
+    '''
+
     expectedNormal = np.array([0.0, 0.0, 1.0])
 
     polyData, origin, normal = applyPlaneFit(polyData, expectedNormal=expectedNormal, perpendicularAxis=expectedNormal, searchOrigin=point1, searchRadius=0.4, angleEpsilon=0.2, returnOrigin=True)
+    if progressFunction:
+        progressFunction(0.4, 'clustering table points')
 
+    tablePlanePoints = thresholdPoints(polyData, 'dist_to_plane', [-0.01, 0.01])
 
-    tablePoints = thresholdPoints(polyData, 'dist_to_plane', [-0.01, 0.01])
-    updatePolyData(tablePoints, 'table plane points', parent=getDebugFolder(), visible=False)
-
-    tablePoints = labelDistanceToPoint(tablePoints, point1)
+    tablePoints = labelDistanceToPoint(tablePlanePoints, point1)
     tablePointsClusters = extractClusters(tablePoints)
     tablePointsClusters.sort(key=lambda x: vtkNumpy.getNumpyFromVtk(x, 'distance_to_point').min())
 
     tablePoints = tablePointsClusters[0]
-    updatePolyData(tablePoints, 'table points', parent=getDebugFolder(), visible=False)
+    if progressFunction:
+        progressFunction(0.7, 'clustering drill points')
 
     searchRegion = thresholdPoints(polyData, 'dist_to_plane', [0.03, 0.4])
     searchRegion = cropToSphere(searchRegion, point1, 0.30)
@@ -2591,10 +2707,6 @@ def segmentDrillAuto(point1, polyData=None):
 
     centroids = computeCentroids(drillPoints, axis=normal)
 
-    centroidsPolyData = vtkNumpy.getVtkPolyDataFromNumpyPoints(centroids)
-    d = DebugData()
-    updatePolyData(centroidsPolyData, 'cluster centroids', parent=getDebugFolder(), visible=False)
-
     drillToTopPoint = np.array([-0.002904, -0.010029, 0.153182])
 
     zaxis = normal
@@ -2611,13 +2723,26 @@ def segmentDrillAuto(point1, polyData=None):
     t.PostMultiply()
     t.Translate(centroids[-1])
 
+    return FieldContainer(tablePlanePoints=tablePlanePoints, tablePoints=tablePoints, drillPoints=drillPoints,
+                          centroids=centroids, frame=t, origin=origin, xaxis=xaxis, yaxis=yaxis, zaxis=zaxis)
+
+
+def showDrillAuto(fit):
+
+    updatePolyData(fit.tablePlanePoints, 'table plane points', parent=getDebugFolder(), visible=False)
+    updatePolyData(fit.tablePoints, 'table points', parent=getDebugFolder(), visible=False)
+
+    centroidsPolyData = vtkNumpy.getVtkPolyDataFromNumpyPoints(fit.centroids)
+    updatePolyData(centroidsPolyData, 'cluster centroids', parent=getDebugFolder(), visible=False)
+
+    t = fit.frame
     drillMesh = getDrillMesh()
 
     aff = showPolyData(drillMesh, 'drill', cls=FrameAffordanceItem, visible=True)
     aff.actor.SetUserTransform(t)
     showFrame(t, 'drill frame', parent=aff, visible=False, scale=0.2).addToView(app.getDRCView())
 
-    params = getDrillAffordanceParams(origin, xaxis, yaxis, zaxis)
+    params = getDrillAffordanceParams(fit.origin, fit.xaxis, fit.yaxis, fit.zaxis)
     aff.setAffordanceParams(params)
     aff.updateParamsFromActorTransform()
     aff.addToView(app.getDRCView())
@@ -2700,15 +2825,42 @@ def findHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSe
     '''
     Find the horizontal surfaces, tuned to work with walking terrain
     '''
+    surfaces = computeHorizontalSurfaces(polyData, removeGroundFirst, normalEstimationSearchRadius, clusterTolerance,
+                                         minClusterSize, distanceToPlaneThreshold, normalsDotUpRange)
+    return showHorizontalSurfaces(surfaces, showClusters)
+
+
+def findHorizontalSurfacesAsync(polyData, callback=None, showClusters=False, **kwargs):
+    '''
+    Runs findHorizontalSurfaces on a worker thread.  The debug objects are
+    shown and callback(clusters) is called on the main thread when it
+    finishes.  Returns the SegmentationTask.
+    '''
+    def onResult(surfaces):
+        clusters = showHorizontalSurfaces(surfaces, showClusters)
+        if callback:
+            callback(clusters)
+
+    return runSegmentationAsync('horizontal surfaces', computeHorizontalSurfaces, onResult,
+                                segmentationexecutor.copyInput(polyData), **kwargs)
+
+
+def computeHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSearchRadius=0.05,
+                          clusterTolerance=0.025, minClusterSize=150, distanceToPlaneThreshold=0.0025, normalsDotUpRange=[0.95, 1.0],
+                          progressFunction=None):
+    '''
+    Computes the surfaces of findHorizontalSurfaces without touching the
+    object model.  Returns a FieldContainer, or None if there are no points
+    to search.
+    '''
 
     searchZ = [0.0, 2.0]
     voxelGridLeafSize = 0.01
-    verboseFlag = False
 
+    groundPoints = None
     if (removeGroundFirst):
         groundPoints, scenePoints =  removeGround(polyData, groundThickness=0.02, sceneHeightFromGround=0.05)
         scenePoints = thresholdPoints(scenePoints, 'dist_to_plane', searchZ)
-        updatePolyData(groundPoints, 'ground points', parent=getDebugFolder(), visible=verboseFlag)
     else:
         scenePoints = polyData
 
@@ -2717,6 +2869,9 @@ def findHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSe
     if not scenePoints.GetNumberOfPoints():
         return
 
+    if progressFunction:
+        progressFunction(0.1, 'estimating normals')
+
     f = vtk.vtkPCLNormalEstimation()
     f.SetSearchRadius(normalEstimationSearchRadius)
     f.SetInputData(scenePoints)
@@ -2732,19 +2887,18 @@ def findHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSe
     vtkNumpy.addNumpyToVtk(scenePoints, normalsDotUp, 'normals_dot_up')
     surfaces = thresholdPoints(scenePoints, 'normals_dot_up', normalsDotUpRange)
 
-    updatePolyData(scenePoints, 'scene points', parent=getDebugFolder(), colorByName='normals_dot_up', visible=verboseFlag)
-    updatePolyData(surfaces, 'surfaces points', parent=getDebugFolder(), colorByName='normals_dot_up', visible=verboseFlag)
+    if progressFunction:
+        progressFunction(0.4, 'clustering surfaces')
 
     clusters = extractClusters(surfaces, clusterTolerance=clusterTolerance, minClusterSize=minClusterSize)
     planeClusters = []
     clustersLarge = []
 
-    om.removeFromObjectModel(om.findObjectByName('surface clusters'))
-    folder = om.getOrCreateContainer('surface clusters', parentObj=getDebugFolder())
-
     for i, cluster in enumerate(clusters):
 
-        updatePolyData(cluster, 'surface cluster %d' % i, parent=folder, color=getRandomColor(), visible=verboseFlag)
+        if progressFunction:
+            progressFunction(0.5 + 0.5*i/len(clusters), 'fitting surface %d of %d' % (i+1, len(clusters)))
+
         planePoints, _ = applyPlaneFit(cluster, distanceToPlaneThreshold)
         planePoints = thresholdPoints(planePoints, 'dist_to_plane', [-distanceToPlaneThreshold, distanceToPlaneThreshold])
 
@@ -2754,11 +2908,34 @@ def findHorizontalSurfaces(polyData, removeGroundFirst=False, normalEstimationSe
             if obj is not None:
                 planeClusters.append(obj)
 
+    return FieldContainer(groundPoints=groundPoints, scenePoints=scenePoints, surfaces=surfaces, clusters=clusters,
+                          clustersLarge=clustersLarge, planeClusters=planeClusters)
+
+
+def showHorizontalSurfaces(surfaces, showClusters=False):
+
+    verboseFlag = False
+
+    if surfaces is None:
+        return
+
+    if surfaces.groundPoints is not None:
+        updatePolyData(surfaces.groundPoints, 'ground points', parent=getDebugFolder(), visible=verboseFlag)
+
+    updatePolyData(surfaces.scenePoints, 'scene points', parent=getDebugFolder(), colorByName='normals_dot_up', visible=verboseFlag)
+    updatePolyData(surfaces.surfaces, 'surfaces points', parent=getDebugFolder(), colorByName='normals_dot_up', visible=verboseFlag)
+
+    om.removeFromObjectModel(om.findObjectByName('surface clusters'))
+    folder = om.getOrCreateContainer('surface clusters', parentObj=getDebugFolder())
+
+    for i, cluster in enumerate(surfaces.clusters):
+        updatePolyData(cluster, 'surface cluster %d' % i, parent=folder, color=getRandomColor(), visible=verboseFlag)
+
     folder = om.getOrCreateContainer('surface objects', parentObj=getDebugFolder())
     if showClusters:
-        vis.showClusterObjects(planeClusters, parent=folder)
+        vis.showClusterObjects(surfaces.planeClusters, parent=folder)
 
-    return clustersLarge
+    return surfaces.clustersLarge
 
 
 def fitVerticalPosts(polyData):
@@ -3443,14 +3620,8 @@ def computeEdge(polyData, edgeAxis, perpAxis, binWidth=0.03):
     distToEdge = vtkNumpy.getNumpyFromVtk(polyData, 'dist_perp_to_edge')
 
     numberOfBins = len(bins) - 1
-    edgePoints = []
-    for i in range(numberOfBins):
-        binPoints = points[binLabels == i]
-        binDists = distToEdge[binLabels == i]
-        if len(binDists):
-            edgePoints.append(binPoints[binDists.argmax()])
-
-    return np.array(edgePoints)
+    edgePointIds = groupArgmax(binLabels, distToEdge, numberOfBins)
+    return points[edgePointIds[edgePointIds >= 0]]
 
 
 def computeCentroids(polyData, axis, binWidth=0.025):
@@ -3462,14 +3633,9 @@ def computeCentroids(polyData, axis, binWidth=0.025):
     binLabels = vtkNumpy.getNumpyFromVtk(polyData, 'bin_labels')
 
     numberOfBins = len(bins) - 1
-    centroids = []
-    for i in range(numberOfBins):
-        binPoints = points[binLabels == i]
-
-        if len(binPoints):
-            centroids.append(np.average(binPoints, axis=0))
-
-    return np.array(centroids)
+    counts = groupCounts(binLabels, numberOfBins)
+    centroids = groupMeans(binLabels, points, numberOfBins)
+    return centroids[counts > 0]
 
 
 def computePointCountsAlongAxis(polyData, axis, binWidth=0.025):
@@ -3477,16 +3643,10 @@ def computePointCountsAlongAxis(polyData, axis, binWidth=0.025):
     polyData = labelPointDistanceAlongAxis(polyData, axis, resultArrayName='dist_along_axis')
 
     polyData, bins = binByScalar(polyData, 'dist_along_axis', binWidth)
-    points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')
     binLabels = vtkNumpy.getNumpyFromVtk(polyData, 'bin_labels')
 
     numberOfBins = len(bins) - 1
-    binCount = []
-    for i in range(numberOfBins):
-        binPoints = points[binLabels == i]
-        binCount.append(len(binPoints))
-
-    return np.array(binCount)
+    return groupCounts(binLabels, numberOfBins)
 
 
 
@@ -4143,7 +4303,7 @@ def startDrillAutoSegmentation():
     picker.enabled = True
     picker.drawLines = False
     picker.start()
-    picker.annotationFunc = functools.partial(segmentDrillAuto)
+    picker.annotationFunc = functools.partial(segmentDrillAutoAsync)
 
 
 def startDrillButtonSegmentation():
@@ -0,0 +1,225 @@
+'''
+Runs segmentation pipelines on worker threads so that the GUI stays
+responsive during a fit.
+
+A pipeline is a function that only computes: it takes point clouds and
+parameters and returns its result without touching the object model or the
+views.  The executor calls it on a worker thread and delivers the result to
+done callbacks on the Qt main thread, where it is safe to show polydata or
+create affordances.  Pipelines report progress with task.setProgress(),
+which is also where a cancelled task stops: setProgress raises
+TaskCancelled once cancel() has been called.
+
+Only the Python and numpy parts of a pipeline run concurrently with the GUI.
+A long call into a vtk filter holds the interpreter lock unless vtk was
+built with VTK_PYTHON_FULL_THREADSAFE, so pipelines should pass copies of
+their input clouds and avoid sharing vtk objects with the main thread.
+'''
+
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from director.shallowCopy import deepCopy
+from director.timercallback import TimerCallback
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class SegmentationTask(object):
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, name=None):
+        self.name = name
+        self.state = self.PENDING
+        self.progress = 0.0
+        self.progressMessage = ''
+        self._result = None
+        self._exception = None
+        self._cancelRequested = threading.Event()
+        self._doneEvent = threading.Event()
+        self._doneCallbacks = []
+        self._progressCallbacks = []
+        self._reportedProgress = None
+
+    def cancel(self):
+        '''
+        Requests cancellation.  A task that has not started will not run, a
+        running task stops at its next setProgress() call.  Done callbacks
+        are called with the cancelled task.
+        '''
+        self._cancelRequested.set()
+
+    def isCancelRequested(self):
+        return self._cancelRequested.is_set()
+
+    def checkCancelled(self):
+        '''
+        Called from the pipeline.  Raises TaskCancelled if cancel() was called.
+        '''
+        if self._cancelRequested.is_set():
+            raise TaskCancelled()
+
+    def setProgress(self, fraction, message=None):
+        '''
+        Called from the pipeline to report progress as a fraction in [0, 1].
+        Raises TaskCancelled if cancel() was called.
+        '''
+        self.progress = fraction
+        if message is not None:
+            self.progressMessage = message
+        self.checkCancelled()
+
+    def isDone(self):
+        return self._doneEvent.is_set()
+
+    def wait(self, timeout=None):
+        return self._doneEvent.wait(timeout)
+
+    def result(self):
+        '''
+        Returns the result of a finished task, or raises the pipeline's
+        exception, or TaskCancelled.
+        '''
+        if not self.isDone():
+            raise RuntimeError('task %r is not done' % self.name)
+        if self.state == self.CANCELLED:
+            raise TaskCancelled()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        return self._exception
+
+    def addDoneCallback(self, callback):
+        '''
+        Adds callback(task), called on the main thread when the task is done.
+        '''
+        self._doneCallbacks.append(callback)
+
+    def addProgressCallback(self, callback):
+        '''
+        Adds callback(task), called on the main thread when the progress changes.
+        '''
+        self._progressCallbacks.append(callback)
+
+    def _run(self, func, args, kwargs):
+        if self._cancelRequested.is_set():
+            self.state = self.CANCELLED
+            return
+        self.state = self.RUNNING
+        try:
+            self._result = func(self, *args, **kwargs)
+            self.state = self.CANCELLED if self._cancelRequested.is_set() else self.FINISHED
+        except TaskCancelled:
+            self.state = self.CANCELLED
+        except Exception as e:
+            self._exception = e
+            self._traceback = traceback.format_exc()
+            self.state = self.FAILED
+
+    def _callCallbacks(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback(self)
+            except:
+                traceback.print_exc()
+
+    def _reportProgress(self):
+        progress = (self.progress, self.progressMessage)
+        if progress != self._reportedProgress:
+            self._reportedProgress = progress
+            self._callCallbacks(self._progressCallbacks)
+
+    def _finish(self):
+        self._reportProgress()
+        if self.state == self.FAILED:
+            print('segmentation task %r failed:' % self.name)
+            print(self._traceback)
+        self._doneEvent.set()
+        self._callCallbacks(self._doneCallbacks)
+
+
+class SegmentationExecutor(object):
+    '''
+    Runs pipelines on a pool of worker threads.  Construct and use it from
+    the main thread.
+    '''
+
+    def __init__(self, maxWorkers=1, pollFps=30):
+        self.pool = ThreadPoolExecutor(max_workers=maxWorkers)
+        self.tasks = []
+        self.finishedQueue = queue.Queue()
+        self.timer = TimerCallback(callback=self._onTimer, targetFps=pollFps)
+
+    def submit(self, func, *args, **kwargs):
+        '''
+        Schedules func(task, *args, **kwargs) on a worker thread and returns
+        the SegmentationTask.  The keyword argument name sets the task name.
+        '''
+        task = SegmentationTask(kwargs.pop('name', None))
+
+        def run():
+            try:
+                task._run(func, args, kwargs)
+            finally:
+                self.finishedQueue.put(task)
+
+        self.tasks.append(task)
+        self.pool.submit(run)
+        if not self.timer.isActive():
+            self.timer.start()
+        return task
+
+    def cancelAll(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def getPendingTasks(self):
+        return list(self.tasks)
+
+    def shutdown(self, wait=True):
+        self.cancelAll()
+        self.pool.shutdown(wait=wait)
+        self._onTimer()
+
+    def _onTimer(self):
+        while True:
+            try:
+                task = self.finishedQueue.get_nowait()
+            except queue.Empty:
+                break
+            self.tasks.remove(task)
+            task._finish()
+
+        for task in self.tasks:
+            task._reportProgress()
+
+        return bool(self.tasks)
+
+
+def copyInput(polyData):
+    '''
+    Returns a copy of polyData that the main thread will not modify while a
+    worker reads it.
+    '''
+    return deepCopy(polyData) if polyData is not None else None
+
+
+_defaultExecutor = None
+
+
+def getDefaultExecutor():
+    global _defaultExecutor
+    if _defaultExecutor is None:
+        _defaultExecutor = SegmentationExecutor()
+    return _defaultExecutor
@@ -15,7 +15,12 @@ from director import vtkAll as vtk
 
 from . import vtkNumpy
 import numpy as np
+import time
+import scipy.sparse
+import scipy.sparse.csgraph
+from scipy.spatial import cKDTree
 from .shallowCopy import shallowCopy
+from .spatialindex import getPointCloudIndex
 from .debugVis import DebugData
 
 
@@ -233,9 +238,13 @@ def applyEuclideanClustering(dataObj, clusterTolerance=0.05, minClusterSize=100,
     return shallowCopy(f.GetOutput())
 
 
-def extractClusters(polyData, clusterInXY=False, **kwargs):
+def extractClusters(polyData, clusterInXY=False, lazy=False, **kwargs):
     ''' Segment a single point cloud into smaller clusters
         using Euclidean Clustering
+
+        Returns a list of polydata, one per cluster.  If lazy is True,
+        returns a LabeledPointGroups object instead, which only builds the
+        polydata for a cluster when it is accessed.
      '''
 
     if not polyData.GetNumberOfPoints():
@@ -254,14 +263,288 @@ def extractClusters(polyData, clusterInXY=False, **kwargs):
 
     else:
         polyData = applyEuclideanClustering(polyData, **kwargs)
-        clusterLabels = vtkNumpy.getNumpyFromVtk(polyData, 'cluster_labels')
 
+    clusters = LabeledPointGroups(polyData, 'cluster_labels')
+    return clusters if lazy else list(clusters)
+
+
+class LabeledPointGroups(object):
+    '''
+    Splits a point cloud into groups of points that share a value of an
+    integer label array, with one group per label value from minLabel up to
+    the maximum label.  The labels are sorted once and the points and point
+    data arrays are gathered once into label order.  Each group is then a
+    contiguous slice of those buffers, and its polydata wraps the slices
+    without copying.  Polydata for a group is built the first time it is
+    accessed.
+    '''
+
+    def __init__(self, polyData, labelArrayName, minLabel=1):
+        labels = vtkNumpy.getNumpyFromVtk(polyData, labelArrayName)
+        self.order = np.argsort(labels, kind='stable')
+        sortedLabels = labels[self.order]
+
+        maxLabel = int(sortedLabels[-1]) if len(sortedLabels) else minLabel - 1
+        self.labelValues = np.arange(minLabel, maxLabel + 1)
+        self.starts = np.searchsorted(sortedLabels, self.labelValues, side='left')
+        self.ends = np.searchsorted(sortedLabels, self.labelValues, side='right')
+
+        self.points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')[self.order]
+        self.pointData = {name: array[self.order] for name, array in getPointDataArrays(polyData).items()}
+
+        normals = polyData.GetPointData().GetNormals()
+        self.normalsName = normals.GetName() if normals else None
+        self.groups = [None] * len(self.labelValues)
+
+    def __len__(self):
+        return len(self.labelValues)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('group index out of range')
+        if self.groups[i] is None:
+            self.groups[i] = self._createPolyData(i)
+        return self.groups[i]
+
+    def getLabel(self, i):
+        return self.labelValues[i]
+
+    def getPointIds(self, i):
+        '''
+        Returns the ids of the points of group i in the input polydata.
+        '''
+        return self.order[self.starts[i]:self.ends[i]]
+
+    def getPoints(self, i):
+        return self.points[self.starts[i]:self.ends[i]]
+
+    def getNumberOfPoints(self, i):
+        return self.ends[i] - self.starts[i]
+
+    def _createPolyData(self, i):
+        groupSlice = slice(self.starts[i], self.ends[i])
+        pointData = {name: array[groupSlice] for name, array in self.pointData.items()}
+        polyData = vtkNumpy.numpyToPolyData(self.points[groupSlice], pointData, createVertexCells=True, copy=False)
+        if self.normalsName:
+            polyData.GetPointData().SetNormals(polyData.GetPointData().GetArray(self.normalsName))
+        return polyData
+
+
+def getPointDataArrays(polyData):
+    '''
+    Returns a dict of numpy arrays for the numeric point data arrays.
+    '''
+    pointData = polyData.GetPointData()
+    arrays = {}
+    for i in range(pointData.GetNumberOfArrays()):
+        array = pointData.GetArray(i)
+        if array is None or array.GetDataType() == vtk.VTK_BIT or not array.GetName():
+            continue
+        arrays[array.GetName()] = vtkNumpy.getNumpyFromVtk(polyData, array.GetName())
+    return arrays
+
+
+def extractPointsById(polyData, pointIds):
+    '''
+    Returns a new polydata with vertex cells containing the given points of
+    polyData and their point data.
+    '''
+    pointIds = np.asarray(pointIds, dtype=np.intp)
+    points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')[pointIds]
+    pointData = {name: array[pointIds] for name, array in getPointDataArrays(polyData).items()}
+    result = vtkNumpy.numpyToPolyData(points, pointData, createVertexCells=True, copy=False)
+
+    normals = polyData.GetPointData().GetNormals()
+    if normals and normals.GetName():
+        result.GetPointData().SetNormals(result.GetPointData().GetArray(normals.GetName()))
+    return result
+
+
+def _getValidLabels(labels, numberOfLabels):
+    labels = np.asarray(labels)
+    valid = (labels >= 0) & (labels < numberOfLabels)
+    return labels.astype(np.intp), valid
+
+
+def groupCounts(labels, numberOfLabels):
+    '''
+    Returns the number of elements with each label in range(numberOfLabels).
+    Labels outside of that range are ignored.
+    '''
+    labels, valid = _getValidLabels(labels, numberOfLabels)
+    return np.bincount(labels[valid], minlength=numberOfLabels)
+
+
+def groupMeans(labels, values, numberOfLabels):
+    '''
+    Returns the mean of the values with each label in range(numberOfLabels).
+    values is an array of length N or shape (N,M).  The mean is NaN for labels
+    with no values.
+    '''
+    labels, valid = _getValidLabels(labels, numberOfLabels)
+    labels = labels[valid]
+    values = np.asarray(values, dtype=float)[valid]
+    counts = np.bincount(labels, minlength=numberOfLabels).astype(float)
+    counts[counts == 0] = np.nan
+
+    if values.ndim == 1:
+        return np.bincount(labels, weights=values, minlength=numberOfLabels) / counts
+
+    sums = np.column_stack([np.bincount(labels, weights=values[:,i], minlength=numberOfLabels)
+                            for i in range(values.shape[1])])
+    return sums / counts[:,np.newaxis]
+
+
+def groupArgmax(labels, values, numberOfLabels):
+    '''
+    Returns, for each label in range(numberOfLabels), the index of the element
+    with the largest value among the elements with that label, or -1 for
+    labels with no elements.  Ties resolve to the lowest index, like argmax.
+    '''
+    labels, valid = _getValidLabels(labels, numberOfLabels)
+    ids = np.flatnonzero(valid)
+    labels = labels[ids]
+    values = np.asarray(values)[ids]
+
+    # sort by label, then by value, then by descending index so that the
+    # last element of each label group is its first maximum
+    order = np.lexsort((-ids, values, labels))
+    sortedLabels = labels[order]
+
+    result = np.full(numberOfLabels, -1, dtype=np.intp)
+    ends = np.searchsorted(sortedLabels, np.arange(numberOfLabels), side='right')
+    counts = np.diff(np.concatenate(([0], ends)))
+    nonEmpty = counts > 0
+    result[nonEmpty] = ids[order[ends[nonEmpty] - 1]]
+    return result
+
+
+def fitPlaneRansac(points, distanceThreshold=0.02, iterations=200, batchSize=20):
+    '''
+    Fits a plane to the (N,3) points array with RANSAC.  Plane hypotheses are
+    scored in batches with vectorized distance computations, then the best
+    plane is refined with a least squares fit to its inliers.
+
+    Returns (origin, normal, inliers) where inliers is a boolean mask, or
+    None if there are fewer than 3 points.
+    '''
+    numPoints = len(points)
+    if numPoints < 3:
+        return None
+
+    bestCount = -1
+    bestPlane = None
+
+    for start in range(0, iterations, batchSize):
+        samples = points[np.random.randint(0, numPoints, size=(min(batchSize, iterations - start), 3))]
+        normals = np.cross(samples[:,1] - samples[:,0], samples[:,2] - samples[:,0])
+        norms = np.linalg.norm(normals, axis=1)
+        valid = norms > 1e-9
+        if not valid.any():
+            continue
+
+        normals = normals[valid] / norms[valid,np.newaxis]
+        offsets = np.einsum('ij,ij->i', normals, samples[valid,0])
+        counts = (np.abs(np.dot(points, normals.T) - offsets) < distanceThreshold).sum(axis=0)
+
+        best = np.argmax(counts)
+        if counts[best] > bestCount:
+            bestCount = counts[best]
+            bestPlane = (normals[best], offsets[best])
+
+    if bestPlane is None:
+        return None
+
+    normal, offset = bestPlane
+    inliers = np.abs(np.dot(points, normal) - offset) < distanceThreshold
+
+    if np.count_nonzero(inliers) >= 3:
+        origin = points[inliers].mean(axis=0)
+        normal = np.linalg.svd(points[inliers] - origin, full_matrices=False)[2][2]
+        inliers = np.abs(np.dot(points - origin, normal)) < distanceThreshold
+    else:
+        origin = normal*offset
+
+    return origin, normal, inliers
 
-    clusters = []
-    for i in range(1, clusterLabels.max() + 1):
-        cluster = thresholdPoints(polyData, 'cluster_labels', [i, i])
-        clusters.append(cluster)
-    return clusters
+
+def extractMajorPlanes(polyData, distanceThreshold=0.02, maxPlanes=25, minClusterSize=100,
+                       clusterTolerance=0.05, timeBudget=None, ransacIterations=200, progressFunction=None):
+    '''
+    Repeatedly fits the largest plane to the points that have not been
+    assigned yet, and labels the largest Euclidean cluster of the plane
+    inliers.  All plane inliers are removed from later fits.  This stops when
+    maxPlanes planes have been found, the largest cluster has no more than
+    minClusterSize points, or timeBudget seconds have elapsed.
+
+    The remaining points are tracked with a single index mask.  The
+    neighbor graph used for clustering is built from a KD-tree of each
+    plane's inliers only, so its cost follows the size of the plane rather
+    than the size of the cloud.
+
+    Returns (polyData, planes).  The returned polyData is a shallow copy of
+    the input with a 'plane_labels' point array, 0 for unlabeled points and
+    i+1 for points of plane i.  planes is a list of (origin, normal) tuples.
+
+    progressFunction(fraction, message) is called before each plane fit.
+    '''
+    startTime = time.time()
+
+    points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')
+    numPoints = len(points)
+    labels = np.zeros(numPoints, dtype=np.int32)
+    remaining = np.ones(numPoints, dtype=bool)
+    planes = []
+
+    while len(planes) < maxPlanes:
+
+        if timeBudget is not None and time.time() - startTime > timeBudget:
+            break
+
+        if progressFunction:
+            progressFunction(len(planes) / float(maxPlanes), 'fitting plane %d' % (len(planes) + 1))
+
+        remainingIds = np.flatnonzero(remaining)
+        fit = fitPlaneRansac(points[remainingIds], distanceThreshold, iterations=ransacIterations)
+        if fit is None:
+            break
+
+        origin, normal, inliers = fit
+        inlierIds = remainingIds[inliers]
+        clusterIds = _getLargestConnectedSubset(points, inlierIds, clusterTolerance)
+
+        if len(clusterIds) <= minClusterSize:
+            break
+
+        planes.append((origin, normal))
+        labels[clusterIds] = len(planes)
+        remaining[inlierIds] = False
+
+    polyData = shallowCopy(polyData)
+    vtkNumpy.addNumpyToVtk(polyData, labels, 'plane_labels')
+    return polyData, planes
+
+
+def _getLargestConnectedSubset(points, pointIds, clusterTolerance):
+    '''
+    Returns the ids of the largest Euclidean cluster of the given points,
+    where points closer than clusterTolerance are connected.
+    '''
+    if not len(pointIds):
+        return pointIds
+
+    edges = cKDTree(points[pointIds]).query_pairs(clusterTolerance, output_type='ndarray')
+    graph = scipy.sparse.coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:,0], edges[:,1])),
+                                    shape=(len(pointIds), len(pointIds)))
+    _, componentLabels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+    largest = np.argmax(np.bincount(componentLabels))
+    return pointIds[componentLabels == largest]
 
 
 def applyVoxelGrid(polyData, leafSize=0.01):
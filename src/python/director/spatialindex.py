@@ -0,0 +1,129 @@
+'''
+Spatial index for point cloud radius, box and nearest neighbor queries.
+
+An index is attached to the vtkPoints of a polydata, so shallow copies and
+the intermediate results of the segmentation helpers, which share their
+input points, also share one index.  The index is rebuilt when the points
+are modified.  Code that writes into the numpy view of the points must call
+Modified() on the points, as with any other vtk pipeline input.
+
+The kd-tree is built lazily.  The first query on a cloud is answered with a
+linear scan, and the tree is built when a second query arrives, so one-shot
+crops of temporary clouds do not pay for a tree they never reuse.
+
+getPointCloudIndex may be called from worker threads; the cache of indexes
+is guarded by a lock.
+'''
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from director import vtkNumpy
+
+
+class PointCloudIndex(object):
+
+    def __init__(self, points, buildAfterQueries=1):
+        self.points = points
+        self.tree = None
+        self.numberOfQueries = 0
+        self.buildAfterQueries = buildAfterQueries
+
+    def getTree(self):
+        if self.tree is None:
+            self.tree = cKDTree(self.points)
+        return self.tree
+
+    def _useTree(self):
+        self.numberOfQueries += 1
+        return self.tree is not None or self.numberOfQueries > self.buildAfterQueries
+
+    def queryRadius(self, point, radius):
+        '''
+        Returns the sorted ids of the points within radius of point.
+        '''
+        point = np.asarray(point, dtype=float)
+        if not len(self.points):
+            return np.zeros(0, dtype=np.intp)
+        if self._useTree():
+            ids = self.getTree().query_ball_point(point, radius)
+            return np.sort(np.asarray(ids, dtype=np.intp))
+        dists = np.sum((self.points - point)**2, axis=1)
+        return np.flatnonzero(dists <= radius**2)
+
+    def queryBox(self, origin, axes, halfExtents):
+        '''
+        Returns the sorted ids of the points inside an oriented box.  axes
+        is a list of three unit vectors and halfExtents the half lengths of
+        the box along each axis.
+        '''
+        origin = np.asarray(origin, dtype=float)
+        axes = np.asarray(axes, dtype=float)
+        halfExtents = np.asarray(halfExtents, dtype=float)
+
+        ids = self.queryRadius(origin, np.linalg.norm(halfExtents))
+        localPoints = np.dot(self.points[ids] - origin, axes.T)
+        inside = np.all(np.abs(localPoints) <= halfExtents, axis=1)
+        return ids[inside]
+
+    def queryNearest(self, point, k=1):
+        '''
+        Returns (distances, ids) of the k nearest points to point, sorted by
+        distance.
+        '''
+        k = min(k, len(self.points))
+        if self._useTree():
+            dists, ids = self.getTree().query(np.asarray(point, dtype=float), k=k)
+            return np.atleast_1d(dists), np.atleast_1d(ids)
+        dists = np.linalg.norm(self.points - point, axis=1)
+        ids = np.argpartition(dists, k - 1)[:k] if k else np.zeros(0, dtype=np.intp)
+        ids = ids[np.argsort(dists[ids], kind='stable')]
+        return dists[ids], ids
+
+
+_indexCache = OrderedDict()
+_indexCacheSize = 8
+_indexCacheLock = threading.Lock()
+
+
+def getPointCloudIndex(polyData):
+    '''
+    Returns the PointCloudIndex for the points of polyData, reusing the index
+    from an earlier call if the points have not been modified since.
+    '''
+    vtkPoints = polyData.GetPoints()
+    key = id(vtkPoints)
+    mtime = vtkPoints.GetMTime() if vtkPoints else 0
+    numberOfPoints = polyData.GetNumberOfPoints()
+
+    with _indexCacheLock:
+        entry = _indexCache.get(key)
+        if entry is not None:
+            cachedPoints, cachedTime, cachedSize, index = entry
+            if cachedPoints is vtkPoints and cachedTime == mtime and cachedSize == numberOfPoints:
+                _indexCache.move_to_end(key)
+                return index
+
+        if numberOfPoints:
+            points = vtkNumpy.getNumpyFromVtk(polyData, 'Points')
+        else:
+            points = np.zeros((0, 3))
+
+        index = PointCloudIndex(points)
+
+        # the cache holds a reference to the vtkPoints so that its id is not
+        # reused by another object while the entry exists
+        _indexCache[key] = (vtkPoints, mtime, numberOfPoints, index)
+        _indexCache.move_to_end(key)
+        while len(_indexCache) > _indexCacheSize:
+            _indexCache.popitem(last=False)
+
+    return index
+
+
+def clearIndexCache():
+    with _indexCacheLock:
+        _indexCache.clear()
@@ -22,25 +22,10 @@ from director import callbacks
 from director import camerabookmarks
 from director import cameracontrol
 from director import cameracontrolpanel
-from director import bihandeddemo
-from director import debrisdemo
-from director import doordemo
-from director import drilldemo
-from director import valvedemo
-from director import drivingplanner
-from director import egressplanner
-from director import polarisplatformplanner
-from director import surprisetask
-from director import continuouswalkingdemo
-from director import sitstandplanner
-from director import walkingtestdemo
-from director import terraintask
 from director import ikplanner
 from director import objectmodel as om
 from director import spreadsheet
 from director import transformUtils
-from director import tdx
-from director import skybox
 from director import perception
 from director import segmentation
 from director import cameraview
@@ -70,8 +55,6 @@ from director.jointpropagator import JointPropagator
 from director import planningutils
 from director import viewcolors
 
-from director import coursemodel
-
 from director import copmonitor
 from director import robotplanlistener
 from director import handdriver
@@ -94,9 +77,6 @@ from director.shallowCopy import shallowCopy
 from director import segmentationroutines
 from director import trackers
 
-from director import gamepad
-from director import blackoutmonitor
-
 from director.tasks import robottasks as rt
 from director.tasks import taskmanagerwidget
 from director.tasks.descriptions import loadTaskDescriptions
@@ -112,6 +92,29 @@ import math
 import numpy as np
 from director.debugVis import DebugData
 from director import ioUtils as io
+from director import lazyimport
+
+# Task demos and optional components are only imported when they are first
+# used.  Run director.importbenchmark to measure the cost of the imports
+# above.
+bihandeddemo = lazyimport.lazyImport('director.bihandeddemo')
+blackoutmonitor = lazyimport.lazyImport('director.blackoutmonitor')
+continuouswalkingdemo = lazyimport.lazyImport('director.continuouswalkingdemo')
+coursemodel = lazyimport.lazyImport('director.coursemodel')
+debrisdemo = lazyimport.lazyImport('director.debrisdemo')
+doordemo = lazyimport.lazyImport('director.doordemo')
+drilldemo = lazyimport.lazyImport('director.drilldemo')
+drivingplanner = lazyimport.lazyImport('director.drivingplanner')
+egressplanner = lazyimport.lazyImport('director.egressplanner')
+gamepad = lazyimport.lazyImport('director.gamepad')
+polarisplatformplanner = lazyimport.lazyImport('director.polarisplatformplanner')
+sitstandplanner = lazyimport.lazyImport('director.sitstandplanner')
+skybox = lazyimport.lazyImport('director.skybox')
+surprisetask = lazyimport.lazyImport('director.surprisetask')
+tdx = lazyimport.lazyImport('director.tdx')
+terraintask = lazyimport.lazyImport('director.terraintask')
+valvedemo = lazyimport.lazyImport('director.valvedemo')
+walkingtestdemo = lazyimport.lazyImport('director.walkingtestdemo')
 
 drcargs.requireStrict()
 drcargs.args()
@@ -145,6 +148,7 @@ useFootsteps = True
 useHands = True
 usePlanning = True
 useHumanoidDRCDemos = True
+useLazyTaskPanels = True
 useAtlasDriver = True
 useLCMGL = True
 useOctomap = True
@@ -447,63 +451,89 @@ if usePlanning:
 
     taskPanels = OrderedDict()
 
+    # the demos and task panels are constructed when they are first used,
+    # from the console as taskComponents.<name> or by showing their tab in
+    # the task panel.  Each one is also added to the console as <name> once
+    # it is constructed.
+    taskComponents = lazyimport.LazyComponents()
+
+    def onTaskComponentCreated(name, component):
+        globals()[name] = component
+
+    taskComponents.connectComponentCreated(onTaskComponentCreated)
+
     if useHumanoidDRCDemos:
-        debrisDemo = debrisdemo.DebrisPlannerDemo(robotStateModel, robotStateJointController, playbackRobotModel,
+        taskComponents.register('debrisDemo', lambda: debrisdemo.DebrisPlannerDemo(robotStateModel, robotStateJointController, playbackRobotModel,
                         ikPlanner, manipPlanner, atlasdriver.driver, lHandDriver,
-                        perception.multisenseDriver, refitBlocks)
+                        perception.multisenseDriver, refitBlocks))
 
-        drillDemo = drilldemo.DrillPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+        taskComponents.register('drillDemo', lambda: drilldemo.DrillPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
                         lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
                         fitDrillMultisense, robotStateJointController,
-                        playPlans, teleopPanel.showPose, cameraview, segmentationpanel)
-        drillTaskPanel = drilldemo.DrillTaskPanel(drillDemo)
+                        playPlans, teleopPanel.showPose, cameraview, segmentationpanel))
+        taskComponents.register('drillTaskPanel', lambda: drilldemo.DrillTaskPanel(taskComponents.drillDemo))
 
-        valveDemo = valvedemo.ValvePlannerDemo(robotStateModel, footstepsDriver, footstepsPanel, manipPlanner, ikPlanner,
-                                          lHandDriver, rHandDriver, robotStateJointController)
-        valveTaskPanel = valvedemo.ValveTaskPanel(valveDemo)
+        taskComponents.register('valveDemo', lambda: valvedemo.ValvePlannerDemo(robotStateModel, footstepsDriver, footstepsPanel, manipPlanner, ikPlanner,
+                                          lHandDriver, rHandDriver, robotStateJointController))
+        taskComponents.register('valveTaskPanel', lambda: valvedemo.ValveTaskPanel(taskComponents.valveDemo))
 
-        continuouswalkingDemo = continuouswalkingdemo.ContinousWalkingDemo(robotStateModel, footstepsPanel, footstepsDriver, playbackPanel, robotStateJointController, ikPlanner,
-                                                                           teleopJointController, navigationPanel, cameraview)
-        continuousWalkingTaskPanel = continuouswalkingdemo.ContinuousWalkingTaskPanel(continuouswalkingDemo)
+        taskComponents.register('continuouswalkingDemo', lambda: continuouswalkingdemo.ContinousWalkingDemo(robotStateModel, footstepsPanel, footstepsDriver, playbackPanel, robotStateJointController, ikPlanner,
+                                                                           teleopJointController, navigationPanel, cameraview))
+        taskComponents.register('continuousWalkingTaskPanel', lambda: continuouswalkingdemo.ContinuousWalkingTaskPanel(taskComponents.continuouswalkingDemo))
 
-        useDrivingPlanner = drivingplanner.DrivingPlanner.isCompatibleWithConfig()
+        # the test of DrivingPlanner.isCompatibleWithConfig, without importing drivingplanner
+        useDrivingPlanner = 'drivingThrottleJoint' in drcargs.getDirectorConfig()
         if useDrivingPlanner:
-            drivingPlannerPanel = drivingplanner.DrivingPlannerPanel(robotSystem)
+            taskComponents.register('drivingPlannerPanel', lambda: drivingplanner.DrivingPlannerPanel(robotSystem))
 
-        walkingDemo = walkingtestdemo.walkingTestDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+        taskComponents.register('walkingDemo', lambda: walkingtestdemo.walkingTestDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
                         lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
                         robotStateJointController,
-                        playPlans, showPose)
+                        playPlans, showPose))
 
-        bihandedDemo = bihandeddemo.BihandedPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+        taskComponents.register('bihandedDemo', lambda: bihandeddemo.BihandedPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
                         lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
                         fitDrillMultisense, robotStateJointController,
-                        playPlans, showPose, cameraview, segmentationpanel)
+                        playPlans, showPose, cameraview, segmentationpanel))
 
-        doorDemo = doordemo.DoorDemo(robotStateModel, footstepsDriver, manipPlanner, ikPlanner,
+        taskComponents.register('doorDemo', lambda: doordemo.DoorDemo(robotStateModel, footstepsDriver, manipPlanner, ikPlanner,
                                           lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
                                           fitDrillMultisense, robotStateJointController,
-                                          playPlans, showPose)
-        doorTaskPanel = doordemo.DoorTaskPanel(doorDemo)
-
-        terrainTaskPanel = terraintask.TerrainTaskPanel(robotSystem)
-        terrainTask = terrainTaskPanel.terrainTask
-
-        surpriseTaskPanel = surprisetask.SurpriseTaskPanel(robotSystem)
-        surpriseTask = surpriseTaskPanel.planner
-        egressPanel = egressplanner.EgressPanel(robotSystem)
-        egressPlanner = egressPanel.egressPlanner
+                                          playPlans, showPose))
+        taskComponents.register('doorTaskPanel', lambda: doordemo.DoorTaskPanel(taskComponents.doorDemo))
+
+        taskComponents.register('terrainTaskPanel', lambda: terraintask.TerrainTaskPanel(robotSystem))
+        taskComponents.register('terrainTask', lambda: taskComponents.terrainTaskPanel.terrainTask)
+
+        taskComponents.register('surpriseTaskPanel', lambda: surprisetask.SurpriseTaskPanel(robotSystem))
+        taskComponents.register('surpriseTask', lambda: taskComponents.surpriseTaskPanel.planner)
+        taskComponents.register('egressPanel', lambda: egressplanner.EgressPanel(robotSystem))
+        taskComponents.register('egressPlanner', lambda: taskComponents.egressPanel.egressPlanner)
+
+        # these subscribe to LCM channels when they are constructed, so they
+        # are created now to receive messages before their tab is shown.
+        # Only their widgets are deferred.
+        taskComponents.get('drillDemo')
+        taskComponents.get('walkingDemo')
+        taskComponents.get('continuouswalkingDemo')
+        if useDrivingPlanner:
+            taskComponents.get('drivingPlannerPanel')
 
         if useDrivingPlanner:
-            taskPanels['Driving'] = drivingPlannerPanel.widget
+            taskPanels['Driving'] = lambda: taskComponents.drivingPlannerPanel.widget
 
-        taskPanels['Egress'] = egressPanel.widget
-        taskPanels['Door'] = doorTaskPanel.widget
-        taskPanels['Valve'] = valveTaskPanel.widget
-        taskPanels['Drill'] = drillTaskPanel.widget
-        taskPanels['Surprise'] = surpriseTaskPanel.widget
-        taskPanels['Terrain'] = terrainTaskPanel.widget
-        taskPanels['Continuous Walking'] = continuousWalkingTaskPanel.widget
+        taskPanels['Egress'] = lambda: taskComponents.egressPanel.widget
+        taskPanels['Door'] = lambda: taskComponents.doorTaskPanel.widget
+        taskPanels['Valve'] = lambda: taskComponents.valveTaskPanel.widget
+        taskPanels['Drill'] = lambda: taskComponents.drillTaskPanel.widget
+        taskPanels['Surprise'] = lambda: taskComponents.surpriseTaskPanel.widget
+        taskPanels['Terrain'] = lambda: taskComponents.terrainTaskPanel.widget
+        taskPanels['Continuous Walking'] = lambda: taskComponents.continuousWalkingTaskPanel.widget
+
+    if not useLazyTaskPanels:
+        taskComponents.createAll()
+        for name, createWidget in list(taskPanels.items()):
+            taskPanels[name] = createWidget()
 
     tasklaunchpanel.init(taskPanels)
 
@@ -815,6 +845,8 @@ app.resetCamera(viewDirection=[-1,0,0], view=view)
 useDrillDemo = False
 if useDrillDemo:
 
+    drillDemo = taskComponents.drillDemo
+
     def spawnHandAtCurrentLocation(side='left'):
         if (side is 'left'):
             tf = transformUtils.copyFrame( getLinkFrame( 'l_hand_face') )
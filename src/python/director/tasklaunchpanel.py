@@ -5,12 +5,21 @@ import functools
 class TaskLaunchPanel(object):
 
     def __init__(self, widgetMap):
+        '''
+        widgetMap maps tab names to task panel widgets, or to functions that
+        return the widget.  A function is called when its tab is first shown.
+        '''
 
         self.widget = QtGui.QTabWidget()
         self.widget.setWindowTitle('Task Panel')
+        self.widgetFactories = {}
+        self.widget.connect('currentChanged(int)', self._onCurrentChanged)
 
         for name, widget in widgetMap.items():
-            self.addTaskPanel(name, widget)
+            if isinstance(widget, QtGui.QWidget):
+                self.addTaskPanel(name, widget)
+            else:
+                self.addLazyTaskPanel(name, widget)
 
     def getTaskPanelNames(self):
         return [self.widget.tabText(i) for i in range(self.widget.count)]
@@ -18,20 +27,50 @@ class TaskLaunchPanel(object):
     def removeTaskPanel(self, taskPanelName):
         names = self.getTaskPanelNames()
         assert taskPanelName in names
+        self.widgetFactories.pop(taskPanelName, None)
         self.widget.removeTab(names.index(taskPanelName))
 
     def clear(self):
+        self.widgetFactories.clear()
         self.widget.clear()
 
     def addTaskPanel(self, taskPanelName, taskPanelWidget):
         self.widget.addTab(taskPanelWidget, taskPanelName)
 
+    def addLazyTaskPanel(self, taskPanelName, widgetFactory):
+        '''
+        Adds a tab with an empty widget.  widgetFactory is called to create
+        the task panel widget when the tab is first shown.
+        '''
+        self.widgetFactories[taskPanelName] = widgetFactory
+        self.widget.addTab(QtGui.QWidget(), taskPanelName)
+
+    def _createTaskPanel(self, index):
+        taskPanelName = self.widget.tabText(index)
+        widgetFactory = self.widgetFactories.pop(taskPanelName, None)
+        if widgetFactory is None:
+            return
+
+        taskPanelWidget = widgetFactory()
+        placeholder = self.widget.widget(index)
+        isCurrent = self.widget.currentIndex == index
+        self.widget.insertTab(index, taskPanelWidget, taskPanelName)
+        self.widget.removeTab(index + 1)
+        placeholder.deleteLater()
+        if isCurrent:
+            self.widget.setCurrentIndex(index)
+
+    def _onCurrentChanged(self, index):
+        if index >= 0 and self.widget.visible:
+            self._createTaskPanel(index)
+
     def showTaskLaunchPanel(self):
 
         widget = self.widget
         widget.show()
         widget.raise_()
         widget.activateWindow()
+        self._createTaskPanel(widget.currentIndex)
 
 
 def _getAction():
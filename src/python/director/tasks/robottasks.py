@@ -655,7 +655,7 @@ class FindHorizontalSurfaces(PointCloudAlgorithmBase):
 
     def run(self):
         polyData = self.getPointCloud()
-        segmentation.findHorizontalSurfaces(polyData,
+        task = segmentation.findHorizontalSurfacesAsync(polyData,
           removeGroundFirst=True,
           showClusters=True,
           normalEstimationSearchRadius=self.properties.getProperty('Normal estimation search radius'),
@@ -665,6 +665,13 @@ class FindHorizontalSurfaces(PointCloudAlgorithmBase):
           normalsDotUpRange=self.properties.getProperty('Normals dot up range')
           )
 
+        while not task.isDone():
+            self.statusMessage = 'Finding horizontal surfaces: %s' % task.progressMessage
+            yield
+
+        if task.state != task.FINISHED:
+            self.fail('horizontal surface fit did not finish')
+
 
 class SetNeckPitch(AsyncTask):
 
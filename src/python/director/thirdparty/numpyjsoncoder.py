@@ -15,7 +15,7 @@ class NumpyEncoder(json.JSONEncoder):
             if np.prod(obj.shape) <= 16 and obj.dtype == np.float64:
                 return dict(__ndarray__=obj.tolist())
             else:
-                data_b64 = str(base64.b64encode(obj.data))
+                data_b64 = base64.b64encode(np.ascontiguousarray(obj).data).decode('ascii')
                 return dict(__ndarray__=data_b64,
                             dtype=str(obj.dtype),
                             shape=obj.shape)
@@ -42,7 +42,11 @@ def NumpyDecoder(dct):
     if isinstance(dct, dict) and '__ndarray__' in dct:
 
         if 'dtype' in dct:
-            data = base64.b64decode(dct['__ndarray__'])
+            data_b64 = dct['__ndarray__']
+            # older python 3 encoders wrote the repr of the bytes object
+            if data_b64.startswith("b'"):
+                data_b64 = data_b64[2:-1]
+            data = base64.b64decode(data_b64)
             return np.frombuffer(data, dct['dtype']).reshape(dct['shape'])
         else:
             return np.array(dct['__ndarray__'])
@@ -1,15 +1,18 @@
 import time
 from PythonQt import QtCore
 import traceback
+from director import timerstats
 
 class TimerCallback(object):
 
-    def __init__(self, targetFps=30, callback=None):
+    def __init__(self, targetFps=30, callback=None, name=None):
         '''
         Construct TimerCallback.  The targetFps defines frames per second, the
-        frequency for the ticks() callback method.
+        frequency for the ticks() callback method.  The name identifies the
+        timer in director.timerstats.
         '''
         self.targetFps = targetFps
+        self.name = name
         self.timer = QtCore.QTimer()
         self.enableScheduledTimer()
 
@@ -26,6 +29,7 @@ class TimerCallback(object):
 
         self.startTime = time.time()
         self.lastTickTime = self.startTime
+        self.hasTicked = False
 
         if self.useScheduledTimer:
             self.timer.start(0)
@@ -94,7 +98,12 @@ class TimerCallback(object):
             self.stop()
             raise
 
+        if timerstats.isEnabled():
+            timerstats.getRegistry().addTick(timerstats.getTimerName(self), time.time() - startTime,
+                                             self.elapsed if self.hasTicked else None, self.targetFps)
+
         if result is not False:
+            self.hasTicked = True
             self.lastTickTime = startTime
             if self.useScheduledTimer:
                 self._schedule(time.time() - startTime)
@@ -0,0 +1,197 @@
+'''
+Records how long TimerCallback ticks take, per named timer, to find the
+timers that use up the GUI thread's frame budget.
+
+Recording is off by default.  Call enable() to start it, then getStats(),
+printReport() or writeCsv() to inspect the results:
+
+    from director import timerstats
+    timerstats.enable()
+    ...
+    timerstats.printReport()
+    timerstats.writeCsv('/tmp/timers.csv')
+
+A timer's name is the name argument of TimerCallback, or else the name of
+its callback or TimerCallback subclass.  Timers with the same name share
+one entry.  A tick is an overrun when it takes longer than the timer's
+frame period, 1/targetFps.
+'''
+
+import bisect
+import csv
+import time
+
+
+# upper edges in milliseconds of the tick duration histogram bins, the last
+# bin holds longer ticks
+HISTOGRAM_BIN_EDGES = [1, 2, 4, 8, 16, 33, 66, 100, 250, 500, 1000]
+
+
+class TimerStats(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.targetFps = 0.0
+        self.numberOfTicks = 0
+        self.numberOfOverruns = 0
+        self.totalTickTime = 0.0
+        self.maxTickTime = 0.0
+        self.totalIntervalTime = 0.0
+        self.numberOfIntervals = 0
+        self.lastTickTime = None
+        self.histogram = [0] * (len(HISTOGRAM_BIN_EDGES) + 1)
+
+    def addTick(self, tickTime, interval, targetFps):
+        '''
+        Records a tick that took tickTime seconds and started interval
+        seconds after the previous tick of the timer.  interval is None for
+        the first tick after the timer starts.
+        '''
+        self.targetFps = targetFps
+        self.numberOfTicks += 1
+        self.totalTickTime += tickTime
+        self.maxTickTime = max(self.maxTickTime, tickTime)
+        self.lastTickTime = time.time()
+        self.histogram[bisect.bisect_left(HISTOGRAM_BIN_EDGES, tickTime*1000.0)] += 1
+
+        if targetFps and tickTime > 1.0 / targetFps:
+            self.numberOfOverruns += 1
+
+        if interval is not None:
+            self.totalIntervalTime += interval
+            self.numberOfIntervals += 1
+
+    def getMeanTickTime(self):
+        return self.totalTickTime / self.numberOfTicks if self.numberOfTicks else 0.0
+
+    def getAchievedFps(self):
+        return self.numberOfIntervals / self.totalIntervalTime if self.totalIntervalTime else 0.0
+
+    def getHistogram(self):
+        '''
+        Returns a list of (upperEdgeMilliseconds, count) pairs.  The upper
+        edge of the last bin is inf.
+        '''
+        return list(zip(HISTOGRAM_BIN_EDGES + [float('inf')], self.histogram))
+
+    def toDict(self):
+        d = dict(name=self.name,
+                 ticks=self.numberOfTicks,
+                 target_fps=self.targetFps,
+                 achieved_fps=self.getAchievedFps(),
+                 total_ms=self.totalTickTime*1000.0,
+                 mean_ms=self.getMeanTickTime()*1000.0,
+                 max_ms=self.maxTickTime*1000.0,
+                 overruns=self.numberOfOverruns)
+        for edge, count in self.getHistogram():
+            d[getHistogramColumnName(edge)] = count
+        return d
+
+
+class TimerStatsRegistry(object):
+
+    def __init__(self):
+        self.stats = {}
+        self.enabled = False
+        self.startTime = time.time()
+
+    def addTick(self, name, tickTime, interval, targetFps):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = TimerStats(name)
+        stats.addTick(tickTime, interval, targetFps)
+
+    def reset(self):
+        self.stats.clear()
+        self.startTime = time.time()
+
+    def getStats(self, sortBy='total_ms'):
+        '''
+        Returns a list of dicts, one per timer, sorted by decreasing sortBy.
+        '''
+        rows = [stats.toDict() for stats in self.stats.values()]
+        return sorted(rows, key=lambda row: row[sortBy], reverse=True)
+
+    def getFrameBudgetFraction(self):
+        '''
+        Returns the fraction of the wall time since the last reset that was
+        spent in ticks.
+        '''
+        elapsed = time.time() - self.startTime
+        total = sum(stats.totalTickTime for stats in self.stats.values())
+        return total / elapsed if elapsed > 0 else 0.0
+
+    def formatReport(self, sortBy='total_ms', maxRows=None):
+        columns = ['ticks', 'target_fps', 'achieved_fps', 'total_ms', 'mean_ms', 'max_ms', 'overruns']
+        rows = self.getStats(sortBy)[:maxRows]
+        nameWidth = max([len('name')] + [len(row['name']) for row in rows])
+        lines = ['%-*s ' % (nameWidth, 'name') + ' '.join('%12s' % c for c in columns)]
+        for row in rows:
+            values = ['%12d' % row[c] if isinstance(row[c], int) else '%12.2f' % row[c] for c in columns]
+            lines.append('%-*s ' % (nameWidth, row['name']) + ' '.join(values))
+        lines.append('%.1f%% of the time since reset was spent in timer ticks' % (100.0*self.getFrameBudgetFraction()))
+        return '\n'.join(lines)
+
+    def writeCsv(self, filename, sortBy='total_ms'):
+        rows = self.getStats(sortBy)
+        fieldNames = ['name', 'ticks', 'target_fps', 'achieved_fps', 'total_ms', 'mean_ms', 'max_ms', 'overruns']
+        fieldNames += [getHistogramColumnName(edge) for edge in HISTOGRAM_BIN_EDGES + [float('inf')]]
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldNames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def getHistogramColumnName(edge):
+    return 'hist_le_%dms' % edge if edge != float('inf') else 'hist_gt_%dms' % HISTOGRAM_BIN_EDGES[-1]
+
+
+def getTimerName(timer):
+    '''
+    Returns the name under which the ticks of a TimerCallback are recorded.
+    '''
+    if timer.name:
+        return timer.name
+    callback = timer.callback
+    if callback is not None:
+        name = getattr(callback, '__qualname__', None) or type(callback).__name__
+        return '%s.%s' % (getattr(callback, '__module__', None) or '?', name)
+    timerClass = type(timer)
+    return '%s.%s' % (timerClass.__module__, timerClass.__qualname__)
+
+
+_registry = TimerStatsRegistry()
+
+
+def getRegistry():
+    return _registry
+
+
+def isEnabled():
+    return _registry.enabled
+
+
+def enable(reset=True):
+    if reset:
+        _registry.reset()
+    _registry.enabled = True
+
+
+def disable():
+    _registry.enabled = False
+
+
+def reset():
+    _registry.reset()
+
+
+def getStats(sortBy='total_ms'):
+    return _registry.getStats(sortBy)
+
+
+def printReport(sortBy='total_ms', maxRows=None):
+    print(_registry.formatReport(sortBy, maxRows))
+
+
+def writeCsv(filename, sortBy='total_ms'):
+    _registry.writeCsv(filename, sortBy)
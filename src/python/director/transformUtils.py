@@ -163,6 +163,33 @@ def transformFromPose(position, quaternion):
     return getTransformFromNumpy(mat)
 
 
+def matricesFromPoses(positions, quaternions):
+    '''
+    Given (N,3) positions and (N,4) wxyz quaternions, returns an (N,4,4)
+    array of homogeneous transform matrices.
+    '''
+    q = np.array(quaternions, dtype=float)
+    norms = np.linalg.norm(q, axis=1)
+    degenerate = norms < 1e-12
+    q[degenerate] = [1.0, 0.0, 0.0, 0.0]
+    norms[degenerate] = 1.0
+    w, x, y, z = (q / norms[:,np.newaxis]).T
+
+    mats = np.zeros((len(q), 4, 4))
+    mats[:,0,0] = 1.0 - 2.0*(y*y + z*z)
+    mats[:,0,1] = 2.0*(x*y - z*w)
+    mats[:,0,2] = 2.0*(x*z + y*w)
+    mats[:,1,0] = 2.0*(x*y + z*w)
+    mats[:,1,1] = 1.0 - 2.0*(x*x + z*z)
+    mats[:,1,2] = 2.0*(y*z - x*w)
+    mats[:,2,0] = 2.0*(x*z - y*w)
+    mats[:,2,1] = 2.0*(y*z + x*w)
+    mats[:,2,2] = 1.0 - 2.0*(x*x + y*y)
+    mats[:,:3,3] = positions
+    mats[:,3,3] = 1.0
+    return mats
+
+
 def poseFromTransform(transform):
     '''
     Returns position, quaternion
@@ -197,6 +224,36 @@ def quaternionToRollPitchYaw(quat):
     return transformations.euler_from_quaternion(quat)
 
 
+def quaternionsToRollPitchYaw(quats):
+    '''
+    Vectorized quaternionToRollPitchYaw.  Given an N x 4 array of w,x,y,z
+    quaternions, returns an N x 3 array of roll, pitch, yaw.
+    '''
+    quats = np.asarray(quats, dtype=float).reshape(-1, 4)
+    w, x, y, z = quats.T
+    n = np.sum(quats**2, axis=1)
+    identity = n < transformations._EPS
+    s = 2.0 / np.where(identity, 1.0, n)
+
+    # rotation matrix entries, as in transformations.quaternion_matrix
+    m00 = np.where(identity, 1.0, 1.0 - s*(y*y + z*z))
+    m10 = np.where(identity, 0.0, s*(x*y + w*z))
+    m20 = np.where(identity, 0.0, s*(x*z - w*y))
+    m21 = np.where(identity, 0.0, s*(y*z + w*x))
+    m22 = np.where(identity, 1.0, 1.0 - s*(x*x + y*y))
+    m12 = np.where(identity, 0.0, s*(y*z - w*x))
+    m11 = np.where(identity, 1.0, 1.0 - s*(x*x + z*z))
+
+    # the static xyz case of transformations.euler_from_matrix
+    cy = np.sqrt(m00*m00 + m10*m10)
+    singular = cy <= transformations._EPS
+    rpy = np.empty((len(quats), 3))
+    rpy[:, 0] = np.where(singular, np.arctan2(-m12, m11), np.arctan2(m21, m22))
+    rpy[:, 1] = np.arctan2(-m20, cy)
+    rpy[:, 2] = np.where(singular, 0.0, np.arctan2(m10, m00))
+    return rpy
+
+
 def copyFrame(transform):
     t = vtk.vtkTransform()
     t.PostMultiply()
@@ -19,6 +19,7 @@ from director import vtkAll as vtk
 from director import vtkNumpy as vnp
 from director import visualization as vis
 from director import packagepath
+from director import treeviewercodec
 from director.shallowCopy import shallowCopy
 
 import robotlocomotion as lcmrl
@@ -28,6 +29,7 @@ from PythonQt import QtGui
 USE_TEXTURE_MESHES = True
 USE_SHADOWS = False
 DEFAULT_COLOR = [1, 1, 1, 1]
+SUPPORTED_FORMATS = {"treeviewer_json": ["1.0", "2.0"]}
 
 class ViewerStatus:
     OK = 0
@@ -412,6 +414,13 @@ class TreeViewer(object):
         self.view = view
         self.itemToPathCache = {}
         self.pathToItemCache = {}
+        self.geometryHashes = {}
+
+        # flat table of the transform of each path, and the set of paths
+        # known to have child items, used by the settransform fast path
+        self.pathTransforms = {}
+        self.pathsWithChildren = set()
+
         self.client_id_regex = re.compile(r'\<(.*)\>')
         self.enable()
         self.sendStatusMessage(
@@ -469,19 +478,19 @@ class TreeViewer(object):
 
     def decodeCommsMsg(self, msg):
         if msg.format == "treeviewer_json":
-            if msg.format_version_major == 1 and msg.format_version_minor == 0:
+            version = (msg.format_version_major, msg.format_version_minor)
+            if version == (1, 0):
                 data = json.loads(msg.data.decode())
                 return data, ViewerResponse(ViewerStatus.OK, {})
+            elif version == (2, 0):
+                data = treeviewercodec.decodePayload(msg.data)
+                return data, ViewerResponse(ViewerStatus.OK, {})
             else:
                 return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT_VERSION,
-                                            {"supported_formats": {
-                                                 "treeviewer_json": ["1.0"]
-                                            }})
+                                            {"supported_formats": SUPPORTED_FORMATS})
         else:
             return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT,
-                                        {"supported_formats": {
-                                             "treeviewer_json": ["1.0"]
-                                        }})
+                                        {"supported_formats": SUPPORTED_FORMATS})
 
     def onViewerRequest(self, msg, channel="DIRECTOR_TREE_VIEWER_REQUEST"):
         match = self.client_id_regex.search(channel)
@@ -513,9 +522,13 @@ class TreeViewer(object):
             warnings.warn("The 'draw' cmmand has been deprecated. Please use 'settransform' instead", DeprecationWarning)
             data["settransform"] = data["draw"]
         for command in data["setgeometry"]:
-            addedGeometries.add(tuple(self.handleSetGeometry(command)))
-        for command in data["settransform"]:
-            path, missingGeometry = self.handleSetTransform(command)
+            if "geometry" in command or "geometries" in command:
+                addedGeometries.add(tuple(self.handleSetGeometry(command)))
+            elif self.geometryHashes.get(tuple(command["path"])) != command.get("geometry_hash"):
+                # the client only sent a content hash, and it does not match
+                # the geometry we have, so ask for the full geometry
+                missingPaths.add(tuple(command["path"]))
+        for path, missingGeometry in self.handleSetTransforms(data["settransform"]):
             setTransforms.add(tuple(path))
             if missingGeometry:
                 missingPaths.add(tuple(path))
@@ -525,7 +538,10 @@ class TreeViewer(object):
             "set_transforms": list(setTransforms),
             "missing_paths": list(missingPaths)
         }
-        self.view.render()
+        # view.render() only marks the view for rendering, the view's render
+        # timer coalesces requests into at most one render per frame
+        if deletedPaths or addedGeometries or setTransforms:
+            self.view.render()
         # print "result:", result
         if not missingPaths:
             return ViewerResponse(ViewerStatus.OK, result)
@@ -538,6 +554,7 @@ class TreeViewer(object):
             geometry = Geometry([command["geometry"]])
         else:
             geometry = Geometry(command["geometries"])
+        self.geometryHashes[tuple(path)] = command.get("geometry_hash")
         return self.setGeometry(path, geometry)
 
     @staticmethod
@@ -550,14 +567,11 @@ class TreeViewer(object):
                 break
 
     def setGeometry(self, path, geometry):
+        path = tuple(path)
         folder = self.getPathFolder(path)
-        ancestors = findPathToAncestor(folder, self.getRootFolder())
         geomTransform = vtk.vtkTransform()
-        for item in reversed(ancestors):
-            if not hasattr(item, "transform"):
-                item.transform = vtk.vtkTransform()
-                item.transform.PostMultiply()
-            geomTransform.Concatenate(item.transform)
+        for i in range(len(path) + 1):
+            geomTransform.Concatenate(self.getPathTransform(path[:i]))
 
         geometryName = folder.getProperty("Name")
         item = folder.findChild(geometryName)
@@ -565,6 +579,7 @@ class TreeViewer(object):
             item = geometry.createPolyDataItem(name=geometryName)
             item.addToView(self.view)
             om.addToObjectModel(item, parentObj=folder)
+            self.pathsWithChildren.add(path)
         else:
             item.setPolyData(geometry.polyData)
             geometry.updatePolyDataItemProperties(item)
@@ -574,6 +589,22 @@ class TreeViewer(object):
 
         return path
 
+    def getPathTransform(self, path):
+        """
+        Returns the vtkTransform of the folder at the given path, creating
+        an identity transform if the folder does not have one yet.
+        """
+        path = tuple(path)
+        transform = self.pathTransforms.get(path)
+        if transform is None:
+            folder = self.getPathFolder(path)
+            if not hasattr(folder, "transform"):
+                folder.transform = vtk.vtkTransform()
+                folder.transform.PostMultiply()
+            transform = folder.transform
+            self.pathTransforms[path] = transform
+        return transform
+
     def getPathForItem(self, item):
         return [x.getProperty("Name") for x in reversed(findPathToAncestor(
             item, self.getRootFolder())[:-1])]
@@ -582,13 +613,49 @@ class TreeViewer(object):
         return self._setTransform(command["path"],
                                   transformFromDict(command["transform"]))
 
+    def handleSetTransforms(self, commands):
+        """
+        Applies a batch of settransform commands.  The matrices for all
+        commands are computed in one vectorized call, then written to the
+        transforms of known paths without going through the object model.
+        Returns a list of (path, missingGeometry) tuples.
+        """
+        if not commands:
+            return []
+
+        poses = [command["transform"] for command in commands]
+        mats = transformUtils.matricesFromPoses(
+            [pose.get("translation", [0, 0, 0]) for pose in poses],
+            [pose.get("quaternion", [1, 0, 0, 0]) for pose in poses])
+
+        results = []
+        for command, mat in zip(commands, mats):
+            path = tuple(command["path"])
+            transform = self.pathTransforms.get(path)
+            if transform is None:
+                results.append(self._setTransform(path, transformUtils.getTransformFromNumpy(mat)))
+            else:
+                transform.SetMatrix(mat.flatten())
+                results.append((path, not self._hasChildren(path)))
+        return results
+
+    def _hasChildren(self, path):
+        if path in self.pathsWithChildren:
+            return True
+        if self.getPathFolder(path).children():
+            self.pathsWithChildren.add(path)
+            return True
+        return False
+
     def _setTransform(self, path, transform):
+        path = tuple(path)
         folder = self.getPathFolder(path)
         if not hasattr(folder, "transform"):
             folder.transform = transform
         else:
             folder.transform.SetMatrix(transform.GetMatrix())
-        return path, len(folder.children()) == 0
+        self.pathTransforms[path] = folder.transform
+        return path, not self._hasChildren(path)
 
     def handleDeletePath(self, command):
         path = command["path"]
@@ -614,6 +681,11 @@ class TreeViewer(object):
         if item in self.itemToPathCache:
             path = self.itemToPathCache[item]
             del self.itemToPathCache[item]
+            self.geometryHashes.pop(path, None)
+            self.pathTransforms.pop(path, None)
+            self.pathsWithChildren.discard(path)
+            # the parent may have other children, it is checked again on demand
+            self.pathsWithChildren.discard(path[:-1])
             if path in self.pathToItemCache:
                 del self.pathToItemCache[path]
 
@@ -625,9 +697,10 @@ class TreeViewer(object):
         else:
             # print "miss for path:", path
             folder = self.getRootFolder()
-            for element in path:
+            for i, element in enumerate(path):
                 folder = om.getOrCreateContainer(element, parentObj=folder)
                 folder.connectRemovedFromObjectModel(self.onItemRemoved)
+                self.pathsWithChildren.add(path[:i])
             self.pathToItemCache[path] = folder
             self.itemToPathCache[folder] = path
             return folder
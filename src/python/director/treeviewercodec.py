@@ -0,0 +1,167 @@
+'''
+Binary payload encoding for the tree viewer protocol (treeviewer_json
+version 2.0).  A payload is a small JSON header followed by the raw little
+endian buffers of every numpy array in the request, so large point clouds
+and meshes are not converted to JSON lists of floats.
+
+Payload layout:
+
+    uint32      header length in bytes (little endian)
+    bytes       utf-8 JSON header
+    padding     to an 8 byte boundary
+    bytes       array buffers, each starting on an 8 byte boundary
+
+In the header each array is replaced by a placeholder object:
+
+    {"__ndarray__": <buffer index>, "dtype": "<f4", "shape": [N, 3]}
+
+and the header has a "__buffers__" list of [offset, nbytes] pairs, with
+offsets relative to the start of the buffer section.
+'''
+
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+
+ARRAY_KEY = '__ndarray__'
+BUFFERS_KEY = '__buffers__'
+HEADER_SIZE = struct.Struct('<I')
+ALIGNMENT = 8
+
+
+def _alignedSize(size):
+    return size + (-size % ALIGNMENT)
+
+
+def _toLittleEndian(array):
+    array = np.ascontiguousarray(array)
+    if array.dtype.hasobject:
+        raise TypeError('cannot encode array with dtype %s' % array.dtype)
+    if array.dtype.byteorder == '>':
+        array = array.astype(array.dtype.newbyteorder('<'))
+    return array
+
+
+def splitArrays(obj, buffers):
+    '''
+    Returns a copy of obj where every numpy array is replaced by a placeholder.
+    The arrays are appended to the buffers list.
+    '''
+    if isinstance(obj, np.ndarray):
+        array = _toLittleEndian(obj)
+        buffers.append(array)
+        return {ARRAY_KEY: len(buffers) - 1, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+    elif isinstance(obj, dict):
+        return {key: splitArrays(value, buffers) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [splitArrays(value, buffers) for value in obj]
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def joinArrays(obj, arrays):
+    '''
+    Inverse of splitArrays.
+    '''
+    if isinstance(obj, dict):
+        if ARRAY_KEY in obj:
+            return arrays[obj[ARRAY_KEY]]
+        return {key: joinArrays(value, arrays) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [joinArrays(value, arrays) for value in obj]
+    return obj
+
+
+def encodePayload(data):
+    '''
+    Encodes a dict that may contain numpy arrays and returns bytes.
+    '''
+    buffers = []
+    header = splitArrays(data, buffers)
+
+    offsets = []
+    offset = 0
+    for array in buffers:
+        offsets.append([offset, array.nbytes])
+        offset += _alignedSize(array.nbytes)
+    header[BUFFERS_KEY] = offsets
+
+    headerBytes = json.dumps(header).encode('utf-8')
+    prefixSize = HEADER_SIZE.size + len(headerBytes)
+
+    chunks = [HEADER_SIZE.pack(len(headerBytes)), headerBytes, b'\0' * (_alignedSize(prefixSize) - prefixSize)]
+    for array in buffers:
+        chunks.append(array.tobytes())
+        chunks.append(b'\0' * (-array.nbytes % ALIGNMENT))
+
+    return b''.join(chunks)
+
+
+def decodePayload(payload):
+    '''
+    Decodes bytes produced by encodePayload.  Arrays are returned as read-only
+    views into the payload, no array data is copied.
+    '''
+    payload = memoryview(payload)
+    headerLength, = HEADER_SIZE.unpack_from(payload, 0)
+    headerEnd = HEADER_SIZE.size + headerLength
+    header = json.loads(bytes(payload[HEADER_SIZE.size:headerEnd]).decode('utf-8'))
+    bufferStart = _alignedSize(headerEnd)
+
+    arrays = []
+    for (offset, nbytes), placeholder in zip(header.pop(BUFFERS_KEY), _findPlaceholders(header)):
+        dtype = np.dtype(placeholder['dtype'])
+        array = np.frombuffer(payload, dtype=dtype, count=nbytes // dtype.itemsize, offset=bufferStart + offset)
+        arrays.append(array.reshape(placeholder['shape']))
+
+    return joinArrays(header, arrays)
+
+
+def _findPlaceholders(header):
+    '''
+    Returns the array placeholders in the header sorted by buffer index.
+    '''
+    placeholders = []
+
+    def visit(obj):
+        if isinstance(obj, dict):
+            if ARRAY_KEY in obj:
+                placeholders.append(obj)
+            else:
+                for value in obj.values():
+                    visit(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                visit(value)
+
+    visit(header)
+    return sorted(placeholders, key=lambda x: x[ARRAY_KEY])
+
+
+def computeContentHash(data):
+    '''
+    Returns a hex digest of data, a JSON-compatible object that may contain
+    numpy arrays.  Array buffers are hashed directly without being encoded.
+    '''
+    buffers = []
+    header = splitArrays(data, buffers)
+    h = hashlib.sha1(json.dumps(header, sort_keys=True).encode('utf-8'))
+    for array in buffers:
+        h.update(array.reshape(-1).view(np.uint8))
+    return h.hexdigest()
+
+
+def toJsonCompatible(obj):
+    '''
+    Default function for json.dumps that converts numpy types to lists and
+    scalars, for use with the JSON-only protocol version.
+    '''
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('%r is not JSON serializable' % obj)
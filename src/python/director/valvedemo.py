@@ -870,11 +870,13 @@ class ValvePlannerDemo(object):
         polyData = ioUtils.readPolyData(filename)
         vis.showPolyData(polyData, 'pointcloud snapshot')
 
-        segmentation.segmentValveWallAuto(.20, mode='valve', removeGroundMethod=segmentation.removeGround)
-        self.computeStanceFrame()
+        def onValveSegmented():
+            self.computeStanceFrame()
 
-        if (moveRobot):
-            self.moveRobotToGraspStanceFrame()
+            if (moveRobot):
+                self.moveRobotToGraspStanceFrame()
+
+        segmentation.segmentValveWallAutoAsync(.20, mode='valve', removeGroundMethod=segmentation.removeGround, callback=onValveSegmented)
 
 
 class ValveImageFitter(ImageBasedAffordanceFit):
@@ -5,11 +5,13 @@ import json
 import os
 import tempfile
 import threading
-from collections import defaultdict, Iterable
+from collections import defaultdict
+from collections.abc import Iterable
 import numpy as np
 from lcm import LCM
 from robotlocomotion import viewer2_comms_t
 from director.thirdparty import transformations
+from director import treeviewercodec
 
 
 class ClientIDFactory(object):
@@ -25,13 +27,23 @@ class ClientIDFactory(object):
 CLIENT_ID_FACTORY = ClientIDFactory()
 
 
-def to_lcm(data):
+def to_lcm(data, binary=False):
+    """
+    Encode data as a viewer2_comms_t message. If binary is True, numpy arrays
+    are sent as raw buffers (format version 2.0), otherwise the whole message
+    is JSON (format version 1.0).
+    """
     msg = viewer2_comms_t()
     msg.utime = data["utime"]
     msg.format = "treeviewer_json"
-    msg.format_version_major = 1
-    msg.format_version_minor = 0
-    msg.data = bytearray(json.dumps(data), encoding='utf-8')
+    if binary:
+        msg.format_version_major = 2
+        msg.format_version_minor = 0
+        msg.data = treeviewercodec.encodePayload(data)
+    else:
+        msg.format_version_major = 1
+        msg.format_version_minor = 0
+        msg.data = bytearray(json.dumps(data, default=treeviewercodec.toJsonCompatible), encoding='utf-8')
     msg.num_bytes = len(msg.data)
     return msg
 
@@ -134,8 +146,22 @@ class PointCloud(BaseGeometry):
     def serialize(self):
         return {
             "type": "pointcloud",
-            "points": [list(p) for p in self.points],
-            "channels": {name: [list(c) for c in values] for (name, values) in self.channels.items()}
+            "points": np.asarray(self.points),
+            "channels": {name: np.asarray(values) for (name, values) in self.channels.items()}
+        }
+
+
+class TriangularMesh(BaseGeometry):
+    __slots__ = ["vertices", "faces"]
+    def __init__(self, vertices, faces):
+        self.vertices = vertices
+        self.faces = faces
+
+    def serialize(self):
+        return {
+            "type": "mesh_data",
+            "vertices": np.asarray(self.vertices),
+            "faces": np.asarray(self.faces)
         }
 
 
@@ -220,9 +246,9 @@ class Visualizer(object):
     """
     __slots__ = ["core", "path"]
 
-    def __init__(self, path=None, lcm=None, core=None):
+    def __init__(self, path=None, lcm=None, core=None, binary=False):
         if core is None:
-            core = CoreVisualizer(lcm)
+            core = CoreVisualizer(lcm, binary=binary)
         if path is None:
             path = tuple()
         else:
@@ -279,13 +305,20 @@ class Visualizer(object):
 
 
 class CoreVisualizer(object):
-    def __init__(self, lcm=None):
+    def __init__(self, lcm=None, binary=False):
+        """
+        If binary is True, requests use the binary payload format, and
+        repeated setgeometry calls with unchanged geometry only send a
+        content hash. This requires a viewer that supports format 2.0.
+        """
         if lcm is None:
             lcm = LCM()
         self.lcm = lcm
+        self.binary = binary
         self.client_id = CLIENT_ID_FACTORY.new_client_id()
         self.tree = LazyTree()
         self.queue = CommandQueue()
+        self.sent_geometry_hashes = {}
         self.publish_immediately = True
         self.lcm.subscribe(self._response_channel(),
                            self._handle_response)
@@ -315,6 +348,7 @@ class CoreVisualizer(object):
         if data["status"] == 0:
             pass
         elif data["status"] == 1:
+            self.sent_geometry_hashes = {}
             for path in self.tree.descendants():
                 self.queue.setgeometry.add(path)
                 self.queue.settransform.add(path)
@@ -347,6 +381,9 @@ class CoreVisualizer(object):
         self._maybe_publish()
 
     def delete(self, path):
+        n = len(path)
+        for p in [p for p in self.sent_geometry_hashes if p[:n] == path]:
+            del self.sent_geometry_hashes[p]
         if not path:
             self.tree = LazyTree()
         else:
@@ -363,7 +400,7 @@ class CoreVisualizer(object):
     def publish(self):
         if not self.queue.isempty():
             data = self.serialize_queue()
-            msg = to_lcm(data)
+            msg = to_lcm(data, binary=self.binary)
             self.lcm.publish(self._request_channel(), msg.encode())
             self.queue.empty()
 
@@ -375,10 +412,17 @@ class CoreVisualizer(object):
             delete.append({"path": path})
         for path in self.queue.setgeometry:
             geoms = self.tree.getdescendant(path).geometries or []
-            setgeometry.append({
+            command = {
                 "path": path,
                 "geometries": [geom.serialize() for geom in geoms]
-            })
+            }
+            if self.binary:
+                content_hash = treeviewercodec.computeContentHash(command["geometries"])
+                if self.sent_geometry_hashes.get(path) == content_hash:
+                    del command["geometries"]
+                command["geometry_hash"] = content_hash
+                self.sent_geometry_hashes[path] = content_hash
+            setgeometry.append(command)
         for path in self.queue.settransform:
             settransform.append({
                 "path": path,
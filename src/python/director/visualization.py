@@ -3,6 +3,7 @@ import director.applogic as app
 from .shallowCopy import shallowCopy
 import director.vtkAll as vtk
 from director import filterUtils
+from director import vtkNumpy as vnp
 from director import transformUtils
 from director import callbacks
 from director import frameupdater
@@ -33,6 +34,7 @@ class PolyDataItem(om.ObjectModelItem):
 
         self.views = []
         self.polyData = polyData
+        self._ownsPointArrays = False
         self.mapper = vtk.vtkPolyDataMapper()
         self.mapper.SetInputData(self.polyData)
         self.actor = vtk.vtkActor()
@@ -59,6 +61,7 @@ class PolyDataItem(om.ObjectModelItem):
         self.addProperty('Color', [1.0, 1.0, 1.0])
         self.addProperty('Show Scalar Bar', False)
 
+        self._polyDataLayout = getPolyDataLayout(self.polyData)
         self._updateSurfaceProperty()
         self._updateColorByProperty()
 
@@ -76,16 +79,86 @@ class PolyDataItem(om.ObjectModelItem):
         return actor == self.actor
 
     def setPolyData(self, polyData):
-
+        '''
+        Replaces the polydata.  The surface, color by and scalar bar
+        properties are only recomputed when the point data arrays or cell
+        types differ from the previous polydata, so streaming sources that
+        publish clouds with the same layout only pay for the mapper update.
+        '''
         self.polyData = polyData
         self.mapper.SetInputData(polyData)
+        self._ownsPointArrays = False
+
+        layout = getPolyDataLayout(polyData)
+        if layout != self._polyDataLayout:
+            self._polyDataLayout = layout
+            self._updateSurfaceProperty()
+            self._updateColorByProperty()
+            self._updateColorBy(retainColorMap=True)
+        else:
+            self._updateActiveScalars()
 
-        self._updateSurfaceProperty()
-        self._updateColorByProperty()
-        self._updateColorBy(retainColorMap=True)
+        if self.getProperty('Visible'):
+            self._renderAllViews()
 
+    def updatePoints(self, points, pointData=None):
+        '''
+        Writes points, an Nx3 array, and the arrays of the pointData dict into
+        the existing vtk arrays of the polydata, so a source that publishes
+        clouds of a constant size does not allocate new vtk arrays for every
+        message.  Returns True if the arrays were updated in place.
+
+        Only a polydata created by updatePoints is written in place.  A
+        polydata passed to the constructor or to setPolyData may share its
+        arrays with shallow copies held elsewhere, so the first update after
+        it creates a new point cloud with vtkNumpy.numpyToPolyData and passes
+        it to setPolyData, as does an update whose point count, dtypes or
+        array names differ from the current polydata.  Deep copy the polydata
+        of an item that is updated this way to keep a snapshot of it.
+        '''
+        pointData = pointData or {}
+        if not self._ownsPointArrays or not self._canUpdatePointsInPlace(points, pointData):
+            self.setPolyData(vnp.numpyToPolyData(points, pointData, createVertexCells=True))
+            self._ownsPointArrays = True
+            return False
+
+        vnp.getNumpyFromVtk(self.polyData)[:] = points
+        self.polyData.GetPoints().GetData().Modified()
+        self.polyData.GetPoints().Modified()
+
+        for name, values in pointData.items():
+            vnp.getNumpyFromVtk(self.polyData, name)[:] = values
+            self.polyData.GetPointData().GetArray(name).Modified()
+
+        self.polyData.Modified()
         if self.getProperty('Visible'):
             self._renderAllViews()
+        return True
+
+    def _canUpdatePointsInPlace(self, points, pointData):
+        polyData = self.polyData
+        if not polyData.GetPoints() or polyData.GetNumberOfPoints() != len(points) or not len(points):
+            return False
+        if polyData.GetNumberOfCells() != polyData.GetNumberOfVerts():
+            return False
+        if vnp.getNumpyFromVtk(polyData).dtype != points.dtype:
+            return False
+
+        arrays = polyData.GetPointData()
+        if arrays.GetNumberOfArrays() != len(pointData):
+            return False
+        for name, values in pointData.items():
+            array = arrays.GetArray(name)
+            if array is None or vnp.getNumpyFromVtk(polyData, name).shape != np.shape(values):
+                return False
+            if vnp.getNumpyFromVtk(polyData, name).dtype != np.asarray(values).dtype:
+                return False
+        return True
+
+    def _updateActiveScalars(self):
+        arrayName = self.getPropertyEnumValue('Color By')
+        if arrayName != 'Solid Color':
+            self.polyData.GetPointData().SetActiveScalars(arrayName)
 
     def setRangeMap(self, key, value):
         self.rangeMap[key] = value
@@ -995,6 +1068,95 @@ def computeViewBoundsSoloGrid(view, gridObj):
         return computeViewBoundsNoGrid(view, gridObj)
 
 
+class InstancedMeshItem(PolyDataItem):
+    '''
+    Draws a copy of a source mesh at every point of its polydata with a
+    vtkGlyph3DMapper, so many copies of a mesh are drawn by one actor from
+    one shared mesh.  The polydata is created by getInstancesPolyData.  Its
+    point data holds the orientation of each instance as vtkProp3D
+    orientation angles in degrees, its rgb color and the index of its source
+    mesh.  Show it with colorByName='rgb_colors' to draw the per instance
+    colors.
+    '''
+
+    def __init__(self, name, polyData, view):
+        PolyDataItem.__init__(self, name, polyData, view)
+        self.mapper = vtk.vtkGlyph3DMapper()
+        self.mapper.SetInputData(self.polyData)
+        self.mapper.ScalingOff()
+        self.mapper.OrientOn()
+        self.mapper.SetOrientationModeToRotation()
+        self.mapper.SetOrientationArray('orientation')
+        self.mapper.SourceIndexingOn()
+        self.mapper.SetSourceIndexArray('source_id')
+        self.actor.SetMapper(self.mapper)
+
+    def setSourceMeshes(self, meshes):
+        '''
+        Sets the meshes drawn for source ids 0 to len(meshes)-1.
+        '''
+        for sourceId, mesh in enumerate(meshes):
+            self.mapper.SetSourceData(sourceId, mesh)
+        if self.getProperty('Visible'):
+            self._renderAllViews()
+
+    def getNumberOfInstances(self):
+        return self.polyData.GetNumberOfPoints()
+
+    def setInstances(self, positions, orientations, colors, sourceIds):
+        '''
+        Replaces all instances.  The arrays are written in place when the
+        number of instances is unchanged.
+        '''
+        if len(positions) != self.getNumberOfInstances():
+            self.setPolyData(getInstancesPolyData(positions, orientations, colors, sourceIds))
+        else:
+            self.updateInstances(np.arange(len(positions)), positions, orientations, colors, sourceIds)
+
+    def updateInstances(self, instanceIds, positions, orientations, colors, sourceIds):
+        '''
+        Writes the instances with the given ids in place.  The other
+        instances are unchanged.
+        '''
+        if not len(instanceIds):
+            return
+
+        vnp.getNumpyFromVtk(self.polyData)[instanceIds] = positions
+        vnp.getNumpyFromVtk(self.polyData, 'orientation')[instanceIds] = orientations
+        vnp.getNumpyFromVtk(self.polyData, 'rgb_colors')[instanceIds] = _toRgbColors(colors)
+        vnp.getNumpyFromVtk(self.polyData, 'source_id')[instanceIds] = sourceIds
+
+        self.polyData.GetPoints().GetData().Modified()
+        self.polyData.GetPoints().Modified()
+        pointData = self.polyData.GetPointData()
+        for name in ('orientation', 'rgb_colors', 'source_id'):
+            pointData.GetArray(name).Modified()
+        self.polyData.Modified()
+
+        if self.getProperty('Visible'):
+            self._renderAllViews()
+
+
+def _toRgbColors(colors):
+    colors = np.asarray(colors)
+    if colors.dtype == np.uint8:
+        return colors
+    return np.clip(np.round(colors*255), 0, 255).astype(np.uint8)
+
+
+def getInstancesPolyData(positions, orientations, colors, sourceIds):
+    '''
+    Returns a polydata for an InstancedMeshItem.  positions and orientations
+    are Nx3 arrays, colors is Nx3 with values in [0, 1] or uint8, and
+    sourceIds is N indices of source meshes.
+    '''
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    pointData = dict(orientation=np.asarray(orientations, dtype=float).reshape(-1, 3),
+                     rgb_colors=_toRgbColors(colors).reshape(-1, 3),
+                     source_id=np.asarray(sourceIds, dtype=np.int32).reshape(-1))
+    return vnp.numpyToPolyData(positions, pointData, createVertexCells=False)
+
+
 class GridItem(PolyDataItem):
 
     def __init__(self, name, view=None):
@@ -1193,6 +1355,27 @@ def getParentObj(parent):
         return parent
 
 
+def getPolyDataLayout(polyData):
+    '''
+    Returns a tuple that describes the point data arrays and cell types of
+    polyData, but not its sizes.  PolyDataItem uses it to detect when the
+    properties that depend on the arrays and cells must be recomputed.
+    '''
+    pointData = polyData.GetPointData()
+    arrays = []
+    for i in range(pointData.GetNumberOfArrays()):
+        array = pointData.GetAbstractArray(i)
+        arrays.append((array.GetName(), array.GetDataType(), array.GetNumberOfComponents()))
+
+    numberOfVerts = polyData.GetNumberOfVerts()
+    return (tuple(arrays),
+            bool(polyData.GetNumberOfPoints()),
+            bool(numberOfVerts),
+            bool(polyData.GetNumberOfLines()),
+            bool(polyData.GetNumberOfPolys() or polyData.GetNumberOfStrips()),
+            polyData.GetNumberOfCells() == numberOfVerts)
+
+
 def updatePolyData(polyData, name, **kwargs):
     obj = om.findObjectByName(name, parent=getParentObj(kwargs.get('parent')))
     if obj is None:
@@ -4,24 +4,92 @@ from vtk.util import numpy_support
 import numpy as np
 
 
-def numpyToPolyData(pts, pointData=None, createVertexCells=True):
+def numpyToPolyData(pts, pointData=None, createVertexCells=True, copy=True):
+    '''
+    Returns a vtkPolyData with the given (N,3) points and a dict of point
+    data arrays.  If copy is False, contiguous arrays are wrapped by vtk
+    without copying, so the caller must not modify them afterwards.  If
+    createVertexCells is True a vertex cell is added for every point.
+    '''
+    def prepare(array):
+        return array.copy() if copy else np.ascontiguousarray(array)
 
     pd = vtk.vtkPolyData()
-    pd.SetPoints(getVtkPointsFromNumpy(pts.copy()))
+    pd.SetPoints(getVtkPointsFromNumpy(prepare(pts)))
 
     if pointData is not None:
         for key, value in list(pointData.items()):
-            addNumpyToVtk(pd, value.copy(), key)
+            addNumpyToVtk(pd, prepare(value), key)
 
     if createVertexCells:
-        f = vtk.vtkVertexGlyphFilter()
-        f.SetInputData(pd)
-        f.Update()
-        pd = shallowCopy(f.GetOutput())
+        pd.SetVerts(getVertexCellArray(pd.GetNumberOfPoints()))
 
     return pd
 
 
+def getVtkIdTypeArrayFromNumpy(numpyArray):
+    '''
+    Returns a vtkIdTypeArray with a copy of the given integer array.
+    '''
+    idArray = np.ascontiguousarray(numpyArray, dtype=numpy_support.ID_TYPE_CODE)
+    return numpy_support.numpy_to_vtkIdTypeArray(idArray, deep=True)
+
+
+def getVertexCellArray(numPoints):
+    '''
+    Returns a vtkCellArray with one vertex cell per point.  The cell array is
+    constructed from numpy arrays instead of inserting one cell at a time.
+    '''
+    return getCellArrayFromNumpy(np.arange(numPoints + 1), np.arange(numPoints))
+
+
+def getCellArrayFromNumpy(offsets, connectivity):
+    '''
+    Returns a vtkCellArray for cells given as an offsets array of length
+    numberOfCells + 1 and a connectivity array of point ids.  Cell i uses
+    the point ids connectivity[offsets[i]:offsets[i+1]].
+    '''
+    cells = vtk.vtkCellArray()
+    numCells = len(offsets) - 1
+    if vtk.vtkVersion.GetVTKMajorVersion() >= 9:
+        cells.SetData(getVtkIdTypeArrayFromNumpy(offsets), getVtkIdTypeArrayFromNumpy(connectivity))
+    else:
+        sizes = np.diff(offsets)
+        legacyCells = np.empty(numCells + len(connectivity), dtype=numpy_support.ID_TYPE_CODE)
+        sizePositions = offsets[:-1] + np.arange(numCells)
+        isSize = np.zeros(len(legacyCells), dtype=bool)
+        isSize[sizePositions] = True
+        legacyCells[isSize] = sizes
+        legacyCells[~isSize] = connectivity
+        cells.SetCells(numCells, getVtkIdTypeArrayFromNumpy(legacyCells))
+    return cells
+
+
+def getNumpyFromCellArray(cells):
+    '''
+    Returns (offsets, connectivity) numpy arrays for a vtkCellArray, in the
+    layout accepted by getCellArrayFromNumpy.
+    '''
+    if vtk.vtkVersion.GetVTKMajorVersion() >= 9:
+        offsets = numpy_support.vtk_to_numpy(cells.GetOffsetsArray()).astype(np.int64)
+        connectivity = numpy_support.vtk_to_numpy(cells.GetConnectivityArray()).astype(np.int64)
+        if not len(offsets):
+            offsets = np.zeros(1, dtype=np.int64)
+        return offsets, connectivity
+
+    legacyCells = numpy_support.vtk_to_numpy(cells.GetData()).astype(np.int64)
+    sizes = []
+    position = 0
+    while position < len(legacyCells):
+        sizes.append(legacyCells[position])
+        position += legacyCells[position] + 1
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    isSize = np.zeros(len(legacyCells), dtype=bool)
+    isSize[offsets[:-1] + np.arange(len(sizes))] = True
+    return offsets, legacyCells[~isSize]
+
+
 def numpyToImageData(img, flip=True, vtktype=None):
     if flip:
         img = np.flipud(img)
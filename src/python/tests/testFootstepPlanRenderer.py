@@ -0,0 +1,149 @@
+from director.consoleapp import ConsoleApp
+from director import footstepsdriver
+from director import objectmodel as om
+from director import transformUtils
+from director import vtkNumpy as vnp
+from director.lcmframe import positionMessageFromFrame
+
+import drc as lcmdrc
+import numpy as np
+
+
+def makeStep(i, x):
+    isRightFoot = i % 2 == 1
+    step = lcmdrc.footstep_t()
+    step.pos = positionMessageFromFrame(transformUtils.frameFromPositionAndRPY([x, -0.13 if isRightFoot else 0.13, 0.0], [0, 0, 0]))
+    step.is_right_foot = isRightFoot
+    step.params = lcmdrc.footstep_params_t()
+    step.num_terrain_pts = 2
+    step.terrain_path_dist = [0.0, 0.3]
+    step.terrain_height = [0.0, 0.0]
+    return step
+
+
+def makePlan(numSteps):
+    msg = lcmdrc.footstep_plan_t()
+    msg.footsteps = [makeStep(i, 0.15*i) for i in range(numSteps)]
+    msg.num_steps = numSteps
+    return msg
+
+
+def getInstanceArrays(item):
+    return (vnp.getNumpyFromVtk(item.polyData).copy(),
+            vnp.getNumpyFromVtk(item.polyData, 'rgb_colors').copy())
+
+
+def getStepObjects(stepObjects):
+    return [list(objects) for _, objects in stepObjects]
+
+
+def isRemoved(obj):
+    return obj.getObjectTree() is None
+
+
+def getChanged(before, after):
+    '''
+    Returns the indices of the steps whose objects were replaced, and checks
+    that the objects that were replaced were removed.
+    '''
+    changed = []
+    for k, (old, new) in enumerate(zip(before, after)):
+        if any(a is not b for a, b in zip(old, new)) or len(old) != len(new):
+            changed.append(k)
+            assert all(isRemoved(obj) for obj in old)
+        assert not any(isRemoved(obj) for obj in new)
+    return changed
+
+
+def getExpectedColors(msg, left_color=None, right_color=None):
+    colors = []
+    for i, footstep in list(enumerate(msg.footsteps))[2:]:
+        if footstep.is_right_foot:
+            color = footstepsdriver.getRightFootColor() if right_color is None else right_color
+        else:
+            color = footstepsdriver.getLeftFootColor() if left_color is None else left_color
+        colors.append(footstepsdriver.getShadedStepColor(color, i, msg.num_steps))
+    return np.round(np.array(colors)*255)
+
+
+def testRenderer():
+    folder = om.getOrCreateContainer('test footstep plan')
+    renderer = footstepsdriver.FootstepPlanRenderer(folder)
+    contactSlices = footstepsdriver.DEFAULT_CONTACT_SLICES
+
+    msg = makePlan(12)
+    renderer.draw(msg, contactSlices=contactSlices)
+    feetItem = renderer.feetItem
+    polyData = feetItem.polyData
+    assert feetItem.getNumberOfInstances() == 10
+    assert renderer.contactPointsItem.getNumberOfInstances() == 10
+    positions, colors = getInstanceArrays(feetItem)
+    assert np.array_equal(colors, getExpectedColors(msg))
+    slices = getStepObjects(renderer.terrainSlices)
+    volumes = getStepObjects(renderer.walkingVolumes)
+    assert len(slices) == len(volumes) == 10
+    assert all(volumes)
+
+    # the same plan changes nothing
+    renderer.draw(msg, contactSlices=contactSlices)
+    assert feetItem.polyData is polyData
+    assert np.array_equal(getInstanceArrays(feetItem)[0], positions)
+    assert not getChanged(slices, getStepObjects(renderer.terrainSlices))
+    assert not getChanged(volumes, getStepObjects(renderer.walkingVolumes))
+
+    # moving step 5 updates its instance and volumes in place, and the
+    # terrain slices of steps 5 and 7, which start at step 3 and 5
+    msg.footsteps[5] = makeStep(5, 0.9)
+    renderer.draw(msg, contactSlices=contactSlices)
+    assert renderer.feetItem is feetItem and feetItem.polyData is polyData
+    newPositions, newColors = getInstanceArrays(feetItem)
+    assert np.flatnonzero(np.any(newPositions != positions, axis=1)).tolist() == [3]
+    assert np.allclose(newPositions[3], [0.9, -0.13, 0.0])
+    assert np.array_equal(newColors, colors)
+
+    newSlices = getStepObjects(renderer.terrainSlices)
+    newVolumes = getStepObjects(renderer.walkingVolumes)
+    assert getChanged(slices, newSlices) == [3, 5]
+    assert getChanged(volumes, newVolumes) == [3]
+    positions, slices, volumes = newPositions, newSlices, newVolumes
+
+    # a new left foot color changes the color key of the left steps only,
+    # which are the even steps
+    leftColor = [1.0, 0.0, 0.0]
+    renderer.draw(msg, left_color=leftColor, contactSlices=contactSlices)
+    newPositions, newColors = getInstanceArrays(feetItem)
+    assert np.array_equal(newPositions, positions)
+    assert np.array_equal(newColors, getExpectedColors(msg, left_color=leftColor))
+    assert np.flatnonzero(np.any(newColors != colors, axis=1)).tolist() == list(range(0, 10, 2))
+    newVolumes = getStepObjects(renderer.walkingVolumes)
+    assert not getChanged(slices, getStepObjects(renderer.terrainSlices))
+    assert getChanged(volumes, newVolumes) == list(range(0, 10, 2))
+    volumes = newVolumes
+
+    # a shorter plan drops the objects of the last steps and keeps the
+    # others, while the step shading follows the new number of steps
+    shorter = makePlan(8)
+    shorter.footsteps[5] = msg.footsteps[5]
+    renderer.draw(shorter, left_color=leftColor, contactSlices=contactSlices)
+    assert feetItem.getNumberOfInstances() == renderer.contactPointsItem.getNumberOfInstances() == 6
+    newPositions, newColors = getInstanceArrays(feetItem)
+    assert np.array_equal(newPositions, positions[:6])
+    assert np.array_equal(newColors, getExpectedColors(shorter, left_color=leftColor))
+
+    newSlices = getStepObjects(renderer.terrainSlices)
+    newVolumes = getStepObjects(renderer.walkingVolumes)
+    assert len(newSlices) == len(newVolumes) == 6
+    assert not getChanged(slices[:6], newSlices)
+    assert not getChanged(volumes[:6], newVolumes)
+    assert all(isRemoved(obj) for objects in slices[6:] + volumes[6:] for obj in objects)
+
+    # without contact slices there are no walking volumes
+    renderer.draw(shorter, left_color=leftColor)
+    assert not any(getStepObjects(renderer.walkingVolumes))
+    assert all(isRemoved(obj) for objects in newVolumes for obj in objects)
+
+
+app = ConsoleApp()
+view = app.createView()
+
+testRenderer()
@@ -0,0 +1,114 @@
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+
+from director import framerecorder
+
+
+def decodePng(data):
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    pos = 8
+    chunks = {}
+    while pos < len(data):
+        length, tag = struct.unpack('>I4s', data[pos:pos+8])
+        chunks[tag] = data[pos+8:pos+8+length]
+        pos += 12 + length
+    width, height = struct.unpack('>II', chunks[b'IHDR'][:8])
+    rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, -1)
+    assert np.all(rows[:, 0] == 0)
+    return rows[:, 1:].reshape(height, width, -1)
+
+
+def makeFrames(n, width, height):
+    return [np.random.randint(0, 255, size=(height, width, 3)).astype(np.uint8) for _ in range(n)]
+
+
+def testImageFileSink():
+    outputDir = tempfile.mkdtemp()
+    frames = makeFrames(5, 32, 20)
+    recorder = framerecorder.FrameRecorder(framerecorder.ImageFileSink(outputDir), 32, 20, poolSize=len(frames))
+    for frame in frames:
+        assert recorder.addFrame(frame)
+    recorder.stop()
+
+    assert recorder.writtenFrames == 5
+    assert recorder.droppedFrames == 0
+    for i, frame in enumerate(frames):
+        with open(os.path.join(outputDir, 'frame_%07d.png' % i), 'rb') as f:
+            image = decodePng(f.read())
+        # png files are written top row first
+        assert np.array_equal(image, frame[::-1])
+
+    # a new sink for the same directory continues after the existing frames
+    sink = framerecorder.ImageFileSink(outputDir)
+    assert sink.frameCount == 5
+    sink.write(frames[0])
+    assert os.path.isfile(os.path.join(outputDir, 'frame_%07d.png' % 5))
+    assert framerecorder.getNextFrameIndex(outputDir, 'frame_%07d.png') == 6
+    assert framerecorder.getNextFrameIndex(outputDir, 'image_%d.png') == 0
+
+
+class SlowSink(object):
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        import time
+        time.sleep(0.05)
+        self.frames.append(frame.copy())
+
+    def close(self):
+        pass
+
+
+def testDroppedFrames():
+    sink = SlowSink()
+    recorder = framerecorder.FrameRecorder(sink, 8, 4, poolSize=2)
+    frames = makeFrames(6, 8, 4)
+    results = [recorder.addFrame(frame) for frame in frames]
+    assert recorder.getQueueDepth() <= 2
+    recorder.stop()
+
+    assert recorder.droppedFrames == results.count(False) > 0
+    assert recorder.writtenFrames == results.count(True) == len(sink.frames)
+    written = [frame for frame, ok in zip(frames, results) if ok]
+    assert all(np.array_equal(a, b) for a, b in zip(written, sink.frames))
+
+
+def testEncoderPipe():
+    outputFile = os.path.join(tempfile.mkdtemp(), 'frames.raw')
+    command = [sys.executable, '-c', 'import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))', outputFile]
+    frames = makeFrames(4, 16, 10)
+    sink = framerecorder.VideoEncoderSink(outputFile, 16, 10, 30, command=command)
+    recorder = framerecorder.FrameRecorder(sink, 16, 10, poolSize=4)
+    for frame in frames:
+        recorder.addFrame(frame)
+    recorder.stop()
+
+    data = np.fromfile(outputFile, dtype=np.uint8).reshape(-1, 10, 16, 3)
+    assert np.array_equal(data, np.array(frames))
+
+
+def testEncoderError():
+    sink = framerecorder.VideoEncoderSink('', 16, 10, 30, command=[sys.executable, '-c', 'import sys; sys.exit(3)'])
+    recorder = framerecorder.FrameRecorder(sink, 16, 10)
+    for frame in makeFrames(100, 16, 10):
+        recorder.addFrame(frame)
+    try:
+        recorder.stop()
+    except Exception:
+        pass
+    else:
+        assert False, 'expected an error'
+
+
+if __name__ == '__main__':
+    testImageFileSink()
+    testDroppedFrames()
+    testEncoderPipe()
+    testEncoderError()
@@ -0,0 +1,91 @@
+from director import segmentation
+from director import segmentationroutines
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def loopEdge(points, binLabels, distToEdge, numberOfBins):
+    edgePoints = []
+    for i in range(numberOfBins):
+        binPoints = points[binLabels == i]
+        binDists = distToEdge[binLabels == i]
+        if len(binDists):
+            edgePoints.append(binPoints[binDists.argmax()])
+    return np.array(edgePoints)
+
+
+def loopCentroids(points, binLabels, numberOfBins):
+    centroids = []
+    for i in range(numberOfBins):
+        binPoints = points[binLabels == i]
+        if len(binPoints):
+            centroids.append(np.average(binPoints, axis=0))
+    return np.array(centroids)
+
+
+def testReductions():
+    numberOfBins = 40
+    points = np.random.rand(10000, 3)
+    values = np.round(np.random.rand(10000), 2)
+    labels = np.random.randint(0, numberOfBins + 5, 10000)
+
+    counts = segmentationroutines.groupCounts(labels, numberOfBins)
+    assert np.array_equal(counts, [np.sum(labels == i) for i in range(numberOfBins)])
+
+    ids = segmentationroutines.groupArgmax(labels, values, numberOfBins)
+    assert np.allclose(points[ids[ids >= 0]], loopEdge(points, labels, values, numberOfBins))
+
+    means = segmentationroutines.groupMeans(labels, points, numberOfBins)
+    assert np.allclose(means[counts > 0], loopCentroids(points, labels, numberOfBins))
+
+    labels[labels == 3] = numberOfBins
+    assert segmentationroutines.groupArgmax(labels, values, numberOfBins)[3] == -1
+    assert np.isnan(segmentationroutines.groupMeans(labels, values, numberOfBins)[3])
+
+
+def testBinnedFunctions():
+    points = np.random.rand(20000, 3) * [2.0, 0.5, 0.1]
+    polyData = vnp.numpyToPolyData(points)
+    axis = np.array([1.0, 0.0, 0.0])
+
+    counts = segmentation.computePointCountsAlongAxis(polyData, axis, binWidth=0.05)
+    assert counts.sum() <= len(points)
+
+    centroids = segmentation.computeCentroids(polyData, axis, binWidth=0.05)
+    assert len(centroids) == np.count_nonzero(counts)
+    assert np.all(np.diff(centroids[:,0]) > 0)
+
+    edge = segmentation.computeEdge(polyData, axis, np.array([0.0, 1.0, 0.0]), binWidth=0.05)
+    assert len(edge) == len(centroids)
+
+
+def benchmark(numPoints=500000, numberOfBins=2000):
+    points = np.random.rand(numPoints, 3)
+    values = np.random.rand(numPoints)
+    labels = np.random.randint(0, numberOfBins, numPoints)
+
+    timer = SimpleTimer()
+    loopEdge(points, labels, values, numberOfBins)
+    loopCentroids(points, labels, numberOfBins)
+    loopTime = timer.elapsed()
+
+    timer.reset()
+    ids = segmentationroutines.groupArgmax(labels, values, numberOfBins)
+    points[ids[ids >= 0]]
+    segmentationroutines.groupMeans(labels, points, numberOfBins)
+    groupTime = timer.elapsed()
+
+    print('%d points, %d bins: per-bin loops %.3f s, grouped reductions %.3f s' % (
+          numPoints, numberOfBins, loopTime, groupTime))
+
+
+def main():
+    testReductions()
+    testBinnedFunctions()
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+from director import consoleapp
+from director import objectmodel as om
+from director import visualization as vis
+from director import vtkNumpy as vnp
+from director.debugVis import DebugData
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def makeMeshes():
+    d = DebugData()
+    d.addCube([0.2, 0.1, 0.05], [0, 0, 0])
+    cube = d.getPolyData()
+    d = DebugData()
+    d.addSphere([0, 0, 0], radius=0.05)
+    return [cube, d.getPolyData()]
+
+
+def makeInstances(numInstances):
+    positions = np.random.rand(numInstances, 3)
+    orientations = np.random.rand(numInstances, 3) * 360
+    colors = np.random.rand(numInstances, 3)
+    sourceIds = np.random.randint(0, 2, size=numInstances)
+    return positions, orientations, colors, sourceIds
+
+
+def showInstances(view, name, instances):
+    obj = vis.showPolyData(vis.getInstancesPolyData(*instances), name, view=view,
+                           colorByName='rgb_colors', cls=vis.InstancedMeshItem)
+    obj.setSourceMeshes(makeMeshes())
+    return obj
+
+
+def testInstances(view):
+    obj = showInstances(view, 'instances', makeInstances(10))
+    assert obj.getNumberOfInstances() == 10
+    assert obj.getPropertyEnumValue('Color By') == 'rgb_colors'
+    polyData = obj.polyData
+
+    positions, orientations, colors, sourceIds = makeInstances(3)
+    instanceIds = np.array([0, 4, 9])
+    obj.updateInstances(instanceIds, positions, orientations, colors, sourceIds)
+    assert obj.polyData is polyData
+    assert np.allclose(vnp.getNumpyFromVtk(obj.polyData)[instanceIds], positions)
+    assert np.allclose(vnp.getNumpyFromVtk(obj.polyData, 'orientation')[instanceIds], orientations)
+    assert np.array_equal(vnp.getNumpyFromVtk(obj.polyData, 'source_id')[instanceIds], sourceIds)
+    assert np.array_equal(vnp.getNumpyFromVtk(obj.polyData, 'rgb_colors')[instanceIds], np.round(colors*255))
+
+    # same number of instances: the arrays are written in place
+    obj.setInstances(*makeInstances(10))
+    assert obj.polyData is polyData
+
+    obj.setInstances(*makeInstances(20))
+    assert obj.getNumberOfInstances() == 20
+    assert obj.getPropertyEnumValue('Color By') == 'rgb_colors'
+    view.forceRender()
+
+
+def benchmark(view, numSteps=40, numUpdates=20):
+    meshes = makeMeshes()
+    positions, orientations, colors, sourceIds = makeInstances(numSteps)
+
+    timer = SimpleTimer()
+    for i in range(numUpdates):
+        objs = []
+        for j in range(numSteps):
+            obj = vis.showPolyData(meshes[sourceIds[j]], 'step %d' % j, view=view, color=colors[j], parent='steps')
+            obj.actor.SetOrientation(orientations[j])
+            obj.actor.SetPosition(positions[j])
+            objs.append(obj)
+        view.forceRender()
+        for obj in objs:
+            om.removeFromObjectModel(obj)
+    itemsTime = timer.elapsed()
+
+    obj = showInstances(view, 'steps instanced', (positions, orientations, colors, sourceIds))
+    timer.reset()
+    for i in range(numUpdates):
+        changed = np.arange(numSteps - 5, numSteps)
+        obj.updateInstances(changed, positions[changed], orientations[changed], colors[changed], sourceIds[changed])
+        view.forceRender()
+    instancedTime = timer.elapsed()
+
+    print('%d steps, %d updates: per step items %.3f s, instanced %.3f s' % (
+          numSteps, numUpdates, itemsTime, instancedTime))
+
+
+app = consoleapp.ConsoleApp()
+view = app.createView()
+
+testInstances(view)
+benchmark(view)
@@ -0,0 +1,56 @@
+from director import segmentationroutines
+from director import filterUtils
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def makeLabeledCloud(numPoints, numLabels):
+    points = np.random.rand(numPoints, 3)
+    labels = np.random.randint(0, numLabels + 1, numPoints).astype(np.int32)
+    intensity = np.random.rand(numPoints)
+    polyData = vnp.numpyToPolyData(points, {'cluster_labels': labels, 'intensity': intensity})
+    return polyData, labels
+
+
+def testGroups():
+    polyData, labels = makeLabeledCloud(5000, 50)
+
+    groups = segmentationroutines.LabeledPointGroups(polyData, 'cluster_labels')
+    assert len(groups) == labels.max()
+    assert all(group is None for group in groups.groups)
+
+    for i, group in enumerate(groups):
+        expected = filterUtils.thresholdPoints(polyData, 'cluster_labels', [i + 1, i + 1])
+        assert group.GetNumberOfPoints() == expected.GetNumberOfPoints()
+        assert group.GetNumberOfVerts() == group.GetNumberOfPoints()
+        assert np.array_equal(np.sort(vnp.getNumpyFromVtk(group, 'intensity')),
+                              np.sort(vnp.getNumpyFromVtk(expected, 'intensity')))
+        assert np.all(vnp.getNumpyFromVtk(group, 'cluster_labels') == i + 1)
+        assert np.array_equal(groups.getPointIds(i), np.flatnonzero(labels == i + 1))
+
+
+def benchmark(numPoints=200000, numLabels=300):
+    polyData, labels = makeLabeledCloud(numPoints, numLabels)
+
+    timer = SimpleTimer()
+    for i in range(1, numLabels + 1):
+        filterUtils.thresholdPoints(polyData, 'cluster_labels', [i, i])
+    thresholdTime = timer.elapsed()
+
+    timer.reset()
+    list(segmentationroutines.LabeledPointGroups(polyData, 'cluster_labels'))
+    groupTime = timer.elapsed()
+
+    print('%d points, %d clusters: thresholdPoints %.3f s, LabeledPointGroups %.3f s' % (
+          numPoints, numLabels, thresholdTime, groupTime))
+
+
+def main():
+    testGroups()
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
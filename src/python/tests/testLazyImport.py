@@ -0,0 +1,131 @@
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from director import importbenchmark
+from director import lazyimport
+
+
+@contextlib.contextmanager
+def moduleDirectory(modules):
+    '''
+    Writes the given dict of module name to source into a temporary
+    directory on sys.path, and removes the directory and the imported
+    modules again on exit.
+    '''
+    directory = tempfile.mkdtemp()
+    for name, source in modules.items():
+        with open(os.path.join(directory, name + '.py'), 'w') as f:
+            f.write(source)
+    sys.path.insert(0, directory)
+    try:
+        yield directory
+    finally:
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
+        for name in modules:
+            sys.modules.pop(name, None)
+
+
+def testLazyModule():
+    with moduleDirectory({'lazyimport_demo': 'value = 42\n'}):
+        module = lazyimport.lazyImport('lazyimport_demo')
+        assert isinstance(module, lazyimport.LazyModule)
+        assert not lazyimport.isLoaded(module)
+        assert 'lazyimport_demo' not in sys.modules
+
+        assert module.value == 42
+        assert lazyimport.isLoaded(module)
+        assert 'lazyimport_demo' in sys.modules
+        assert 'lazyimport_demo' in lazyimport.getLoadTimes()
+
+        module.value = 7
+        assert sys.modules['lazyimport_demo'].value == 7
+
+        # an imported module is returned as is
+        assert lazyimport.lazyImport('lazyimport_demo') is sys.modules['lazyimport_demo']
+
+
+def testLazyComponents():
+    components = lazyimport.LazyComponents()
+    calls = []
+    created = []
+
+    def onComponentCreated(name, component):
+        created.append(name)
+
+    components.register('planner', lambda: calls.append('planner') or dict(name='planner'))
+    components.register('panel', lambda: calls.append('panel') or dict(planner=components.planner))
+    components.connectComponentCreated(onComponentCreated)
+
+    assert calls == []
+    assert components.getComponentNames() == ['planner', 'panel']
+    assert not components.isCreated('panel')
+
+    panel = components.panel
+    assert calls == ['panel', 'planner']
+    assert created == ['planner', 'panel']
+    assert panel['planner'] is components.get('planner')
+    assert components.panel is panel
+    assert calls == ['panel', 'planner']
+
+    try:
+        components.register('panel', dict)
+    except Exception:
+        pass
+    else:
+        assert False, 'expected an exception for a duplicate component'
+
+    try:
+        components.missing
+    except AttributeError:
+        pass
+    else:
+        assert False, 'expected an AttributeError'
+
+
+def testImportTimer():
+    modules = {'importtimer_child': 'import time\ntime.sleep(0.02)\n',
+               'importtimer_parent': 'import time\nimport importtimer_child\ntime.sleep(0.01)\n'}
+    with moduleDirectory(modules):
+        results = importbenchmark.measureImportTimes(['importtimer_parent', 'importtimer_child', 'os'])
+        parent = results['requested']['importtimer_parent']
+        child = results['modules']['importtimer_child']
+
+        assert child['self_ms'] >= 20
+        assert parent['cumulative_ms'] >= 30
+        assert 10 <= parent['self_ms'] < parent['cumulative_ms'] - 15
+        # imported before, by importtimer_parent or by the caller
+        assert results['requested']['importtimer_child']['cumulative_ms'] == 0
+        assert results['requested']['os']['cumulative_ms'] == 0
+        assert importbenchmark.formatReport(results)
+
+        baseline = json.loads(json.dumps(results))
+        assert importbenchmark.findRegressions(results, baseline) == []
+
+        baseline['requested']['importtimer_parent']['cumulative_ms'] = 1.0
+        regressions = importbenchmark.findRegressions(results, baseline)
+        assert [name for name, _, _ in regressions] == ['importtimer_parent']
+
+
+def testStartupModules():
+    modules = importbenchmark.getStartupModules()
+    assert 'director.applogic' in modules
+    assert 'director.fieldcontainer' in modules
+    assert 'director.tasks.robottasks' in modules
+    # imported lazily by startup
+    assert 'director.drilldemo' not in modules
+
+
+def main():
+    testLazyModule()
+    testLazyComponents()
+    testImportTimer()
+    testStartupModules()
+
+
+if __name__ == '__main__':
+    main()
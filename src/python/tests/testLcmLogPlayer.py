@@ -0,0 +1,211 @@
+from director.lcmlogplayer import LcmLogPlayer, LcmLogIndex, LcmLogReaderThread, PublishJitterStats
+
+import lcm
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+def writeTestLog(filename, numEvents, startUtime=1000000):
+    log = lcm.EventLog(filename, 'w', overwrite=True)
+    channels = ['POSE', 'CAMERA', 'SCAN']
+    for i in range(numEvents):
+        log.write_event(startUtime + i*10000, channels[i % len(channels)], b'x' * (i % 7 + 1))
+    log.close()
+
+
+def readLogNoIndex(filename):
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename, useIndex=False)
+    return logPlayer
+
+
+def checkPlayersEqual(a, b):
+    assert np.array_equal(a.timestamps, b.timestamps)
+    assert np.array_equal(a.filePositions, b.filePositions)
+    assert np.array_equal(a.channelIds, b.channelIds)
+    assert a.channelNames == b.channelNames
+    assert a.timestampOffset == b.timestampOffset
+
+
+def testIndex(tempDir):
+
+    filename = os.path.join(tempDir, 'test.lcmlog')
+    indexFilename = LcmLogIndex.getIndexFilename(filename)
+    writeTestLog(filename, 100)
+
+    reference = readLogNoIndex(filename)
+    assert not os.path.exists(indexFilename)
+    assert reference.channelNames == ['POSE', 'CAMERA', 'SCAN']
+
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename)
+    assert os.path.isfile(indexFilename)
+    checkPlayersEqual(logPlayer, reference)
+
+    index = LcmLogIndex.load(filename)
+    assert isinstance(index.timestamps, np.memmap)
+
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename)
+    checkPlayersEqual(logPlayer, reference)
+
+    logPlayer.resetPlayPosition(0.5)
+    event = logPlayer.log.read_next_event()
+    assert event.timestamp - logPlayer.timestampOffset == logPlayer.timestamps[logPlayer.nextEventIndex]
+
+    # rewriting the log invalidates the index
+    writeTestLog(filename, 50)
+    os.utime(filename, (0, 0))
+    assert LcmLogIndex.load(filename) is None
+
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename)
+    assert len(logPlayer.timestamps) == 50
+    checkPlayersEqual(logPlayer, readLogNoIndex(filename))
+
+
+def testChannelFilter(tempDir):
+
+    filename = os.path.join(tempDir, 'filter.lcmlog')
+    writeTestLog(filename, 100)
+
+    lc = lcm.LCM('memq://')
+    received = []
+
+    def onMessage(channel, data):
+        received.append(channel)
+
+    lc.subscribe('.*', onMessage)
+
+    logPlayer = LcmLogPlayer(lcmHandle=lc)
+    logPlayer.readLog(filename)
+    logPlayer.setChannelFilter(denyChannels=['CAMERA'], maxRates={'SCAN': 10.0})
+
+    logPlayer.resetPlayPosition(0.0)
+    while logPlayer.nextEventIndex < len(logPlayer.timestamps):
+        logPlayer.advanceTime(0.1)
+        while lc.handle_timeout(0):
+            pass
+
+    scanTimes = logPlayer.timestamps[logPlayer.channelIds == logPlayer.channelNames.index('SCAN')]
+    expectedScans = 0
+    lastScan = -np.inf
+    for t in scanTimes:
+        if t - lastScan >= 1e5:
+            expectedScans += 1
+            lastScan = t
+
+    assert 'CAMERA' not in received
+    assert received.count('POSE') == np.count_nonzero(logPlayer.channelIds == logPlayer.channelNames.index('POSE'))
+    assert received.count('SCAN') == expectedScans
+
+    # the log position is still consistent after filtered playback
+    logPlayer.clearChannelFilter()
+    logPlayer.resetPlayPosition(0.5)
+    index = logPlayer.nextEventIndex
+    logPlayer.advanceTime(0.0)
+    while lc.handle_timeout(0):
+        pass
+    assert received[-1] == logPlayer.channelNames[logPlayer.channelIds[index]]
+
+
+def testReaderThread(tempDir):
+
+    filename = os.path.join(tempDir, 'reader.lcmlog')
+    writeTestLog(filename, 500)
+
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename)
+    logPlayer.setChannelFilter(allowChannels=['POSE', 'SCAN'])
+
+    reader = LcmLogReaderThread(logPlayer, 10, logPlayer.timestamps[-1], maxQueueSize=16)
+    reader.start()
+
+    items = []
+    while True:
+        item = reader.queue.get(timeout=5.0)
+        if item is None:
+            break
+        items.append(item)
+    reader.stop()
+
+    expected = [i for i in range(10, 500) if logPlayer.channelNames[logPlayer.channelIds[i]] != 'CAMERA']
+    assert [item[0] for item in items] == expected
+    for eventIndex, timestamp, channel, data in items:
+        assert timestamp == logPlayer.timestamps[eventIndex]
+        assert channel == logPlayer.channelNames[logPlayer.channelIds[eventIndex]]
+        assert len(data) == eventIndex % 7 + 1
+
+
+class ManualTimer(object):
+    '''
+    Replaces the playback TimerCallback so that the test calls the ticks.
+    '''
+    targetFps = 30.0
+
+    def __init__(self):
+        self.callback = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def testSkipDuringReaderThreadPlayback(tempDir):
+
+    filename = os.path.join(tempDir, 'skip.lcmlog')
+    writeTestLog(filename, 500)
+
+    logPlayer = LcmLogPlayer(lcmHandle=lcm.LCM('memq://'))
+    logPlayer.readLog(filename)
+    logPlayer.timer = ManualTimer()
+    logPlayer.useReaderThread = True
+
+    stopped = []
+    logPlayer.playback(1.0, 10.0, onStop=lambda: stopped.append(True))
+    firstReader = logPlayer.readerThread
+
+    # seeking restarts the reader thread at the new position
+    logPlayer.skipToTime(5.0)
+    assert logPlayer.readerThread is not firstReader
+    assert logPlayer.readerThread.startIndex == logPlayer.findEventIndex(5.0*1e6)
+    assert logPlayer.nextEventIndex == logPlayer.findEventIndex(5.0*1e6)
+
+    # the playback continues from the new position to the end of the log
+    logPlayer.playbackFactor = 1e6
+    while logPlayer.timer.callback():
+        pass
+    assert stopped
+    assert logPlayer.nextEventIndex == len(logPlayer.timestamps)
+    assert logPlayer.readerThread is None
+
+
+def testJitterStats():
+    stats = PublishJitterStats(binEdges=[0, 1, 10])
+    stats.addOffsets([0.5, 2.0, 50.0, -0.2, -3.0])
+    assert stats.numEvents == 5
+    assert stats.lateCounts.tolist() == [1, 1, 1]
+    assert stats.earlyCounts.tolist() == [1, 1, 0]
+    assert stats.maxLate == 50.0
+    assert stats.maxEarly == 3.0
+    print(stats)
+
+
+def main():
+    tempDir = tempfile.mkdtemp()
+    try:
+        testIndex(tempDir)
+        testChannelFilter(tempDir)
+        testReaderThread(tempDir)
+        testSkipDuringReaderThreadPlayback(tempDir)
+        testJitterStats()
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
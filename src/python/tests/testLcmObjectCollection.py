@@ -0,0 +1,165 @@
+from director import lcmobjectcollection
+from director.thirdparty import numpyjsoncoder
+from director.uuidutil import newUUID
+
+
+def newDescription(name, **kwargs):
+    desc = dict(uuid=newUUID(), Name=name, pose=((0.5, 0.0, 1.0), (1, 0, 0, 0)))
+    desc.update(kwargs)
+    return desc
+
+
+def transmit(data):
+    # round trip through the message encoding
+    return numpyjsoncoder.decode(numpyjsoncoder.encode(data))
+
+
+def sync(source, destination):
+    '''
+    Sends the descriptions destination needs from source, as in an echo
+    request and response, and returns the number of descriptions sent.
+    '''
+    summary = transmit(destination.getSummary())
+    descIds = source.getDescriptionsToSend(summary)
+    data = transmit(dict(descriptions={descId: source.getDescription(descId) for descId in descIds},
+                         versions={descId: source.getVersion(descId) for descId in descIds}))
+    destination.handleEchoResponse(data)
+    return len(descIds)
+
+
+def testSync():
+    a = lcmobjectcollection.LCMObjectCollection('TEST_COLLECTION_A')
+    b = lcmobjectcollection.LCMObjectCollection('TEST_COLLECTION_B')
+
+    updates = []
+    b.connectDescriptionUpdated(lambda collection, descId: updates.append(descId))
+
+    descs = [newDescription('box %d' % i, Dimensions=[0.1*i, 0.2, 0.3]) for i in range(100)]
+    for desc in descs:
+        a.updateDescription(desc, publish=False)
+
+    assert sync(a, b) == 100
+    assert len(updates) == 100
+    assert b.getSummary() == a.getSummary()
+
+    # nothing changed, nothing is sent and no callbacks fire
+    del updates[:]
+    assert sync(a, b) == 0
+    b.handleEchoResponse(transmit(dict(descriptions={d['uuid']: d for d in descs})))
+    assert not updates
+
+    # only the changed description is sent
+    changed = dict(descs[3], Name='moved box')
+    a.updateDescription(changed, publish=False)
+    assert a.getVersion(changed['uuid']) == 2
+    assert sync(a, b) == 1
+    assert updates == [changed['uuid']]
+    assert b.getDescription(changed['uuid'])['Name'] == 'moved box'
+
+    # an older copy does not overwrite a newer local edit
+    del updates[:]
+    newer = dict(changed, Name='edited on b')
+    b.updateDescription(newer, publish=False)
+    stale = transmit(dict(descriptions={changed['uuid']: descs[3]}, versions={changed['uuid']: 1}))
+    b.handleEchoResponse(stale)
+    assert b.getDescription(changed['uuid'])['Name'] == 'edited on b'
+    assert sync(a, b) == 0
+
+    b.removeDescription(descs[0]['uuid'], publish=False)
+    assert sync(a, b) == 1
+
+
+def testConcurrentEdits():
+    a = lcmobjectcollection.LCMObjectCollection('TEST_COLLECTION_A')
+    b = lcmobjectcollection.LCMObjectCollection('TEST_COLLECTION_B')
+
+    desc = newDescription('box')
+    a.updateDescription(desc, publish=False)
+    sync(a, b)
+
+    # both peers edit the same version, so the edits have equal versions
+    a.updateDescription(dict(desc, Name='edited on a'), publish=False)
+    b.updateDescription(dict(desc, Name='edited on b'), publish=False)
+    descId = desc['uuid']
+    assert a.getVersion(descId) == b.getVersion(descId)
+
+    # the copy with the greater digest wins on both peers, whatever the
+    # order of the exchanges
+    sync(a, b)
+    sync(b, a)
+    assert a.getSummary() == b.getSummary()
+    assert a.getDescription(descId)['Name'] == b.getDescription(descId)['Name']
+    assert sync(a, b) == 0 and sync(b, a) == 0
+
+    # a peer also ignores the losing copy when it is pushed as an update
+    winner = a.getDescription(descId)
+    loser = dict(desc, Name='edited on b' if winner['Name'] == 'edited on a' else 'edited on a')
+    assert not a.mergeDescription(transmit(loser), a.getVersion(descId))
+    assert a.getDescription(descId) is winner
+
+
+def receiveCommand(collection, peerId, binary, command='remove', **commandArgs):
+    if command == 'remove':
+        commandArgs.setdefault('descriptionId', newUUID())
+    collection._handleCommand(dict(commandId=newUUID(), collectionId=peerId, command=command,
+                                   binary=binary, **commandArgs))
+
+
+def testPublishEncoding():
+    collection = lcmobjectcollection.LCMObjectCollection('TEST_COLLECTION_ENCODING')
+    collection.binarySupported = True
+
+    channels = []
+    if lcmobjectcollection.USE_LCM:
+        lcmUtils = lcmobjectcollection.lcmUtils
+        publish = lcmUtils.publish
+        lcmUtils.publish = lambda channel, msg: channels.append(channel)
+
+    try:
+        # no peer is known yet, so commands go out as JSON
+        collection.binaryEnabled = True
+        assert not collection.useBinary()
+        if lcmobjectcollection.USE_LCM:
+            collection.updateDescription(newDescription('box'))
+            assert channels == [collection.channel]
+
+            # an announcement asking for a reply is answered with JSON
+            receiveCommand(collection, newUUID(), binary=True, command='announce', reply=True)
+            receiveCommand(collection, newUUID(), binary=True, command='announce', reply=False)
+            assert channels == [collection.channel]*2
+    finally:
+        if lcmobjectcollection.USE_LCM:
+            lcmUtils.publish = publish
+
+    peerId = newUUID()
+    receiveCommand(collection, peerId, binary=True)
+    assert collection.useBinary()
+
+    # binary is used only when it is enabled explicitly
+    collection.binaryEnabled = False
+    assert not collection.useBinary()
+    collection.binaryEnabled = True
+
+    receiveCommand(collection, newUUID(), binary=False)
+    assert not collection.useBinary()
+
+    # peers that go silent are forgotten
+    for otherId in collection.peerLastHeard:
+        if otherId != peerId:
+            collection.peerLastHeard[otherId] -= 2*collection.peerTimeout
+    assert collection.useBinary()
+    assert collection.getPeers() == [peerId]
+
+    collection.peerLastHeard[peerId] -= 2*collection.peerTimeout
+    assert not collection.useBinary()
+    assert not collection.getPeers()
+
+
+def main():
+    testSync()
+    testConcurrentEdits()
+    testPublishEncoding()
+
+
+if __name__ == '__main__':
+    main()
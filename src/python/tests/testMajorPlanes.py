@@ -0,0 +1,47 @@
+from director import segmentationroutines
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def makePlanesScene():
+    grid = np.mgrid[0:2:0.02, 0:2:0.02].reshape(2, -1).T
+    zeros = np.zeros(len(grid))
+
+    floor = np.column_stack([grid, zeros])
+    wall = np.column_stack([zeros - 0.5, grid[:,0], grid[:,1] + 0.1])
+    sideWall = np.column_stack([grid[:,0], zeros + 3.0, grid[:,1]])
+    clutter = np.random.rand(300, 3) * 3.0
+
+    points = np.vstack([floor, wall, sideWall, clutter])
+    return vnp.numpyToPolyData(points), [[0, 0, 1], [1, 0, 0], [0, 1, 0]]
+
+
+def testExtractMajorPlanes():
+    polyData, expectedNormals = makePlanesScene()
+
+    timer = SimpleTimer()
+    labeled, planes = segmentationroutines.extractMajorPlanes(polyData)
+    print('extracted %d planes in %.3f seconds' % (len(planes), timer.elapsed()))
+
+    labels = vnp.getNumpyFromVtk(labeled, 'plane_labels')
+    assert len(labels) == polyData.GetNumberOfPoints()
+    assert len(planes) == 3
+
+    for expectedNormal in expectedNormals:
+        matches = [i for i, (origin, normal) in enumerate(planes) if abs(np.dot(normal, expectedNormal)) > 0.99]
+        assert len(matches) == 1
+        assert np.count_nonzero(labels == matches[0] + 1) >= 2000
+
+    labeled, planes = segmentationroutines.extractMajorPlanes(polyData, maxPlanes=1)
+    assert len(planes) == 1
+    assert set(np.unique(vnp.getNumpyFromVtk(labeled, 'plane_labels'))) == {0, 1}
+
+
+def main():
+    testExtractMajorPlanes()
+
+
+if __name__ == '__main__':
+    main()
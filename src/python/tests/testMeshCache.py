@@ -0,0 +1,149 @@
+from director import geometryencoder
+from director import meshcache
+from director import meshmanager
+from director import ioUtils
+from director import vtkAll as vtk
+from director import vtkNumpy as vnp
+from director.shallowCopy import shallowCopy
+from director.uuidutil import newUUID
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+def makeMesh(resolution):
+    source = vtk.vtkSphereSource()
+    source.SetThetaResolution(resolution)
+    source.SetPhiResolution(resolution)
+    source.Update()
+    return shallowCopy(source.GetOutput())
+
+
+def assertSameMesh(a, b):
+    assert np.array_equal(vnp.getNumpyFromVtk(a, 'Points'), vnp.getNumpyFromVtk(b, 'Points'))
+    assert np.array_equal(vnp.getNumpyFromVtk(a, 'Normals'), vnp.getNumpyFromVtk(b, 'Normals'))
+    assert np.array_equal(vnp.getNumpyFromCellArray(a.GetPolys())[1], vnp.getNumpyFromCellArray(b.GetPolys())[1])
+    assert b.GetPointData().GetNormals() is not None
+
+
+def testCache(directory):
+    cache = meshcache.MeshCache(directory, maxSizeBytes=10**9)
+    meshes = [makeMesh(20 + i) for i in range(4)]
+    hashes = ['mesh%d' % i for i in range(4)]
+
+    for contentHash, mesh in zip(hashes, meshes):
+        cache.store(contentHash, mesh)
+        assertSameMesh(mesh, cache.load(contentHash))
+
+    assert cache.load('missing') is None
+
+    # make mesh0 the most recently used, then shrink the cache to two meshes
+    os.utime(cache.getFilename('mesh1'), (0, 0))
+    os.utime(cache.getFilename('mesh2'), (1, 1))
+    os.utime(cache.getFilename('mesh3'), (2, 2))
+    cache.load('mesh0')
+
+    cache.maxSizeBytes = os.path.getsize(cache.getFilename('mesh0')) + os.path.getsize(cache.getFilename('mesh3'))
+    cache.evict(protectedHashes=['mesh1'])
+    assert [cache.contains(h) for h in hashes] == [True, True, False, False]
+
+    # exported files are protected by their hash too
+    exportFilename = cache.getExportFilename('mesh1', meshes[1], 'stl')
+    cache.maxSizeBytes = 1
+    cache.evict(protectedHashes=['mesh1'])
+    assert os.path.isfile(exportFilename)
+    assert cache.contains('mesh1') and not cache.contains('mesh0')
+
+
+def testDefaultDirectory():
+    # caches without a directory do not share files
+    a = meshcache.MeshCache()
+    b = meshcache.MeshCache()
+    assert a.directory != b.directory
+    a.store('mesh', makeMesh(20))
+    assert not b.contains('mesh')
+
+
+def testMeshManager(directory):
+    manager = meshmanager.MeshManager(cacheDirectory=directory, maxMeshesInMemory=2)
+    meshes = [makeMesh(20 + i) for i in range(4)]
+    meshIds = [manager.add(mesh, publish=False) for mesh in meshes]
+    assert len(manager.meshes) == 2
+
+    # evicted meshes are loaded back from the disk cache
+    for meshId, mesh in zip(meshIds, meshes):
+        assertSameMesh(mesh, manager.get(meshId))
+
+    # identical content is stored once
+    sameId = manager.add(shallowCopy(meshes[0]), publish=False)
+    assert manager.meshContentHashes[sameId] == manager.meshContentHashes[meshIds[0]]
+
+    filename = manager.getFilesystemFilename(meshIds[0])
+    assert filename.startswith(directory) and filename.endswith('.stl')
+    assert manager.getFilesystemFilename(sameId) == filename
+    assert ioUtils.readPolyData(filename).GetNumberOfPolys() == meshes[0].GetNumberOfPolys()
+    assert manager.getFilesystemFilename('unknown') is None
+
+
+def testMeshManagerEviction(directory):
+    # a cache that is always over its size cap
+    manager = meshmanager.MeshManager(cacheDirectory=directory, maxCacheSizeBytes=1, maxMeshesInMemory=2)
+    meshes = [makeMesh(20 + i) for i in range(4)]
+    meshIds = [manager.add(mesh, publish=False) for mesh in meshes]
+    hashes = [manager.meshContentHashes[meshId] for meshId in meshIds]
+
+    # only the meshes that left memory were written to disk
+    assert [manager.cache.contains(h) for h in hashes] == [True, True, False, False]
+
+    # the files of this manager's meshes are never evicted, so every mesh
+    # can be loaded back, in any order
+    for i in [0, 1, 2, 3, 0, 2, 1, 3]:
+        assertSameMesh(meshes[i], manager.get(meshIds[i]))
+    assert all(manager.cache.contains(h) for h in hashes)
+
+    # removed meshes are no longer protected
+    manager.remove(meshIds[0], publish=False)
+    assert manager.get(meshIds[0]) is None
+    assert hashes[0] not in manager._getProtectedHashes()
+    manager.add(makeMesh(30), publish=False)
+    manager.add(makeMesh(31), publish=False)
+    assert not manager.cache.contains(hashes[0])
+
+
+def testMeshManagerDecodeOnCacheMiss(directory):
+    manager = meshmanager.MeshManager(cacheDirectory=directory, maxMeshesInMemory=1)
+    meshes = [makeMesh(20 + i) for i in range(2)]
+
+    # meshes received from the collection
+    meshIds = [newUUID() for mesh in meshes]
+    for meshId, mesh in zip(meshIds, meshes):
+        manager.collection.updateDescription(dict(uuid=meshId, data=geometryencoder.encodePolyData(mesh)), publish=False)
+
+    # the first mesh left memory, and its file is lost
+    contentHash = manager.meshContentHashes[meshIds[0]]
+    assert contentHash not in manager.meshes
+    os.remove(manager.cache.getFilename(contentHash))
+
+    assertSameMesh(meshes[0], manager.get(meshIds[0]))
+
+    # removing the description forgets the mesh
+    manager.collection.removeDescription(meshIds[1], publish=False)
+    assert manager.get(meshIds[1]) is None
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        testCache(os.path.join(directory, 'cache'))
+        testMeshManager(os.path.join(directory, 'manager'))
+        testMeshManagerEviction(os.path.join(directory, 'eviction'))
+        testMeshManagerDecodeOnCacheMiss(os.path.join(directory, 'decode'))
+        testDefaultDirectory()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+from director import geometryencoder
+from director import vtkAll as vtk
+from director import vtkNumpy as vnp
+from director.shallowCopy import shallowCopy
+from director.simpletimer import SimpleTimer
+from director.thirdparty import numpyjsoncoder
+
+import numpy as np
+
+
+def makeMesh(resolution):
+    source = vtk.vtkSphereSource()
+    source.SetRadius(0.5)
+    source.SetThetaResolution(resolution)
+    source.SetPhiResolution(resolution)
+    source.Update()
+    polyData = shallowCopy(source.GetOutput())
+    vnp.addNumpyToVtk(polyData, np.arange(polyData.GetNumberOfPoints(), dtype=np.int32), 'point_ids')
+    return polyData
+
+
+def getCells(cells):
+    offsets, connectivity = vnp.getNumpyFromCellArray(cells)
+    return offsets, connectivity
+
+
+def testRoundTrip():
+    polyData = makeMesh(40)
+    polyData.SetLines(vnp.getCellArrayFromNumpy(np.array([0, 2, 5]), np.array([0, 1, 2, 3, 4])))
+
+    for bits in (8, 16, 24):
+        desc = geometryencoder.encodeMesh(polyData, quantizationBits=bits)
+        decoded = geometryencoder.decodeMesh(numpyjsoncoder.decode(numpyjsoncoder.encode(desc)))
+
+        points = vnp.getNumpyFromVtk(polyData, 'Points')
+        decodedPoints = vnp.getNumpyFromVtk(decoded, 'Points')
+        extent = points.max(axis=0) - points.min(axis=0)
+        assert np.all(np.abs(decodedPoints - points) <= extent / (2**bits - 1) + 1e-6)
+
+        for cellType in ('Polys', 'Lines'):
+            expected = getCells(getattr(polyData, 'Get' + cellType)())
+            actual = getCells(getattr(decoded, 'Get' + cellType)())
+            assert np.array_equal(expected[0], actual[0])
+            assert np.array_equal(expected[1], actual[1])
+
+        assert np.array_equal(vnp.getNumpyFromVtk(decoded, 'point_ids'), np.arange(polyData.GetNumberOfPoints()))
+        normals = vnp.getNumpyFromVtk(decoded, 'Normals')
+        assert decoded.GetPointData().GetNormals() is not None
+        assert np.allclose(normals, vnp.getNumpyFromVtk(polyData, 'Normals'), atol=0.02)
+
+    assert desc['hash'] == geometryencoder.encodeMesh(polyData, quantizationBits=24)['hash']
+    assert desc['hash'] != geometryencoder.encodeMesh(makeMesh(41), quantizationBits=24)['hash']
+
+
+def benchmark(resolution=400, iterations=5):
+    polyData = makeMesh(resolution)
+
+    timer = SimpleTimer()
+    for i in range(iterations):
+        legacyMessage = numpyjsoncoder.encode(dict(data=geometryencoder.encodePolyData(polyData)))
+    legacyEncodeTime = timer.elapsed() / iterations
+
+    timer.reset()
+    for i in range(iterations):
+        geometryencoder.decodePolyData(numpyjsoncoder.decode(legacyMessage)['data'])
+    legacyDecodeTime = timer.elapsed() / iterations
+
+    timer.reset()
+    for i in range(iterations):
+        message = numpyjsoncoder.encode(geometryencoder.encodeMesh(polyData))
+    encodeTime = timer.elapsed() / iterations
+
+    timer.reset()
+    for i in range(iterations):
+        geometryencoder.decodeMesh(numpyjsoncoder.decode(message))
+    decodeTime = timer.elapsed() / iterations
+
+    print('mesh with %d points, %d triangles' % (polyData.GetNumberOfPoints(), polyData.GetNumberOfPolys()))
+    print('  vtk marshal:    %9d bytes, encode %.3f s, decode %.3f s' % (len(legacyMessage), legacyEncodeTime, legacyDecodeTime))
+    print('  quantized mesh: %9d bytes, encode %.3f s, decode %.3f s' % (len(message), encodeTime, decodeTime))
+
+
+def main():
+    testRoundTrip()
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+
+from director import numpyjsonbinary
+from director.thirdparty import numpyjsoncoder
+
+
+def makeData():
+    return dict(name='cloud',
+                points=np.random.rand(1000, 3),
+                colors=np.random.randint(0, 255, size=(1000, 3)).astype(np.uint8),
+                ids=np.arange(50, dtype=np.int32),
+                pose=np.eye(4),
+                children=[dict(position=np.zeros(3), values=[1, 2.5, 'a'])])
+
+
+def assertEqualData(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        if isinstance(a[key], np.ndarray):
+            assert b[key].dtype == a[key].dtype
+            assert b[key].shape == a[key].shape
+            assert np.array_equal(a[key], b[key])
+
+
+def testRoundTrip():
+    data = makeData()
+
+    jsonData = numpyjsoncoder.decode(numpyjsoncoder.encode(data))
+    assertEqualData(data, jsonData)
+
+    binaryStream = numpyjsonbinary.encode(data)
+    assert numpyjsonbinary.isBinary(binaryStream)
+    assert not numpyjsonbinary.isBinary(numpyjsoncoder.encode(data))
+    assertEqualData(data, numpyjsonbinary.decode(numpyjsoncoder.encode(data)))
+
+    binaryData = numpyjsonbinary.decode(binaryStream)
+    assertEqualData(data, binaryData)
+    assert binaryData['children'][0]['values'] == [1, 2.5, 'a']
+    assert np.array_equal(binaryData['children'][0]['position'], np.zeros(3))
+
+
+def testLegacyFormat():
+    # python 3 encoders used to write the repr of the base64 bytes
+    arr = np.arange(20, dtype=np.float32)
+    stream = '{"a": {"__ndarray__": "%s", "dtype": "float32", "shape": [20]}}' % str(numpyjsoncoder.base64.b64encode(arr.data))
+    assert stream.count("b'") == 1
+    assert np.array_equal(numpyjsoncoder.decode(stream)['a'], arr)
+
+
+def testNonContiguous():
+    arr = np.arange(60, dtype=np.float64).reshape(6, 10)[:, ::3]
+    for encode in (numpyjsoncoder.encode, numpyjsonbinary.encode):
+        assert np.array_equal(numpyjsonbinary.decode(encode(dict(a=arr)))['a'], arr)
+
+
+def benchmark(data, repeat=3):
+
+    def timeit(func, *args):
+        best = float('inf')
+        for _ in range(repeat):
+            t = time.time()
+            result = func(*args)
+            best = min(best, time.time() - t)
+        return result, best
+
+    for name, encode in (('json', numpyjsoncoder.encode), ('binary', numpyjsonbinary.encode)):
+        stream, encodeTime = timeit(encode, data)
+        decoded, decodeTime = timeit(numpyjsonbinary.decode, stream)
+        assertEqualData(data, decoded)
+        print('%-6s  %8.2f MB  encode %.4f s  decode %.4f s' % (name, len(stream)/1e6, encodeTime, decodeTime))
+
+
+def testBenchmark():
+    benchmark(dict(points=np.random.rand(1000000, 4).astype(np.float32),
+                   ids=np.arange(100000, dtype=np.int64)))
+
+
+if __name__ == '__main__':
+    testRoundTrip()
+    testLegacyFormat()
+    testNonContiguous()
+    testBenchmark()
@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+from director import planplayback
+from director import robotstate
+
+
+class Message(object):
+    pass
+
+
+def newState(utime, jointNames, jointPositions, xyz, quat):
+    msg = Message()
+    msg.utime = utime
+    msg.pose = Message()
+    msg.pose.translation = Message()
+    msg.pose.rotation = Message()
+    msg.pose.translation.x, msg.pose.translation.y, msg.pose.translation.z = xyz
+    msg.pose.rotation.w, msg.pose.rotation.x, msg.pose.rotation.y, msg.pose.rotation.z = quat
+    msg.joint_name = jointNames
+    msg.joint_position = list(jointPositions)
+    return msg
+
+
+def newPlan(numberOfStates, duration=2.0):
+    jointNames = list(np.random.permutation(robotstate.getDrakePoseJointNames()[6:]))
+    plan = Message()
+    plan.plan = []
+    for i, t in enumerate(np.linspace(0.0, duration, numberOfStates)):
+        yaw = 0.5 * t
+        quat = (np.cos(yaw/2), 0.0, 0.0, np.sin(yaw/2))
+        plan.plan.append(newState(int(t*1e6), jointNames, np.random.rand(len(jointNames)), (t, 0.0, 1.0), quat))
+    return plan
+
+
+def getPlanPosesPerState(msg):
+    # the decoding before bulk conversion, for comparison
+    poses = [robotstate.convertStateMessageToDrakePose(state) for state in msg.plan]
+    return np.array([state.utime / 1e6 for state in msg.plan]), poses
+
+
+def testGetPlanPoses():
+    plans = [newPlan(20), newPlan(30), newPlan(10)]
+
+    poseTimes, poses = planplayback.PlanPlayback.getPlanPoses(plans[0])
+    expectedTimes, expectedPoses = getPlanPosesPerState(plans[0])
+    assert poses.shape == (20, robotstate.getNumPositions())
+    assert np.allclose(poseTimes, expectedTimes)
+    assert np.allclose(poses, expectedPoses)
+
+    # concatenated plans drop the first state of each following plan
+    poseTimes, poses = planplayback.PlanPlayback.getPlanPoses(plans)
+    assert len(poseTimes) == len(poses) == 20 + 29 + 9
+    assert np.allclose(poseTimes[19:21], [2.0, 2.0 + plans[1].plan[1].utime/1e6])
+    assert np.allclose(poseTimes[-1], 6.0)
+    assert np.all(np.diff(poseTimes) > 0)
+    assert np.allclose(poses[20:49], getPlanPosesPerState(plans[1])[1][1:])
+
+
+def testInterpolatorCache():
+    playback = planplayback.PlanPlayback()
+    plans = [newPlan(20), newPlan(30)]
+
+    f = playback.getPoseInterpolatorFromPlan(plans)
+    assert playback.getPoseInterpolatorFromPlan(plans) is f
+    assert playback.getPoseInterpolatorFromPlan(plans[0]) is not f
+
+    poseTimes, poses = playback.getPlanPoses(plans)
+    assert np.allclose(f(poseTimes), playback.getPoseInterpolator(poseTimes, poses)(poseTimes))
+
+    playback.interpolationMethod = 'pchip'
+    assert playback.getPoseInterpolatorFromPlan(plans) is not f
+
+    # a plan that is extended in place gets a new interpolator
+    playback.interpolationMethod = 'slinear'
+    f = playback.getPoseInterpolatorFromPlan(plans[1])
+    jointNames = plans[1].plan[0].joint_name
+    endTime = plans[1].plan[-1].utime
+    for i in range(1, 5):
+        plans[1].plan.append(newState(endTime + i*100000, jointNames, np.random.rand(len(jointNames)), (0.0, 0.0, 1.0), (1.0, 0.0, 0.0, 0.0)))
+    extended = playback.getPoseInterpolatorFromPlan(plans[1])
+    assert extended is not f
+    assert np.allclose(extended.x[-1], plans[1].plan[-1].utime/1e6)
+
+
+def testBenchmark():
+    plan = newPlan(1000)
+    playback = planplayback.PlanPlayback()
+
+    t = time.time()
+    expectedTimes, expectedPoses = getPlanPosesPerState(plan)
+    perStateTime = time.time() - t
+
+    t = time.time()
+    poseTimes, poses = playback.getPlanPoses(plan)
+    bulkTime = time.time() - t
+    assert np.allclose(poses, expectedPoses)
+
+    t = time.time()
+    playback.getPoseInterpolatorFromPlan(plan)
+    interpolatorTime = time.time() - t
+
+    t = time.time()
+    playback.getPoseInterpolatorFromPlan(plan)
+    cachedTime = time.time() - t
+
+    print('decode 1000 states: per state %.1f ms, bulk %.1f ms' % (perStateTime*1e3, bulkTime*1e3))
+    print('interpolator: new %.1f ms, cached %.3f ms' % (interpolatorTime*1e3, cachedTime*1e3))
+
+
+testGetPlanPoses()
+testInterpolatorCache()
+testBenchmark()
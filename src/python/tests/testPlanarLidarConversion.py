@@ -0,0 +1,85 @@
+from director.drakevisualizer import PlanarLidarConverter
+from director import vtkAll as vtk
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import math
+import numpy as np
+
+
+def convertWithLoop(ranges, rad0, radstep):
+    '''
+    Reference implementation that builds the scan point by point.
+    '''
+    points = vtk.vtkPoints()
+    verts = vtk.vtkCellArray()
+
+    t = rad0
+    for r in ranges:
+        if r >= 0:
+            x = r * math.cos(t)
+            y = r * math.sin(t)
+
+            pointId = points.InsertNextPoint([x,y,0])
+            verts.InsertNextCell(1)
+            verts.InsertCellPoint(pointId)
+
+        t += radstep
+
+    polyData = vtk.vtkPolyData()
+    polyData.SetPoints(points)
+    polyData.SetVerts(verts)
+    return polyData
+
+
+def convertVectorized(ranges, rad0, radstep):
+    points, verts = PlanarLidarConverter.convert(ranges, rad0, radstep)
+    polyData = vtk.vtkPolyData()
+    polyData.SetPoints(points)
+    polyData.SetVerts(verts)
+    return polyData
+
+
+def makeScan(numBeams):
+    rad0 = -math.pi*0.75
+    radstep = 1.5*math.pi / numBeams
+    ranges = np.random.uniform(0.5, 30.0, numBeams)
+    ranges[::17] = -1.0
+    return ranges, rad0, radstep
+
+
+def testConversion():
+    ranges, rad0, radstep = makeScan(1000)
+
+    expected = convertWithLoop(ranges, rad0, radstep)
+    result = convertVectorized(ranges, rad0, radstep)
+
+    assert result.GetNumberOfPoints() == expected.GetNumberOfPoints()
+    assert result.GetNumberOfVerts() == expected.GetNumberOfVerts()
+    assert np.allclose(vnp.getNumpyFromVtk(result), vnp.getNumpyFromVtk(expected))
+
+
+def benchmark(numBeams, numScans=200):
+    ranges, rad0, radstep = makeScan(numBeams)
+
+    results = []
+    for name, func in [('loop', convertWithLoop), ('vectorized', convertVectorized)]:
+        timer = SimpleTimer()
+        for i in range(numScans):
+            func(ranges, rad0, radstep)
+        elapsed = timer.elapsed()
+        results.append(elapsed)
+        print('%5d beams  %-10s  %8.3f ms/scan  %10.0f beams/s' % (numBeams, name,
+              1e3*elapsed/numScans, numBeams*numScans/elapsed))
+
+    print('%5d beams  speedup: %.1fx' % (numBeams, results[0] / results[1]))
+
+
+def main():
+    testConversion()
+    benchmark(1000)
+    benchmark(10000, numScans=50)
+
+
+if __name__ == '__main__':
+    main()
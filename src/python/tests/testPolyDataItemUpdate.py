@@ -0,0 +1,91 @@
+from director import consoleapp
+from director import visualization as vis
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def makeCloud(numPoints):
+    points = np.random.rand(numPoints, 3).astype(np.float32)
+    rgb = np.random.randint(0, 255, size=(numPoints, 3)).astype(np.uint8)
+    return points, rgb
+
+
+def testSetPolyData(view):
+    points, rgb = makeCloud(1000)
+    obj = vis.showPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}), 'cloud', view=view, colorByName='rgb')
+    lut = obj.mapper.GetLookupTable()
+
+    # same layout: the color by property and color map are kept
+    points, rgb = makeCloud(2000)
+    obj.setPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}))
+    assert obj.getPropertyEnumValue('Color By') == 'rgb'
+    assert obj.mapper.GetLookupTable() is lut
+    assert obj.polyData.GetPointData().GetScalars().GetName() == 'rgb'
+
+    # new layout: the color by choices are recomputed
+    obj.setPolyData(vnp.numpyToPolyData(points, {'rgb': rgb, 'intensity': np.random.rand(2000)}))
+    assert 'intensity' in obj.properties.getPropertyAttribute('Color By', 'enumNames')
+
+    obj.setPolyData(vnp.numpyToPolyData(points))
+    assert obj.getPropertyEnumValue('Color By') == 'Solid Color'
+
+
+def testUpdatePoints(view):
+    points, rgb = makeCloud(1000)
+    obj = vis.showPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}), 'points', view=view, colorByName='rgb')
+    original = obj.polyData
+    originalPoints = points
+
+    # the polydata passed in may be shared, so the first update replaces it
+    points, rgb = makeCloud(1000)
+    assert not obj.updatePoints(points, {'rgb': rgb})
+    assert obj.polyData is not original
+    assert np.array_equal(vnp.getNumpyFromVtk(original), originalPoints)
+    polyData = obj.polyData
+
+    points, rgb = makeCloud(1000)
+    assert obj.updatePoints(points, {'rgb': rgb})
+    assert obj.polyData is polyData
+    assert np.array_equal(vnp.getNumpyFromVtk(obj.polyData), points)
+    assert np.array_equal(vnp.getNumpyFromVtk(obj.polyData, 'rgb'), rgb)
+
+    points, rgb = makeCloud(500)
+    assert not obj.updatePoints(points, {'rgb': rgb})
+    assert obj.polyData.GetNumberOfPoints() == 500
+    assert obj.getPropertyEnumValue('Color By') == 'rgb'
+
+    # after setPolyData the next update copies again
+    points, rgb = makeCloud(500)
+    obj.setPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}))
+    polyData = obj.polyData
+    assert not obj.updatePoints(points, {'rgb': rgb})
+    assert obj.polyData is not polyData
+    assert obj.updatePoints(points, {'rgb': rgb})
+
+
+def benchmark(view, numPoints=300000, numUpdates=50):
+    points, rgb = makeCloud(numPoints)
+    obj = vis.showPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}), 'benchmark', view=view, colorByName='rgb')
+
+    timer = SimpleTimer()
+    for i in range(numUpdates):
+        obj.setPolyData(vnp.numpyToPolyData(points, {'rgb': rgb}))
+    setTime = timer.elapsed()
+
+    timer.reset()
+    for i in range(numUpdates):
+        obj.updatePoints(points, {'rgb': rgb})
+    updateTime = timer.elapsed()
+
+    print('%d points, %d updates: setPolyData %.3f s, updatePoints %.3f s' % (
+          numPoints, numUpdates, setTime, updateTime))
+
+
+app = consoleapp.ConsoleApp()
+view = app.createView()
+
+testSetPolyData(view)
+testUpdatePoints(view)
+benchmark(view)
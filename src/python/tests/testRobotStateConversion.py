@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+
+from director import robotstate
+from director import transformUtils
+
+
+class Message(object):
+    pass
+
+
+def newStateMessage(jointNames, jointPositions):
+    msg = Message()
+    msg.pose = Message()
+    msg.pose.translation = Message()
+    msg.pose.rotation = Message()
+    msg.pose.translation.x, msg.pose.translation.y, msg.pose.translation.z = 1.0, 2.0, 3.0
+    msg.pose.rotation.w, msg.pose.rotation.x, msg.pose.rotation.y, msg.pose.rotation.z = np.cos(0.25), 0.0, 0.0, np.sin(0.25)
+    msg.joint_name = list(jointNames)
+    msg.joint_position = list(jointPositions)
+    return msg
+
+
+def convertWithDict(msg, drakePoseJointNames, strict=True):
+    # the conversion before the cached index, for comparison
+    jointMap = {}
+    for name, position in zip(msg.joint_name, msg.joint_position):
+        jointMap[name] = position
+
+    jointPositions = []
+    for name in drakePoseJointNames[6:]:
+        if strict:
+            jointPositions.append(jointMap[name])
+        else:
+            jointPositions.append(jointMap.get(name, 0.0))
+
+    trans = msg.pose.translation
+    quat = msg.pose.rotation
+    trans = [trans.x, trans.y, trans.z]
+    quat = [quat.w, quat.x, quat.y, quat.z]
+    rpy = transformUtils.quaternionToRollPitchYaw(quat)
+    return np.hstack((trans, rpy, jointPositions))
+
+
+def getDrakePoseJointNames(numberOfJoints):
+    return ['base_x', 'base_y', 'base_z', 'base_roll', 'base_pitch', 'base_yaw'] + ['joint_%d' % i for i in range(numberOfJoints)]
+
+
+def testConversion():
+    drakePoseJointNames = getDrakePoseJointNames(30)
+    converter = robotstate.StateMessageConverter(drakePoseJointNames)
+
+    # message joints in a different order, with an extra joint
+    jointNames = drakePoseJointNames[6:][::-1] + ['finger_joint']
+    msg = newStateMessage(jointNames, np.random.rand(len(jointNames)))
+    pose = converter.convert(msg)
+    assert np.allclose(pose, convertWithDict(msg, drakePoseJointNames))
+    assert np.allclose(pose[5], 0.5)
+
+    # the index is cached per joint name list
+    assert len(converter.jointMap.cache) == 1
+    msg = newStateMessage(jointNames, np.random.rand(len(jointNames)))
+    assert np.allclose(converter.convert(msg), convertWithDict(msg, drakePoseJointNames))
+    assert len(converter.jointMap.cache) == 1
+
+    # missing joints
+    msg = newStateMessage(jointNames[5:], np.random.rand(len(jointNames) - 5))
+    try:
+        converter.convert(msg)
+    except KeyError:
+        pass
+    else:
+        assert False, 'expected KeyError'
+    assert np.allclose(converter.convert(msg, strict=False), convertWithDict(msg, drakePoseJointNames, strict=False))
+
+
+def testJointIndexMap():
+    jointMap = robotstate.JointIndexMap(['a', 'b', 'c', 'd'])
+    q = np.array([1.0, 2.0, 3.0, 4.0])
+    jointMap.assign(q, ['d', 'x', 'b', 'd'], [10.0, 20.0, 30.0, 40.0])
+    # unnamed joints are unchanged, the last duplicate wins
+    assert np.array_equal(q, [1.0, 30.0, 3.0, 40.0])
+    assert np.array_equal(jointMap.getIndices(['d', 'x', 'b', 'd'])[2], [0, 2])
+
+
+def testBenchmark(numberOfMessages=2000):
+    print('%8s %12s %12s' % ('joints', 'dict (us)', 'index (us)'))
+    for numberOfJoints in (30, 60, 100):
+        drakePoseJointNames = getDrakePoseJointNames(numberOfJoints)
+        converter = robotstate.StateMessageConverter(drakePoseJointNames)
+        jointNames = list(np.random.permutation(drakePoseJointNames[6:]))
+        messages = [newStateMessage(jointNames, np.random.rand(numberOfJoints)) for _ in range(numberOfMessages)]
+
+        t = time.time()
+        expected = [convertWithDict(msg, drakePoseJointNames) for msg in messages]
+        dictTime = (time.time() - t) / numberOfMessages
+
+        t = time.time()
+        poses = [converter.convert(msg) for msg in messages]
+        indexTime = (time.time() - t) / numberOfMessages
+
+        assert np.allclose(poses, expected)
+        print('%8d %12.1f %12.1f' % (numberOfJoints, dictTime*1e6, indexTime*1e6))
+
+
+if __name__ == '__main__':
+    testConversion()
+    testJointIndexMap()
+    testBenchmark()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from director import profiler
+
+
+def spin(event):
+    while not event.is_set():
+        sum(range(100))
+
+
+def testSamplingProfiler():
+    stopEvent = threading.Event()
+    worker = threading.Thread(target=spin, args=(stopEvent,), name='worker')
+    worker.start()
+    time.sleep(0.05)
+
+    sampler = profiler.SamplingProfiler()
+    for _ in range(10):
+        sampler.sample(0.01)
+    stopEvent.set()
+    worker.join()
+
+    assert sampler.number_of_samples == 10
+    stacks = sampler.get_stacks()
+    workerStacks = [s for s in stacks if s[0] == 'worker']
+    assert sum(count for _, _, count, _ in workerStacks) == 10
+    assert abs(sum(seconds for _, _, _, seconds in workerStacks) - 0.1) < 1e-9
+    assert all(any(frame[0] == 'spin' for frame in frames) for _, frames, _, _ in workerStacks)
+
+    totals = {frame[0]: total for frame, _, total in sampler.get_function_totals()}
+    assert abs(totals['spin'] - 0.1) < 1e-9
+
+    outputDir = tempfile.mkdtemp()
+    collapsedFile = os.path.join(outputDir, 'stacks.collapsed')
+    sampler.write_collapsed(collapsedFile)
+    lines = open(collapsedFile).read().splitlines()
+    assert len(lines) == len(stacks)
+    workerLines = [line for line in lines if line.startswith('worker;')]
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in workerLines) == 10
+
+    speedscopeFile = os.path.join(outputDir, 'profile.json')
+    sampler.write_speedscope(speedscopeFile)
+    data = json.load(open(speedscopeFile))
+    frames = data['shared']['frames']
+    workerProfile = [p for p in data['profiles'] if p['name'] == 'worker'][0]
+    assert workerProfile['type'] == 'sampled'
+    assert len(workerProfile['samples']) == len(workerProfile['weights'])
+    assert abs(workerProfile['endValue'] - 0.1) < 1e-9
+    assert all(frames[sample[-1]]['name'] == 'spin' for sample in workerProfile['samples'])
+
+
+def testSamplingThread():
+    p = profiler.Profiler(sampling=True, sample_rate=1000)
+    outputDir = tempfile.mkdtemp()
+    p.collapsed_output = os.path.join(outputDir, 'stacks.collapsed')
+    p.speedscope_output = os.path.join(outputDir, 'profile.json')
+
+    p.toggle()
+    assert p.enabled and p.profiler.is_running()
+    time.sleep(0.1)
+    p.toggle(show_stats=False)
+    assert not p.enabled and not p.profiler.is_running()
+
+    assert p.profiler.number_of_samples > 0
+    # the sampling thread does not record itself
+    assert all(threadName != 'SamplingProfiler' for threadName, _, _, _ in p.profiler.get_stacks())
+    assert os.path.isfile(p.collapsed_output)
+    assert os.path.isfile(p.speedscope_output)
+
+
+if __name__ == '__main__':
+    testSamplingProfiler()
+    testSamplingThread()
@@ -0,0 +1,67 @@
+from director import consoleapp
+from director import segmentationexecutor
+from director import segmentationroutines
+from director import vtkNumpy as vnp
+
+import threading
+import time
+import numpy as np
+
+
+def makePlanes():
+    points = np.random.rand(6000, 3)
+    points[:3000,2] = 0.0
+    points[3000:,0] = 0.0
+    return vnp.numpyToPolyData(points)
+
+
+def fitPlanes(task, polyData):
+    return segmentationroutines.extractMajorPlanes(polyData, minClusterSize=500, progressFunction=task.setProgress)
+
+
+def slowLoop(task):
+    for i in range(1000):
+        task.setProgress(i/1000.0, 'step %d' % i)
+        time.sleep(0.01)
+
+
+def onFitDone(task):
+    assert threading.current_thread() is threading.main_thread()
+    assert task.state == task.FINISHED
+    polyData, planes = task.result()
+    assert len(planes) == 2
+    assert progressUpdates
+    results.append(task)
+    checkDone()
+
+
+def onCancelled(task):
+    assert threading.current_thread() is threading.main_thread()
+    assert task.state == task.CANCELLED
+    results.append(task)
+    checkDone()
+
+
+def checkDone():
+    if len(results) == 2:
+        app.quit()
+
+
+results = []
+progressUpdates = []
+
+app = consoleapp.ConsoleApp()
+executor = segmentationexecutor.SegmentationExecutor(maxWorkers=2)
+
+fitTask = executor.submit(fitPlanes, segmentationexecutor.copyInput(makePlanes()), name='planes')
+fitTask.addProgressCallback(lambda task: progressUpdates.append(task.progress))
+fitTask.addDoneCallback(onFitDone)
+
+slowTask = executor.submit(slowLoop, name='slow')
+slowTask.addDoneCallback(onCancelled)
+slowTask.cancel()
+
+consoleapp.ConsoleApp.startQuitTimer(10.0)
+app.start(enableAutomaticQuit=False)
+
+assert len(results) == 2
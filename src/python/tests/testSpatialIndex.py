@@ -0,0 +1,79 @@
+from director import segmentation
+from director import spatialindex
+from director import vtkNumpy as vnp
+from director.simpletimer import SimpleTimer
+
+import numpy as np
+
+
+def testCache():
+    points = np.random.rand(10000, 3)
+    polyData = vnp.numpyToPolyData(points)
+
+    index = spatialindex.getPointCloudIndex(polyData)
+    assert spatialindex.getPointCloudIndex(polyData) is index
+
+    labeled = segmentation.labelDistanceToPoint(polyData, [0.5, 0.5, 0.5])
+    assert spatialindex.getPointCloudIndex(labeled) is index
+
+    vnp.getNumpyFromVtk(polyData, 'Points')[:] += 1.0
+    polyData.GetPoints().Modified()
+    newIndex = spatialindex.getPointCloudIndex(polyData)
+    assert newIndex is not index
+    assert np.allclose(newIndex.points, points + 1.0)
+
+
+def testQueries():
+    points = np.random.rand(10000, 3)
+    intensity = np.random.rand(10000)
+    polyData = vnp.numpyToPolyData(points, {'intensity': intensity})
+    origin = np.array([0.4, 0.5, 0.6])
+
+    # the first query scans, later queries use the tree
+    for i in range(3):
+        cropped = segmentation.cropToSphere(polyData, origin, 0.2)
+        inside = np.linalg.norm(points - origin, axis=1) <= 0.2
+        assert cropped.GetNumberOfPoints() == np.count_nonzero(inside)
+        assert np.array_equal(vnp.getNumpyFromVtk(cropped, 'intensity'), intensity[inside])
+        assert np.all(vnp.getNumpyFromVtk(cropped, 'distance_to_point') <= 0.2)
+
+    index = spatialindex.getPointCloudIndex(polyData)
+    assert index.tree is not None
+
+    dists, ids = index.queryNearest(origin, k=10)
+    expected = np.argsort(np.linalg.norm(points - origin, axis=1))[:10]
+    assert np.array_equal(ids, expected)
+
+    axes = np.eye(3)
+    ids = index.queryBox(origin, axes, [0.1, 0.2, 0.3])
+    assert np.array_equal(ids, np.flatnonzero(np.all(np.abs(points - origin) <= [0.1, 0.2, 0.3], axis=1)))
+
+
+def benchmark(numPoints=500000, numQueries=50):
+    points = np.random.rand(numPoints, 3)
+    polyData = vnp.numpyToPolyData(points)
+    origins = np.random.rand(numQueries, 3)
+
+    timer = SimpleTimer()
+    for origin in origins:
+        p = segmentation.labelDistanceToPoint(polyData, origin)
+        segmentation.thresholdPoints(p, 'distance_to_point', [0, 0.1])
+    scanTime = timer.elapsed()
+
+    timer.reset()
+    for origin in origins:
+        segmentation.cropToSphere(polyData, origin, 0.1)
+    indexTime = timer.elapsed()
+
+    print('%d points, %d crops: label and threshold %.3f s, spatial index %.3f s' % (
+          numPoints, numQueries, scanTime, indexTime))
+
+
+def main():
+    testCache()
+    testQueries()
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import csv
+import os
+import tempfile
+
+from director import timerstats
+
+
+class FakeTimer(object):
+
+    def __init__(self, name=None, callback=None):
+        self.name = name
+        self.callback = callback
+
+
+def onTimer():
+    pass
+
+
+def testTimerStats():
+    registry = timerstats.TimerStatsRegistry()
+
+    # 30 fps timer, one tick over the 33 ms budget
+    for tickTime in [0.0005, 0.003, 0.003, 0.050]:
+        registry.addTick('camera', tickTime, 1/30.0 if tickTime != 0.0005 else None, 30)
+    registry.addTick('planner', 0.2, None, 10)
+
+    rows = {row['name']: row for row in registry.getStats()}
+    camera = rows['camera']
+    assert camera['ticks'] == 4
+    assert camera['overruns'] == 1
+    assert abs(camera['achieved_fps'] - 30.0) < 1e-6
+    assert abs(camera['max_ms'] - 50.0) < 1e-6
+    assert camera['hist_le_1ms'] == 1
+    assert camera['hist_le_4ms'] == 2
+    assert camera['hist_le_66ms'] == 1
+    assert rows['planner']['overruns'] == 1
+    assert rows['planner']['hist_le_250ms'] == 1
+    assert registry.getStats()[0]['name'] == 'planner'
+
+    report = registry.formatReport()
+    assert 'camera' in report and 'planner' in report
+
+    filename = os.path.join(tempfile.mkdtemp(), 'timers.csv')
+    registry.writeCsv(filename)
+    with open(filename) as f:
+        csvRows = list(csv.DictReader(f))
+    assert [row['name'] for row in csvRows] == ['planner', 'camera']
+    assert csvRows[1]['overruns'] == '1'
+    assert 'hist_gt_1000ms' in csvRows[0]
+
+    registry.reset()
+    assert registry.getStats() == []
+
+
+def testTimerNames():
+    assert timerstats.getTimerName(FakeTimer(name='updater')) == 'updater'
+    assert timerstats.getTimerName(FakeTimer(callback=onTimer)) == '%s.onTimer' % __name__
+    assert timerstats.getTimerName(FakeTimer()).endswith('FakeTimer')
+
+
+def testEnable():
+    assert not timerstats.isEnabled()
+    timerstats.enable()
+    assert timerstats.isEnabled()
+    timerstats.getRegistry().addTick('a', 0.001, None, 30)
+    assert len(timerstats.getStats()) == 1
+    timerstats.disable()
+    timerstats.reset()
+    assert not timerstats.isEnabled()
+
+
+if __name__ == '__main__':
+    testTimerStats()
+    testTimerNames()
+    testEnable()
@@ -5,7 +5,7 @@ import subprocess
 import numpy as np
 import lcm
 from director.thirdparty import transformations
-from director.viewerclient import Visualizer, Box, GeometryData, Sphere, PointCloud, PolyLine
+from director.viewerclient import Visualizer, Box, GeometryData, Sphere, PointCloud, PolyLine, TriangularMesh
 
 
 if __name__ == '__main__':
@@ -63,4 +63,17 @@ if __name__ == '__main__':
         points=np.random.rand(15, 3),
         end_head=True))
 
+    # The binary protocol sends arrays as raw buffers and only sends a
+    # content hash when the geometry at a path is unchanged.
+    binary_vis = Visualizer(path="/root/binary", binary=True)
+    points = np.random.rand(500000, 3).astype(np.float32)
+    for i in range(10):
+        binary_vis["pointcloud"].setgeometry(PointCloud(points, {"rgb": np.random.rand(len(points), 3)}))
+        binary_vis["static_cloud"].setgeometry(PointCloud(points))
+        time.sleep(0.1)
+
+    binary_vis["mesh"].setgeometry(TriangularMesh(
+        vertices=np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float),
+        faces=np.array([[0, 1, 2], [1, 3, 2]])))
+
     vis_process.terminate()
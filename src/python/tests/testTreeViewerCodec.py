@@ -0,0 +1,66 @@
+from director import treeviewercodec
+
+import json
+import numpy as np
+
+
+def testRoundTrip():
+    data = {
+        "utime": 1234,
+        "delete": [],
+        "setgeometry": [{
+            "path": ["root", "cloud"],
+            "geometries": [{
+                "type": "pointcloud",
+                "points": np.random.rand(1001, 3).astype(np.float32),
+                "channels": {"rgb": np.random.rand(1001, 3),
+                             "intensity": np.arange(1001, dtype=np.uint8)},
+                "color": [1.0, 1.0, 1.0, 1.0]
+            }, {
+                "type": "mesh_data",
+                "vertices": np.random.rand(4, 3),
+                "faces": np.array([[0, 1, 2], [1, 2, 3]], dtype='>i4')
+            }]
+        }],
+        "settransform": []
+    }
+
+    payload = treeviewercodec.encodePayload(data)
+    decoded = treeviewercodec.decodePayload(payload)
+
+    geometries = data["setgeometry"][0]["geometries"]
+    decodedGeometries = decoded["setgeometry"][0]["geometries"]
+
+    assert decoded["utime"] == 1234
+    assert decoded["setgeometry"][0]["path"] == ["root", "cloud"]
+    assert decodedGeometries[0]["points"].dtype == np.float32
+    assert np.array_equal(decodedGeometries[0]["points"], geometries[0]["points"])
+    assert np.array_equal(decodedGeometries[0]["channels"]["rgb"], geometries[0]["channels"]["rgb"])
+    assert np.array_equal(decodedGeometries[0]["channels"]["intensity"], geometries[0]["channels"]["intensity"])
+    assert np.array_equal(decodedGeometries[1]["faces"], geometries[1]["faces"])
+    assert decodedGeometries[0]["color"] == [1.0, 1.0, 1.0, 1.0]
+
+    # the binary payload is smaller than the json encoding
+    jsonPayload = json.dumps(data, default=treeviewercodec.toJsonCompatible)
+    print('binary payload: %d bytes, json payload: %d bytes' % (len(payload), len(jsonPayload)))
+    assert len(payload) < len(jsonPayload)
+
+
+def testContentHash():
+    points = np.random.rand(100, 3)
+    geometries = [{"type": "pointcloud", "points": points}]
+
+    h = treeviewercodec.computeContentHash(geometries)
+    assert h == treeviewercodec.computeContentHash([{"type": "pointcloud", "points": points.copy()}])
+
+    points[0, 0] += 1.0
+    assert h != treeviewercodec.computeContentHash(geometries)
+
+
+def main():
+    testRoundTrip()
+    testContentHash()
+
+
+if __name__ == '__main__':
+    main()
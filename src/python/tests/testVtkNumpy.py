@@ -0,0 +1,61 @@
+from director import vtkAll as vtk
+from director import vtkNumpy as vnp
+from director.shallowCopy import shallowCopy
+
+import numpy as np
+
+
+def getVertexGlyphPolyData(pts):
+    pd = vtk.vtkPolyData()
+    pd.SetPoints(vnp.getVtkPointsFromNumpy(pts.copy()))
+    f = vtk.vtkVertexGlyphFilter()
+    f.SetInputData(pd)
+    f.Update()
+    return shallowCopy(f.GetOutput())
+
+
+def getCellPointIds(polyData):
+    cells = polyData.GetVerts()
+    ids = vtk.vtkIdList()
+    cells.InitTraversal()
+    result = []
+    while cells.GetNextCell(ids):
+        result.append([ids.GetId(i) for i in range(ids.GetNumberOfIds())])
+    return result
+
+
+def testVertexCells():
+    pts = np.random.rand(1000, 3)
+
+    expected = getVertexGlyphPolyData(pts)
+    polyData = vnp.numpyToPolyData(pts)
+
+    assert polyData.GetNumberOfVerts() == expected.GetNumberOfVerts() == len(pts)
+    assert getCellPointIds(polyData) == getCellPointIds(expected)
+
+    empty = vnp.numpyToPolyData(np.zeros((0, 3)))
+    assert empty.GetNumberOfVerts() == 0
+
+
+def testCopy():
+    pts = np.random.rand(100, 3).astype(np.float32)
+    colors = np.random.randint(0, 255, (100, 3)).astype(np.uint8)
+
+    copied = vnp.numpyToPolyData(pts, {'rgb': colors})
+    wrapped = vnp.numpyToPolyData(pts, {'rgb': colors}, copy=False)
+
+    pts[0] = [1.0, 2.0, 3.0]
+    colors[0] = [1, 2, 3]
+
+    assert not np.allclose(vnp.getNumpyFromVtk(copied)[0], pts[0])
+    assert np.allclose(vnp.getNumpyFromVtk(wrapped)[0], pts[0])
+    assert np.array_equal(vnp.getNumpyFromVtk(wrapped, 'rgb')[0], colors[0])
+
+
+def main():
+    testVertexCells()
+    testCopy()
+
+
+if __name__ == '__main__':
+    main()